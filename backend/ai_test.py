@@ -111,10 +111,19 @@ def run_tournament(args):
     results = runner.run_tournament(
         strategies=args.strategies,
         rounds_per_matchup=args.rounds,
-        games_per_match=args.games
+        games_per_match=args.games,
+        tournament_format=args.format,
+        table_size=args.table_size,
+        workers=args.workers,
+        seed=args.seed,
+        resume_id=args.resume
     )
     
-    print(f"\nTournament saved to: tournament_{results['tournament_id']}.json")
+    print(f"\n{results['matches_played']} matches played (seed {results['seed']})")
+    for rank, strategy in enumerate(results['ranking'], 1):
+        stats = results['summary'][strategy]
+        print(f"  {rank}. {strategy:20} | {stats['matches_won']:3d} match wins | {stats['game_win_rate']:5.1f}% game wins | {stats['average_score']:6.1f} avg score")
+    print(f"\nTournament saved to: {results['tournament_id']}.json (journal: {results['journal']})")
 
 def run_batch_test(args):
     """Run multiple matches of the same configuration"""
@@ -271,11 +280,21 @@ def main():
                              help='Custom match ID (optional)')
     
     # Tournament command
-    tournament_parser = subparsers.add_parser('tournament', help='Run round-robin tournament')
-    tournament_parser.add_argument('strategies', nargs='+',
+    tournament_parser = subparsers.add_parser('tournament', help='Run round-robin or Swiss tournament')
+    tournament_parser.add_argument('strategies', nargs='*',
                                   help='AI strategies to compete (2+ strategies)')
     tournament_parser.add_argument('--rounds', type=int, default=5,
-                                  help='Rounds per matchup (default: 5)')
+                                  help='Rounds per matchup, or number of Swiss rounds (default: 5)')
+    tournament_parser.add_argument('--format', choices=['round_robin', 'swiss'], default='round_robin',
+                                  help='Tournament format (default: round_robin)')
+    tournament_parser.add_argument('--table-size', type=int, default=2,
+                                  help='Players per match, 2-8 (default: 2)')
+    tournament_parser.add_argument('--workers', type=int,
+                                  help='Worker processes (default: CPU count)')
+    tournament_parser.add_argument('--seed', type=int,
+                                  help='Tournament seed for reproducible matches (default: random)')
+    tournament_parser.add_argument('--resume',
+                                  help='Resume an interrupted tournament by ID')
     tournament_parser.add_argument('--games', type=int, default=13,
                                   help='Games per match (default: 13)')
     
@@ -307,7 +326,7 @@ def main():
             sys.exit(1)
         run_single_match(args)
     elif args.command == 'tournament':
-        if len(args.strategies) < 2:
+        if len(args.strategies) < 2 and not args.resume:
             print("Error: Need at least 2 strategies for a tournament")
             sys.exit(1)
         run_tournament(args)
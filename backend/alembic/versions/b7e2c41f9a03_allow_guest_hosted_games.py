@@ -0,0 +1,26 @@
+"""Allow games hosted by guests (no user account)
+
+Revision ID: b7e2c41f9a03
+Revises: da4d1f2c9398
+Create Date: 2026-10-17 10:12:44.301522
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2c41f9a03'
+down_revision: Union[str, None] = 'da4d1f2c9398'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column('games', 'host_id', existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade() -> None:
+    op.alter_column('games', 'host_id', existing_type=sa.Integer(), nullable=False)
@@ -1,7 +1,15 @@
 from fastapi import APIRouter, HTTPException
-from typing import Dict, List
+from fastapi.responses import PlainTextResponse
+from typing import Dict, List, Optional
+import asyncio
+import threading
 import time
 from app.websockets.game_manager import game_manager
+from app.utils.auth import password_hasher
+from app.core.log import logging_stats
+from app.core.loop_monitor import loop_monitor
+from app.core.profiler import profiler, ProfilerBusy
+from app.core.resource_sampler import resource_sampler, RESOURCE_SAMPLE_INTERVAL, HISTORY_BUCKET_SECONDS
 
 import psutil
 
@@ -12,7 +20,7 @@ async def get_admin_dashboard():
     """Get comprehensive server statistics for admin dashboard"""
     
     # Game statistics
-    active_games = len(game_manager.active_games)
+    active_games = len(game_manager.active_matches)
     games_in_progress = 0
     games_waiting = 0
     total_players = 0
@@ -20,26 +28,27 @@ async def get_admin_dashboard():
     ai_players = 0
     
     games_list = []
-    for game_id, game in game_manager.active_games.items():
+    for game_id, match in game_manager.active_matches.items():
+        game = match.current_game
         game_info = {
             "game_id": game_id,
-            "player_count": len(game.players),
-            "spectator_count": len(game.spectators),
-            "started": game.game_started,
-            "current_player": game.get_current_player() if game.game_started else None,
-            "host": game.host,
-            "ai_players": len(game.ai_players),
-            "created_at": getattr(game, 'created_at', None),
-            "current_round": game.current_round,
+            "player_count": len(match.players),
+            "spectator_count": len(match.spectators),
+            "started": match.match_started,
+            "current_player": game.get_current_player() if game else None,
+            "host": match.host,
+            "ai_players": len(match.ai_players),
+            "created_at": match.created_at,
+            "current_round": game.current_round if game else None,
             "connections": len(game_manager.game_connections.get(game_id, set()))
         }
         games_list.append(game_info)
         
-        total_players += len(game.players)
-        total_spectators += len(game.spectators)
-        ai_players += len(game.ai_players)
+        total_players += len(match.players)
+        total_spectators += len(match.spectators)
+        ai_players += len(match.ai_players)
         
-        if game.game_started:
+        if match.match_started:
             games_in_progress += 1
         else:
             games_waiting += 1
@@ -49,18 +58,8 @@ async def get_admin_dashboard():
     total_lobby_connections = len(game_manager.lobby_connections)
     total_spectator_connections = sum(len(connections) for connections in game_manager.spectator_connections.values())
     
-    # System resource statistics
-    try:
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        memory_percent = memory.percent
-        memory_used_mb = memory.used // (1024 * 1024)
-        memory_total_mb = memory.total // (1024 * 1024)
-    except Exception as e:
-        cpu_percent = None
-        memory_percent = None
-        memory_used_mb = None
-        memory_total_mb = None
+    # System resource statistics (latest background sample; None until the first one)
+    sample = resource_sampler.latest() or {}
     
     return {
         "timestamp": int(time.time()),
@@ -83,11 +82,16 @@ async def get_admin_dashboard():
             "total_websockets": total_game_connections + total_lobby_connections + total_spectator_connections
         },
         "resources": {
-            "cpu_percent": cpu_percent,
-            "memory_percent": memory_percent,
-            "memory_used_mb": memory_used_mb,
-            "memory_total_mb": memory_total_mb
-        }
+            "cpu_percent": sample.get("cpu_percent"),
+            "memory_percent": sample.get("memory_percent"),
+            "memory_used_mb": sample.get("memory_used_mb"),
+            "memory_total_mb": sample.get("memory_total_mb"),
+            "loop_lag_ms": sample.get("loop_lag_ms"),
+            "sampled_at": sample.get("timestamp"),
+            "trend": resource_sampler.series("recent")
+        },
+        "password_hashing": password_hasher.get_stats(),
+        "logging": logging_stats()
     }
 
 @router.get("/games")
@@ -95,36 +99,37 @@ async def get_games_list():
     """Get detailed list of all active games"""
     games = []
     
-    for game_id, game in game_manager.active_games.items():
+    for game_id, match in game_manager.active_matches.items():
+        game = match.current_game
         # Get connection info
         connections = game_manager.game_connections.get(game_id, set())
         spectator_connections = game_manager.spectator_connections.get(game_id, set())
         
         game_details = {
             "game_id": game_id,
-            "name": game.name,
-            "host": game.host,
-            "players": game.players,
-            "spectators": game.spectators,
-            "ai_players": game.ai_players,
-            "player_count": len(game.players),
-            "spectator_count": len(game.spectators),
-            "max_players": game.max_players,
-            "min_players": game.min_players,
-            "started": game.game_started,
-            "current_player": game.get_current_player() if game.game_started else None,
-            "current_round": game.current_round,
-            "boneyard_count": len(game.boneyard) if hasattr(game, 'boneyard') else 0,
+            "name": match.name,
+            "host": match.host,
+            "players": match.players,
+            "spectators": match.spectators,
+            "ai_players": match.ai_players,
+            "player_count": len(match.players),
+            "spectator_count": len(match.spectators),
+            "max_players": match.max_players,
+            "min_players": match.min_players,
+            "started": match.match_started,
+            "current_player": game.get_current_player() if game else None,
+            "current_round": game.current_round if game else None,
+            "boneyard_count": len(game.boneyard) if game else 0,
             "connections": len(connections),
             "spectator_connections": len(spectator_connections),
-            "created_at": getattr(game, 'created_at', None),
-            "countdown_remaining": game.get_countdown_remaining(),
-            "ai_enabled": game.ai_enabled,
-            "ai_skill_level": game.ai_skill_level
+            "created_at": match.created_at,
+            "countdown_remaining": match.get_countdown_remaining(),
+            "ai_enabled": match.ai_enabled,
+            "ai_skill_level": match.ai_skill_level
         }
         
         # Check if AI might be stuck (current player is AI for too long)
-        if game.game_started and game.get_current_player() in game.ai_players:
+        if game and game.get_current_player() in game.ai_players:
             game_details["potential_ai_stuck"] = True
         else:
             game_details["potential_ai_stuck"] = False
@@ -136,9 +141,10 @@ async def get_games_list():
 @router.get("/games/{game_id}")
 async def get_game_details(game_id: str):
     """Get detailed information about a specific game"""
-    game = game_manager.active_games.get(game_id)
-    if not game:
+    match = game_manager.get_match(game_id)
+    if not match:
         raise HTTPException(status_code=404, detail="Game not found")
+    game = match.current_game
     
     # Get WebSocket connections for this game
     connections = game_manager.game_connections.get(game_id, set())
@@ -150,7 +156,7 @@ async def get_game_details(game_id: str):
         if ws in connections:
             player_connections[player_name] = True
     
-    game_state = game.get_game_state()
+    game_state = game.get_game_state() if game else match.get_match_state()
     
     return {
         "game_details": game_state,
@@ -160,17 +166,17 @@ async def get_game_details(game_id: str):
             "player_connections": player_connections
         },
         "potential_issues": {
-            "ai_stuck": game.game_started and game.get_current_player() in game.ai_players,
-            "no_connections": len(connections) == 0 and game.game_started,
-            "boneyard_empty": len(game.boneyard) == 0 if hasattr(game, 'boneyard') else False
+            "ai_stuck": bool(game) and game.get_current_player() in game.ai_players,
+            "no_connections": len(connections) == 0 and match.match_started,
+            "boneyard_empty": bool(game) and len(game.boneyard) == 0
         }
     }
 
 @router.post("/games/{game_id}/kill")
 async def kill_game(game_id: str, reason: str = "Admin intervention"):
     """Force kill a stuck or problematic game"""
-    game = game_manager.active_games.get(game_id)
-    if not game:
+    match = game_manager.get_match(game_id)
+    if not match:
         raise HTTPException(status_code=404, detail="Game not found")
     
     # Notify all connected players about the game being killed
@@ -189,14 +195,8 @@ async def kill_game(game_id: str, reason: str = "Admin intervention"):
         for ws in connections_to_close:
             await game_manager.disconnect(ws, game_id)
     
-    # Remove game from active games
-    del game_manager.active_games[game_id]
-    
-    # Clean up any remaining references
-    if game_id in game_manager.game_connections:
-        del game_manager.game_connections[game_id]
-    if game_id in game_manager.spectator_connections:
-        del game_manager.spectator_connections[game_id]
+    # Remove the match with its remaining connections and pending timers
+    await game_manager.remove_match(game_id)
     
     return {
         "success": True,
@@ -207,11 +207,12 @@ async def kill_game(game_id: str, reason: str = "Admin intervention"):
 @router.post("/games/{game_id}/force-next-turn")
 async def force_next_turn(game_id: str):
     """Force the game to move to the next player's turn (useful for stuck AI)"""
-    game = game_manager.active_games.get(game_id)
-    if not game:
+    match = game_manager.get_match(game_id)
+    if not match:
         raise HTTPException(status_code=404, detail="Game not found")
     
-    if not game.game_started:
+    game = match.current_game
+    if not game or not game.game_started:
         raise HTTPException(status_code=400, detail="Game has not started")
     
     current_player = game.get_current_player()
@@ -236,8 +237,7 @@ async def force_next_turn(game_id: str):
     
     # If new player is AI, trigger their move
     if new_player in game.ai_players:
-        import asyncio
-        asyncio.create_task(game_manager.trigger_ai_moves(game_id))
+        game_manager.schedule_ai_moves(game_id)
     
     return {
         "success": True,
@@ -248,43 +248,102 @@ async def force_next_turn(game_id: str):
 @router.get("/system/health")
 async def system_health():
     """Get system health information"""
+    sample = resource_sampler.latest()
+    if sample is None:
+        return {"status": "starting", "message": "No resource sample yet"}
     try:
         # System info
         boot_time = psutil.boot_time()
         uptime_seconds = time.time() - boot_time
         
-        # CPU info
-        cpu_count = psutil.cpu_count()
-        cpu_percent = psutil.cpu_percent(interval=1)
-        
-        # Memory info
-        memory = psutil.virtual_memory()
-        
-        # Disk info
-        disk = psutil.disk_usage('/')
-        
         return {
             "status": "healthy",
             "uptime_seconds": int(uptime_seconds),
+            "sampled_at": sample["timestamp"],
             "cpu": {
-                "count": cpu_count,
-                "percent": cpu_percent
+                "count": psutil.cpu_count(),
+                "percent": sample["cpu_percent"],
+                "process_percent": sample["process_cpu_percent"]
             },
             "memory": {
-                "total_mb": memory.total // (1024 * 1024),
-                "used_mb": memory.used // (1024 * 1024),
-                "available_mb": memory.available // (1024 * 1024),
-                "percent": memory.percent
+                "total_mb": sample["memory_total_mb"],
+                "used_mb": sample["memory_used_mb"],
+                "percent": sample["memory_percent"],
+                "process_rss_mb": sample["process_rss_mb"]
             },
             "disk": {
-                "total_gb": disk.total // (1024 * 1024 * 1024),
-                "used_gb": disk.used // (1024 * 1024 * 1024),
-                "free_gb": disk.free // (1024 * 1024 * 1024),
-                "percent": (disk.used / disk.total) * 100
-            }
+                "free_gb": sample["disk_free_gb"],
+                "percent": sample["disk_percent"]
+            },
+            "open_sockets": sample["open_sockets"],
+            "loop_lag_ms": sample["loop_lag_ms"]
         }
     except Exception as e:
         return {
             "status": "error",
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+@router.get("/system/loop")
+async def event_loop_report(limit: int = 20):
+    """Event-loop lag over the last minute and the stalls that caused it, ranked by handler, match and AI level"""
+    return loop_monitor.report(limit=limit)
+
+@router.get("/system/resources")
+async def system_resources(window: str = "recent"):
+    """Resource trend series: raw samples for the last 10 minutes ("recent") or per-minute buckets for the last hour ("hour")"""
+    if window not in ("recent", "hour"):
+        raise HTTPException(status_code=400, detail="window must be 'recent' or 'hour'")
+    return {
+        "window": window,
+        "interval_seconds": RESOURCE_SAMPLE_INTERVAL if window == "recent" else HISTORY_BUCKET_SECONDS,
+        "samples": resource_sampler.series(window)
+    }
+
+# ========== PROFILING ==========
+
+@router.post("/profile")
+async def run_profile(seconds: float = 10, interval_ms: float = 5, match_id: Optional[str] = None,
+                      include_idle: bool = False):
+    """Sample the event loop's stacks for N seconds (optionally only while it handles one match)"""
+    if profiler.running:
+        raise HTTPException(status_code=409, detail="A profile capture is already running")
+    loop_thread = threading.get_ident()
+    try:
+        # Sampling runs in a worker thread; the loop keeps serving games (and is what gets sampled)
+        capture = await asyncio.to_thread(profiler.capture, loop_thread, seconds, interval_ms, match_id, include_idle)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile capture is already running")
+    return profiler.summary(capture)
+
+@router.get("/profile")
+async def list_profiles():
+    """Captures kept for download and comparison (oldest first)"""
+    return {
+        "running": profiler.running,
+        "captures": [{key: value for key, value in capture.items() if key != "stacks"}
+                     for capture in profiler.captures.values()]
+    }
+
+@router.get("/profile/compare")
+async def compare_profiles(base: str, target: str, limit: int = 30):
+    """Frames whose share of samples changed most between two captures"""
+    if base not in profiler.captures or target not in profiler.captures:
+        raise HTTPException(status_code=404, detail="Capture not found")
+    return {
+        "base": profiler.summary(profiler.captures[base], limit=0),
+        "target": profiler.summary(profiler.captures[target], limit=0),
+        "frames": profiler.compare(profiler.captures[base], profiler.captures[target], limit=limit)
+    }
+
+@router.get("/profile/{capture_id}")
+async def get_profile(capture_id: str, format: str = "summary", limit: int = 30):
+    """A capture as a summary of its hottest frames, or collapsed stacks for flamegraph.pl/speedscope"""
+    capture = profiler.captures.get(capture_id)
+    if not capture:
+        raise HTTPException(status_code=404, detail="Capture not found")
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed(capture), headers={
+            "Content-Disposition": f'attachment; filename="profile-{capture_id}.folded"'
+        })
+    return profiler.summary(capture, limit=limit)
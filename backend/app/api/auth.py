@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import re
 from datetime import datetime, timezone
 from app.utils.content_filter import content_filter
-from app.utils.auth import auth_utils
+from app.utils.auth import auth_utils, PasswordHashingBusy
 from app.utils.email import email_service
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.models.user import User
 from pydantic import BaseModel, EmailStr
 
@@ -31,8 +32,16 @@ class PasswordResetConfirm(BaseModel):
     token: str
     new_password: str
 
+def _hashing_busy() -> HTTPException:
+    """503 for a request turned away because the password hashing queue is full"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please try again shortly",
+        headers={"Retry-After": "1"}
+    )
+
 @router.post("/register")
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
     """Register a new user with email verification"""
     
     # Validate email format
@@ -65,9 +74,9 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
     
     # Check if user already exists
-    existing_user = db.query(User).filter(
+    existing_user = await db.scalar(select(User).where(
         (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
+    ).limit(1))
     
     if existing_user:
         if existing_user.email == user_data.email:
@@ -82,7 +91,10 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
             )
     
     # Create new user
-    hashed_password = auth_utils.hash_password(user_data.password)
+    try:
+        hashed_password = await auth_utils.hash_password_async(user_data.password)
+    except PasswordHashingBusy:
+        raise _hashing_busy()
     email_verify_token = auth_utils.generate_email_verification_token()
     
     new_user = User(
@@ -95,8 +107,8 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     # Send verification email
     email_sent = email_service.send_verification_email(user_data.email, email_verify_token)
@@ -110,13 +122,18 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     }
 
 @router.post("/login") 
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login with email and password"""
     
     # Find user by email
-    user = db.query(User).filter(User.email == user_data.email.lower()).first()
+    user = await db.scalar(select(User).where(User.email == user_data.email.lower()).limit(1))
+    
+    try:
+        password_ok = user is not None and await auth_utils.verify_password_async(user_data.password, user.hashed_password)
+    except PasswordHashingBusy:
+        raise _hashing_busy()
     
-    if not user or not auth_utils.verify_password(user_data.password, user.hashed_password):
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
@@ -136,10 +153,12 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
     
     # Update last seen
     user.last_seen = datetime.now(timezone.utc)
-    db.commit()
+    await db.commit()
     
     return {
         "message": "Login successful",
+        "access_token": auth_utils.create_access_token(user.id, user.email),
+        "token_type": "bearer",
         "user": {
             "id": user.id,
             "email": user.email,
@@ -191,18 +210,18 @@ async def check_username_availability(username: str):
         return {"available": False, "reason": "Username contains inappropriate content"}
     
     # TODO: Add database check for registered users
-    # registered_user = db.query(User).filter(User.username.ilike(username)).first()
+    # registered_user = await db.scalar(select(User).where(User.username.ilike(username)).limit(1))
     # if registered_user:
     #     return {"available": False, "reason": "Username is already registered"}
     
     return {"available": True}
 
 @router.post("/magic-link")
-async def request_magic_link(request: MagicLinkRequest, db: Session = Depends(get_db)):
+async def request_magic_link(request: MagicLinkRequest, db: AsyncSession = Depends(get_async_db)):
     """Request a magic link for passwordless sign-in"""
     
     # Find user by email
-    user = db.query(User).filter(User.email == request.email.lower()).first()
+    user = await db.scalar(select(User).where(User.email == request.email.lower()).limit(1))
     
     if not user:
         # Don't reveal if email exists for security
@@ -225,7 +244,7 @@ async def request_magic_link(request: MagicLinkRequest, db: Session = Depends(ge
     user.magic_link_token = magic_token
     user.token_expires_at = auth_utils.get_token_expiry(1)  # 1 hour
     
-    db.commit()
+    await db.commit()
     
     # Send magic link email
     email_sent = email_service.send_magic_link_email(request.email, magic_token)
@@ -236,11 +255,11 @@ async def request_magic_link(request: MagicLinkRequest, db: Session = Depends(ge
     }
 
 @router.get("/magic-signin/{token}")
-async def magic_signin(token: str, db: Session = Depends(get_db)):
+async def magic_signin(token: str, db: AsyncSession = Depends(get_async_db)):
     """Sign in using magic link token"""
     
     # Find user with this magic link token
-    user = db.query(User).filter(User.magic_link_token == token).first()
+    user = await db.scalar(select(User).where(User.magic_link_token == token).limit(1))
     
     if not user:
         raise HTTPException(
@@ -252,7 +271,7 @@ async def magic_signin(token: str, db: Session = Depends(get_db)):
     if auth_utils.is_token_expired(user.token_expires_at):
         user.magic_link_token = None
         user.token_expires_at = None
-        db.commit()
+        await db.commit()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Magic link has expired"
@@ -262,10 +281,12 @@ async def magic_signin(token: str, db: Session = Depends(get_db)):
     user.magic_link_token = None
     user.token_expires_at = None
     user.last_seen = datetime.now(timezone.utc)
-    db.commit()
+    await db.commit()
     
     return {
         "message": "Magic link sign-in successful",
+        "access_token": auth_utils.create_access_token(user.id, user.email),
+        "token_type": "bearer",
         "user": {
             "id": user.id,
             "email": user.email,
@@ -275,11 +296,11 @@ async def magic_signin(token: str, db: Session = Depends(get_db)):
     }
 
 @router.post("/password-reset")
-async def request_password_reset(request: PasswordResetRequest, db: Session = Depends(get_db)):
+async def request_password_reset(request: PasswordResetRequest, db: AsyncSession = Depends(get_async_db)):
     """Request password reset email"""
     
     # Find user by email
-    user = db.query(User).filter(User.email == request.email.lower()).first()
+    user = await db.scalar(select(User).where(User.email == request.email.lower()).limit(1))
     
     if not user:
         # Don't reveal if email exists for security
@@ -290,7 +311,7 @@ async def request_password_reset(request: PasswordResetRequest, db: Session = De
     user.password_reset_token = reset_token
     user.token_expires_at = auth_utils.get_token_expiry(24)  # 24 hours
     
-    db.commit()
+    await db.commit()
     
     # Send password reset email
     email_sent = email_service.send_password_reset_email(request.email, reset_token)
@@ -301,11 +322,11 @@ async def request_password_reset(request: PasswordResetRequest, db: Session = De
     }
 
 @router.post("/password-reset-confirm")
-async def confirm_password_reset(request: PasswordResetConfirm, db: Session = Depends(get_db)):
+async def confirm_password_reset(request: PasswordResetConfirm, db: AsyncSession = Depends(get_async_db)):
     """Confirm password reset with new password"""
     
     # Find user with this reset token
-    user = db.query(User).filter(User.password_reset_token == request.token).first()
+    user = await db.scalar(select(User).where(User.password_reset_token == request.token).limit(1))
     
     if not user:
         raise HTTPException(
@@ -317,7 +338,7 @@ async def confirm_password_reset(request: PasswordResetConfirm, db: Session = De
     if auth_utils.is_token_expired(user.token_expires_at):
         user.password_reset_token = None
         user.token_expires_at = None
-        db.commit()
+        await db.commit()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Reset token has expired"
@@ -332,20 +353,23 @@ async def confirm_password_reset(request: PasswordResetConfirm, db: Session = De
         )
     
     # Update password
-    user.hashed_password = auth_utils.hash_password(request.new_password)
+    try:
+        user.hashed_password = await auth_utils.hash_password_async(request.new_password)
+    except PasswordHashingBusy:
+        raise _hashing_busy()
     user.password_reset_token = None
     user.token_expires_at = None
     
-    db.commit()
+    await db.commit()
     
     return {"message": "Password reset successful"}
 
 @router.get("/verify-email/{token}")
-async def verify_email(token: str, db: Session = Depends(get_db)):
+async def verify_email(token: str, db: AsyncSession = Depends(get_async_db)):
     """Verify email address using token"""
     
     # Find user with this verification token
-    user = db.query(User).filter(User.email_verify_token == token).first()
+    user = await db.scalar(select(User).where(User.email_verify_token == token).limit(1))
     
     if not user:
         raise HTTPException(
@@ -365,7 +389,7 @@ async def verify_email(token: str, db: Session = Depends(get_db)):
     user.email_verify_token = None
     user.token_expires_at = None
     
-    db.commit()
+    await db.commit()
     
     return {"message": "Email verified successfully"}
 
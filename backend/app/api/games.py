@@ -1,13 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
 from app.models.game import Game, GamePlayer, GameStatus, GameVisibility
 from app.models.user import User
 from app.schemas.game import CreateGameRequest, JoinGameRequest, GameInfo, PlayerInfo
 from app.websockets.game_manager import game_manager
+from app.core.game_timer import timer_manager
+from app.core.sharding import new_match_id
 import uuid
-import math
-import random
 from typing import List
 
 router = APIRouter()
@@ -78,10 +78,10 @@ async def list_games():
         }
 
 @router.post("/")
-async def create_game(request: CreateGameRequest, db: Session = Depends(get_db)):
+async def create_game(request: CreateGameRequest, db: AsyncSession = Depends(get_async_db)):
     try:
-        # Generate a shorter match ID (6 digits should be plenty)
-        match_id = str(math.floor(100000 + random.random() * 900000))
+        # Generate a shorter match ID (6 digits should be plenty) that hashes onto this shard
+        match_id = new_match_id()
         
         # Create the match in the game manager with proper configuration
         host_name = request.host
@@ -104,12 +104,16 @@ async def create_game(request: CreateGameRequest, db: Session = Depends(get_db))
                 "ai_skill_level": request.ai_skill_level,
                 "ai_fill_to_max": request.ai_fill_to_max,
                 "countdown_minutes": request.countdown_minutes,
-                "games_to_play": request.games_to_play
+                "time_limit_seconds": request.time_limit_seconds,
+                "time_bank_seconds": request.time_bank_seconds,
+                "games_to_play": request.games_to_play,
+                "seed": request.seed
             }
         )
         
-        # Start countdown timer  
-        # match.start_countdown()  # TODO: Implement countdown for matches
+        # Start countdown timer: auto-start or deletion when it runs out
+        match.start_countdown()
+        timer_manager.schedule_countdown(match_id)
         
         print(f"Created configured match {match_id}: {request.name} ({request.games_to_play} games)")
         
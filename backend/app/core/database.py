@@ -1,15 +1,68 @@
+"""
+Database engines and sessions
+The synchronous engine serves migrations, table creation and worker threads (e.g. the
+results writer). Request handlers use the async engine through get_async_db, so a slow
+query parks only its own request instead of stalling every websocket on the event loop.
+"""
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
 
+# Async driver for each sync driver the database_url may name
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(database_url: str):
+    """The same database addressed through its asyncio driver"""
+    url = make_url(database_url)
+    url = url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+    if url.drivername == "postgresql+asyncpg":
+        # asyncpg prepares every statement; keep the prepared ones per connection
+        url = url.update_query_dict({"prepared_statement_cache_size": str(settings.database_statement_cache_size)})
+    return url
+
+def _async_engine_options(url) -> dict:
+    options = {
+        "echo": settings.database_echo,
+        "query_cache_size": settings.database_statement_cache_size,
+    }
+    if url.get_backend_name() == "sqlite":
+        if url.database and url.database != ":memory:":
+            # SQLite has a single writer: concurrent connections would only fail on lock upgrades
+            options.update(poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0,
+                           pool_timeout=settings.database_pool_timeout)
+    else:
+        options.update(
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout,
+            pool_recycle=settings.database_pool_recycle,
+            pool_pre_ping=True,
+        )
+    return options
+
 engine = create_engine(
     settings.database_url,
-    echo=settings.environment == "development"
+    echo=settings.database_echo
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+_async_url = async_database_url(settings.database_url)
+async_engine = create_async_engine(_async_url, **_async_engine_options(_async_url))
+
+# Objects stay readable after commit, so handlers can build responses without another round trip
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -17,4 +70,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,108 +1,112 @@
-import asyncio
-import time
-from typing import Dict, Set
-from app.websockets.game_manager import game_manager
+"""
+Lobby countdowns for matches waiting for players
+When a match's countdown runs out it auto-starts if it has its minimum players and is
+deleted otherwise; players get a countdown_update at each whole minute left. Each match
+holds one timer on game_manager.scheduler (its next minute mark, then the deadline),
+cancelled when the match starts or is removed.
+"""
+
+import logging
+import math
+from app.websockets.game_manager import game_manager, COUNTDOWN_TIMER
 
 class GameTimerManager:
     def __init__(self):
-        self.running = False
-        self.task: asyncio.Task = None
-    
+        self.logger = logging.getLogger("GameTimerManager")
+
     async def start(self):
-        """Start the timer management background task"""
-        if self.running:
-            return
-        
-        self.running = True
-        self.task = asyncio.create_task(self._timer_loop())
-        print("🕒 Game timer manager started")
-    
+        """Schedule the countdowns of matches already loaded (e.g. recovered after a restart)"""
+        for match_id, match in game_manager.active_matches.items():
+            if match.countdown_start_time and not match.match_started:
+                self.schedule_countdown(match_id)
+        self.logger.info("Game timer manager started")
+
     async def stop(self):
-        """Stop the timer management background task"""
-        self.running = False
-        if self.task:
-            self.task.cancel()
-            try:
-                await self.task
-            except asyncio.CancelledError:
-                pass
-        print("🕒 Game timer manager stopped")
-    
-    async def _timer_loop(self):
-        """Main timer loop that checks game countdowns"""
-        while self.running:
-            try:
-                await self._check_game_countdowns()
-                await asyncio.sleep(30)  # Check every 30 seconds
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                print(f"Error in timer loop: {e}")
-                await asyncio.sleep(60)  # Wait longer if there's an error
-    
-    async def _check_game_countdowns(self):
-        """Check all games for expired countdowns"""
-        games_to_remove = []
-        
-        for game_id, game in game_manager.active_games.items():
-            if not game.countdown_start_time:
-                continue
-            
-            if game.is_countdown_expired():
-                if game.can_auto_start():
-                    # Game has minimum players - auto-start it
-                    print(f"⏰ Auto-starting game {game_id} (countdown expired, has min players)")
-                    game.start_game()
-                    
-                    # Notify all players that game auto-started
-                    await game_manager.broadcast_to_game(game_id, {
-                        "type": "game_auto_started",
-                        "data": {
-                            "message": f"Game auto-started! Countdown expired and minimum players ({game.min_players}) reached.",
-                            "game_state": game.get_game_state()
-                        }
-                    })
-                    
-                else:
-                    # Game doesn't have minimum players - mark for deletion
-                    print(f"⏰ Marking game {game_id} for deletion (countdown expired, insufficient players)")
-                    games_to_remove.append(game_id)
-                    
-                    # Notify any connected players that game is being deleted
-                    await game_manager.broadcast_to_game(game_id, {
-                        "type": "game_deleted",
-                        "data": {
-                            "reason": f"Game deleted: countdown expired without reaching minimum players ({game.min_players})",
-                            "redirect_to_lobby": True
-                        }
-                    })
-            
-            else:
-                # Send countdown updates to players
-                remaining = game.get_countdown_remaining()
-                if remaining and remaining % 60 == 0:  # Every minute
-                    minutes_left = remaining // 60
-                    await game_manager.broadcast_to_game(game_id, {
-                        "type": "countdown_update",
-                        "data": {
-                            "minutes_remaining": minutes_left,
-                            "seconds_remaining": remaining,
-                            "can_auto_start": game.can_auto_start(),
-                            "message": f"{minutes_left} minute(s) until auto-start or deletion"
-                        }
-                    })
-        
-        # Remove expired games
-        for game_id in games_to_remove:
-            if game_id in game_manager.active_games:
-                del game_manager.active_games[game_id]
-            
-            # Clean up connections
-            if game_id in game_manager.game_connections:
-                del game_manager.game_connections[game_id]
-            
-            if game_id in game_manager.spectator_connections:
-                del game_manager.spectator_connections[game_id]
+        """Drop pending countdowns; they are rescheduled by start() from each match's countdown_start_time"""
+        for match_id in list(game_manager.active_matches):
+            game_manager.scheduler.cancel((match_id, COUNTDOWN_TIMER))
+        self.logger.info("Game timer manager stopped")
+
+    def schedule_countdown(self, match_id: str):
+        """Schedule the next countdown step of a match whose countdown has started"""
+        match = game_manager.get_match(match_id)
+        if not match or match.match_started:
+            return
+        remaining = match.get_countdown_seconds()
+        if remaining is None:
+            return
+
+        # Next whole minute strictly before the deadline, if any
+        minutes_left = math.ceil(remaining / 60) - 1
+        self._schedule_step(match_id, remaining, minutes_left)
+
+    def _schedule_step(self, match_id: str, remaining: float, minutes_left: int):
+        if minutes_left >= 1:
+            game_manager.scheduler.call_later(remaining - minutes_left * 60, (match_id, COUNTDOWN_TIMER),
+                                              self._countdown_update, match_id, minutes_left)
+        else:
+            game_manager.scheduler.call_later(remaining, (match_id, COUNTDOWN_TIMER),
+                                              self._countdown_expired, match_id)
+
+    async def _countdown_update(self, match_id: str, minutes_left: int):
+        """Fires at each whole minute left on the countdown"""
+        match = game_manager.get_match(match_id)
+        if not match or match.match_started:
+            return
+
+        # Chain the next step off the minute mark rather than the clock, so a late wakeup never repeats a minute
+        self._schedule_step(match_id, match.get_countdown_seconds(), minutes_left - 1)
+
+        await game_manager.broadcast_to_game(match_id, {
+            "type": "countdown_update",
+            "data": {
+                "minutes_remaining": minutes_left,
+                "seconds_remaining": minutes_left * 60,
+                "can_auto_start": match.can_auto_start(),
+                "message": f"{minutes_left} minute(s) until auto-start or deletion"
+            }
+        })
+
+    async def _countdown_expired(self, match_id: str):
+        """Auto-start the match, or delete it if it is still short of players"""
+        match = game_manager.get_match(match_id)
+        if not match or match.match_started:
+            return
+
+        if match.can_auto_start():
+            # Match has minimum players - auto-start it
+            self.logger.info("Auto-starting match %s (countdown expired, has min players)", match_id)
+            match.start_match()
+
+            # Notify all players that the match auto-started
+            await game_manager.broadcast_to_game(match_id, {
+                "type": "game_auto_started",
+                "data": {
+                    "message": f"Game auto-started! Countdown expired and minimum players ({match.min_players}) reached.",
+                    "match_state": match.get_match_state()
+                }
+            })
+            await game_manager.broadcast_to_game(match_id, {
+                "type": "game_state",
+                "data": {}  # Will be personalized in broadcast_to_game
+            })
+            game = match.current_game
+            if game and game.get_current_player() in game.ai_players:
+                game_manager.schedule_ai_moves(match_id)
+
+        else:
+            # Match doesn't have minimum players - delete it
+            self.logger.info("Deleting match %s (countdown expired, insufficient players)", match_id)
+
+            # Notify any connected players that the match is being deleted
+            await game_manager.broadcast_to_game(match_id, {
+                "type": "game_deleted",
+                "data": {
+                    "reason": f"Game deleted: countdown expired without reaching minimum players ({match.min_players})",
+                    "redirect_to_lobby": True
+                }
+            })
+            await game_manager.remove_match(match_id)
 
 # Global timer manager instance
-timer_manager = GameTimerManager()
\ No newline at end of file
+timer_manager = GameTimerManager()
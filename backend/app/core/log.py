@@ -0,0 +1,188 @@
+"""
+Structured logging for the server
+Every record goes through one QueueHandler: the caller only checks level and sampling,
+merges the message arguments and enqueues, and a QueueListener thread formats and writes
+to stdout (and log_file), so disk and terminal I/O never run on the event loop. Records
+carry the match they belong to as a match_id field - bound per task with bind_match() or
+per object with match_logger() - instead of one logger per match. Chatty subsystems are
+sampled below WARNING according to settings.log_sample_rates.
+"""
+
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+# Match the current task is working on; set by bind_match()
+current_match_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_match_id", default=None)
+
+# Records waiting for the writer thread; past this, new records are dropped rather than blocking the loop
+LOG_QUEUE_SIZE = 10000
+
+# LogRecord attributes that are not user-supplied fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "match_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+@contextmanager
+def bind_match(match_id: Optional[str]):
+    """Tag every record logged inside the block (including awaited calls) with match_id"""
+    token = current_match_id.set(match_id)
+    try:
+        yield
+    finally:
+        current_match_id.reset(token)
+
+
+class MatchLogger(logging.LoggerAdapter):
+    """LoggerAdapter whose debug/info return after one level check when disabled (they run per move)"""
+
+    def debug(self, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(msg, *args, **self.process(msg, kwargs)[1])
+
+    def info(self, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(msg, *args, **self.process(msg, kwargs)[1])
+
+
+def match_logger(name: str, match_id: Optional[str], **fields) -> MatchLogger:
+    """Logger for one match's object: shared by name, with match_id (and fields) added to each record"""
+    return MatchLogger(logging.getLogger(name), {"match_id": match_id, **fields})
+
+
+class MatchContextFilter(logging.Filter):
+    """Fill record.match_id from the bound context when the caller did not pass one"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "match_id", None) is None:
+            record.match_id = current_match_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of DEBUG/INFO records per logger-name prefix; WARNING and above always pass"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # Longest prefix first so "GameManager.messages" wins over "GameManager"
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                if rate >= 1 or random.random() < rate:
+                    return True
+                self.dropped += 1
+                return False
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the writer falls behind instead of blocking the caller"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments now so the record shows state as of the call, but leave timestamps,
+        # tracebacks and JSON to the formatter on the writer thread (the stdlib formats here)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, match_id, message and any extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "match_id": getattr(record, "match_id", None),
+            "message": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable line with the match id when there is one"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s%(match_tag)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        match_id = getattr(record, "match_id", None)
+        record.match_tag = f" [{match_id}]" if match_id else ""
+        return super().format(record)
+
+
+def configure_logging():
+    """Route the root logger through the queue; safe to call more than once"""
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = JsonFormatter() if settings.log_format == "json" else TextFormatter()
+    outputs = [logging.StreamHandler(sys.stdout)]
+    if settings.log_file:
+        outputs.append(logging.handlers.WatchedFileHandler(settings.log_file, encoding="utf-8"))
+    for output in outputs:
+        output.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(settings.log_sample_rates))
+    handler.addFilter(MatchContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.log_level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, *outputs, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> Dict:
+    """Records dropped by sampling and by a full queue since startup"""
+    stats = {"sampled_out": 0, "queue_dropped": 0, "queued": 0}
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, DroppingQueueHandler):
+            stats["queue_dropped"] += handler.dropped
+            stats["queued"] += handler.queue.qsize()
+            stats["sampled_out"] += sum(f.dropped for f in handler.filters if isinstance(f, SamplingFilter))
+    return stats
@@ -0,0 +1,263 @@
+"""
+Event-loop lag monitor with slow-callback attribution
+A probe task sleeps LAG_PROBE_INTERVAL at a time and records how late it wakes up: that
+scheduling delay is what every websocket on the loop saw. A watchdog thread notices when
+the probe has been stuck for longer than the threshold and samples the loop thread's
+stack while the stall lasts, so each stall is reported with the code that caused it and
+attributed to the handler, match id, message type and AI level found in that stack.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter as Tally, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.core.metrics import Counter, Histogram
+
+# Seconds between lag probes
+LAG_PROBE_INTERVAL = 0.05
+
+# How often the watchdog thread checks the probe, and the stack samples it keeps per stall
+WATCHDOG_INTERVAL = 0.01
+MAX_SAMPLES_PER_STALL = 50
+
+# Recent stalls kept for the admin API, and per-match totals kept before the smallest are dropped
+RECENT_STALLS = 100
+MAX_TRACKED_MATCHES = 500
+
+# Deepest stack walked per sample
+MAX_STACK_DEPTH = 64
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generic entry points that only route to the code doing the work; the handler is the first app frame past these
+DISPATCH_FRAMES = frozenset({
+    "app.main:websocket_endpoint",
+    "app.main:lobby_websocket_endpoint",
+    "app.core.scheduler:TimerScheduler._fire",
+    "app.websockets.game_manager:GameManager.handle_message",
+    "app.websockets.game_manager:GameManager._dispatch_message",
+})
+
+LOOP_LAG_SECONDS = Histogram("mexican_train_event_loop_lag_seconds", "Event-loop scheduling delay seen by the lag probe",
+                             buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+SLOW_CALLBACKS = Counter("mexican_train_slow_callbacks_total", "Event-loop stalls over the threshold, by attributed handler",
+                         ["handler"])
+
+
+def frame_label(frame) -> str:
+    """module:function for one stack frame, relative to the backend for app code"""
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(APP_DIR):
+        module = os.path.relpath(filename, os.path.dirname(APP_DIR))[:-3].replace(os.sep, ".")
+    else:
+        module = os.path.basename(filename)
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def walk_stack(frame) -> List:
+    """Frames from outermost to innermost (at most MAX_STACK_DEPTH, innermost kept)"""
+    frames = []
+    while frame is not None and len(frames) < MAX_STACK_DEPTH:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def collapse_stack(frames: List) -> str:
+    """Stack in collapsed ("folded") form: outer;...;inner"""
+    return ";".join(frame_label(frame) for frame in frames)
+
+
+def attribute_stack(frames: List) -> Dict:
+    """Handler, match id, message type and AI level found in the app frames of a stack"""
+    attribution = {"handler": None, "match_id": None, "message_type": None, "ai_level": None}
+    for frame in frames:
+        if not frame.f_code.co_filename.startswith(APP_DIR) or frame.f_code.co_filename == __file__:
+            continue
+        if attribution["handler"] is None:
+            label = frame_label(frame)
+            if label not in DISPATCH_FRAMES:
+                attribution["handler"] = label
+        local_vars = frame.f_locals
+        if attribution["match_id"] is None:
+            match_id = local_vars.get("game_id") or local_vars.get("match_id")
+            if isinstance(match_id, str):
+                attribution["match_id"] = match_id
+        if attribution["message_type"] is None and isinstance(local_vars.get("message_type"), str):
+            attribution["message_type"] = local_vars["message_type"]
+        owner = local_vars.get("self")
+        if attribution["ai_level"] is None and hasattr(owner, "ai_skill_level"):
+            attribution["ai_level"] = owner.ai_skill_level
+            if attribution["match_id"] is None:
+                attribution["match_id"] = getattr(owner, "match_id", None) or getattr(owner, "game_id", None)
+    return attribution
+
+
+class LoopMonitor:
+    """Continuous lag measurement plus stack-sampled attribution of stalls"""
+
+    def __init__(self):
+        self.logger = logging.getLogger("LoopMonitor")
+        self.threshold = 0.1
+        self.lags: Deque[Tuple[float, float]] = deque(maxlen=int(60 / LAG_PROBE_INTERVAL))  # (time, lag), last minute
+        self.stalls: Deque[Dict] = deque(maxlen=RECENT_STALLS)
+        self.by_handler: Dict[str, Dict] = {}
+        self.by_match: Dict[str, Dict] = {}
+        self.by_ai_level: Dict[str, Dict] = {}
+        self._heartbeat = time.monotonic()
+        self._pending: List[Tuple[str, Dict, str]] = []  # (collapsed stack, attribution, innermost frame) of the current stall
+        self._lock = threading.Lock()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    async def start(self, threshold_ms: float = 100):
+        self.threshold = threshold_ms / 1000
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._probe())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    # ========== PROBE (event loop) ==========
+
+    async def _probe(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._heartbeat = time.monotonic()
+            expected = loop.time() + LAG_PROBE_INTERVAL
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            lag = max(0.0, loop.time() - expected)
+            self._heartbeat = time.monotonic()
+            self.lags.append((time.time(), lag))
+            LOOP_LAG_SECONDS.observe(lag)
+
+            with self._lock:
+                samples, self._pending = self._pending, []
+            if lag >= self.threshold:
+                self._record_stall(lag, samples)
+
+    # ========== WATCHDOG (own thread) ==========
+
+    def _watch(self):
+        while not self._stop.wait(WATCHDOG_INTERVAL):
+            # The probe wakes every LAG_PROBE_INTERVAL; longer than that plus the threshold means the loop is stuck
+            if time.monotonic() - self._heartbeat < LAG_PROBE_INTERVAL + self.threshold:
+                continue
+            with self._lock:
+                if len(self._pending) >= MAX_SAMPLES_PER_STALL:
+                    continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            try:
+                frames = walk_stack(frame)
+                sample = (collapse_stack(frames), attribute_stack(frames), frame_label(frames[-1]))
+            except Exception as e:
+                self.logger.debug("Stack sample failed: %s", e)
+                continue
+            finally:
+                del frame
+            with self._lock:
+                self._pending.append(sample)
+
+    # ========== RECORDS ==========
+
+    def _record_stall(self, lag: float, samples: List[Tuple[str, Dict, str]]):
+        if samples:
+            # The attribution seen most often during the stall wins; innermost frames show where the time went
+            keys = Tally(tuple(sorted(attribution.items())) for _, attribution, _ in samples)
+            attribution = dict(keys.most_common(1)[0][0])
+            hot_frames = Tally(inner for _, _, inner in samples).most_common(5)
+            stack = Tally(stack for stack, _, _ in samples).most_common(1)[0][0]
+        else:
+            # Stall shorter than a watchdog tick: measured but not attributable
+            attribution = {"handler": None, "match_id": None, "message_type": None, "ai_level": None}
+            hot_frames = []
+            stack = None
+
+        handler = attribution["handler"] or "unattributed"
+        record = {
+            "timestamp": time.time(),
+            "lag_ms": round(lag * 1000, 1),
+            "samples": len(samples),
+            **attribution,
+            "hot_frames": [{"frame": frame, "samples": count} for frame, count in hot_frames],
+            "stack": stack
+        }
+        self.stalls.append(record)
+        SLOW_CALLBACKS.labels(handler).inc()
+        self.logger.warning("Event loop stalled %sms in %s (match %s, message %s)", record['lag_ms'], handler,
+                            attribution['match_id'], attribution['message_type'], extra={"match_id": attribution['match_id']})
+
+        key = f"{handler} [{attribution['message_type']}]" if attribution["message_type"] else handler
+        self._add_total(self.by_handler, key, lag)
+        if attribution["match_id"]:
+            self._add_total(self.by_match, attribution["match_id"], lag)
+            if len(self.by_match) > MAX_TRACKED_MATCHES:
+                del self.by_match[min(self.by_match, key=lambda m: self.by_match[m]["total_ms"])]
+        if attribution["ai_level"] is not None:
+            self._add_total(self.by_ai_level, str(attribution["ai_level"]), lag)
+
+    @staticmethod
+    def _add_total(totals: Dict[str, Dict], key: str, lag: float):
+        entry = totals.setdefault(key, {"stalls": 0, "total_ms": 0.0, "max_ms": 0.0})
+        entry["stalls"] += 1
+        entry["total_ms"] = round(entry["total_ms"] + lag * 1000, 1)
+        entry["max_ms"] = max(entry["max_ms"], round(lag * 1000, 1))
+
+    # ========== READERS ==========
+
+    def lag_summary(self) -> Dict:
+        """Lag percentiles over the last minute of probes"""
+        lags = sorted(lag for _, lag in self.lags)
+        if not lags:
+            return {"probes": 0}
+        def pick(fraction: float) -> float:
+            return round(lags[min(len(lags) - 1, int(len(lags) * fraction))] * 1000, 2)
+        return {
+            "probes": len(lags),
+            "current_ms": round(self.lags[-1][1] * 1000, 2),
+            "p50_ms": pick(0.5),
+            "p99_ms": pick(0.99),
+            "max_ms": round(lags[-1] * 1000, 2)
+        }
+
+    def report(self, limit: int = 20) -> Dict:
+        def top(totals: Dict[str, Dict]) -> List[Dict]:
+            ranked = sorted(totals.items(), key=lambda item: item[1]["total_ms"], reverse=True)[:limit]
+            return [{"key": key, **entry} for key, entry in ranked]
+        return {
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "lag": self.lag_summary(),
+            "recent_stalls": list(self.stalls)[-limit:][::-1],
+            "by_handler": top(self.by_handler),
+            "by_match": top(self.by_match),
+            "by_ai_level": top(self.by_ai_level)
+        }
+
+
+# Global loop monitor instance
+loop_monitor = LoopMonitor()
@@ -0,0 +1,164 @@
+"""
+On-demand sampling profiler for the live process
+A capture samples the event-loop thread's stack from a separate thread every few
+milliseconds for a fixed duration, so gameplay keeps running while it is profiled (the
+cost is one stack walk per sample). Stacks are kept in collapsed form, ready for
+flamegraph.pl or speedscope, and two captures can be compared frame by frame to check
+an optimization. A capture can be scoped to one match, keeping only samples whose
+stack is handling that match.
+"""
+
+import itertools
+import sys
+import threading
+import time
+from collections import Counter as Tally, OrderedDict
+from typing import Dict, List, Optional
+
+from app.core.loop_monitor import attribute_stack, collapse_stack, frame_label, walk_stack
+
+# Limits on one capture
+MAX_PROFILE_SECONDS = 60
+MIN_SAMPLE_INTERVAL_MS = 1
+
+# GIL switch interval while a capture runs (seconds), so samples land where the loop thread really is
+SAMPLING_SWITCH_INTERVAL = 0.0002
+
+# Finished captures kept for download and comparison
+MAX_CAPTURES = 10
+
+# Innermost frames that mean the loop was waiting for I/O rather than running code
+IDLE_FRAMES = ("selectors.py:EpollSelector.select", "selectors.py:KqueueSelector.select",
+               "selectors.py:SelectSelector.select", "selectors.py:PollSelector.select")
+
+
+class ProfilerBusy(Exception):
+    """Raised when a capture is requested while another one is running"""
+
+
+class SamplingProfiler:
+    """One capture at a time of the loop thread's collapsed stacks"""
+
+    def __init__(self):
+        self.captures: "OrderedDict[str, Dict]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._running = threading.Lock()
+
+    def capture(self, thread_id: int, seconds: float, interval_ms: float = 5, match_id: Optional[str] = None,
+                include_idle: bool = False) -> Dict:
+        """Blocking: sample thread_id for seconds and store the capture (run it off the event loop)"""
+        if not self._running.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+            interval = max(interval_ms, MIN_SAMPLE_INTERVAL_MS) / 1000
+            stacks: Tally = Tally()
+            taken = kept = 0
+            started_at = time.time()
+            deadline = time.monotonic() + seconds
+            next_sample = time.monotonic()
+            # A busy loop thread only hands over the GIL every switch interval; by then it has often gone
+            # back to waiting on I/O, which would bias samples towards idle. Hand over sooner while sampling.
+            switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(switch_interval, SAMPLING_SWITCH_INTERVAL))
+            try:
+                while next_sample < deadline:
+                    frame = sys._current_frames().get(thread_id)
+                    if frame is None:
+                        break
+                    frames = walk_stack(frame)
+                    del frame
+                    taken += 1
+                    if (include_idle or frame_label(frames[-1]) not in IDLE_FRAMES) and \
+                            (match_id is None or attribute_stack(frames)["match_id"] == match_id):
+                        stacks[collapse_stack(frames)] += 1
+                        kept += 1
+                    del frames
+
+                    next_sample += interval
+                    delay = next_sample - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_sample = time.monotonic()  # Fell behind: don't burst to catch up
+            finally:
+                sys.setswitchinterval(switch_interval)
+
+            capture_id = str(next(self._ids))
+            self.captures[capture_id] = {
+                "id": capture_id,
+                "started_at": started_at,
+                "seconds": seconds,
+                "interval_ms": interval * 1000,
+                "match_id": match_id,
+                "include_idle": include_idle,
+                "samples_taken": taken,
+                "samples": kept,
+                "stacks": dict(stacks)
+            }
+            while len(self.captures) > MAX_CAPTURES:
+                self.captures.popitem(last=False)
+            return self.captures[capture_id]
+        finally:
+            self._running.release()
+
+    @property
+    def running(self) -> bool:
+        return self._running.locked()
+
+    # ========== OUTPUT ==========
+
+    @staticmethod
+    def collapsed(capture: Dict) -> str:
+        """flamegraph.pl / speedscope input: one "stack count" line per distinct stack"""
+        return "".join(f"{stack} {count}\n" for stack, count in
+                       sorted(capture["stacks"].items(), key=lambda item: item[1], reverse=True))
+
+    @staticmethod
+    def frame_shares(capture: Dict) -> Dict[str, Dict[str, float]]:
+        """Per frame: percentage of samples where it is running (self) or on the stack (total)"""
+        own: Tally = Tally()
+        inclusive: Tally = Tally()
+        for stack, count in capture["stacks"].items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        samples = capture["samples"] or 1
+        return {frame: {"self_pct": round(own[frame] * 100 / samples, 2),
+                        "total_pct": round(inclusive[frame] * 100 / samples, 2)}
+                for frame in inclusive}
+
+    def summary(self, capture: Dict, limit: int = 30) -> Dict:
+        shares = self.frame_shares(capture)
+        top_self = sorted(shares.items(), key=lambda item: item[1]["self_pct"], reverse=True)[:limit]
+        return {
+            **{key: value for key, value in capture.items() if key != "stacks"},
+            "distinct_stacks": len(capture["stacks"]),
+            "top_frames": [{"frame": frame, **share} for frame, share in top_self]
+        }
+
+    def compare(self, base: Dict, target: Dict, limit: int = 30) -> List[Dict]:
+        """Frames whose share of samples changed most from base to target (percentage points)"""
+        base_shares = self.frame_shares(base)
+        target_shares = self.frame_shares(target)
+        empty = {"self_pct": 0.0, "total_pct": 0.0}
+        rows = []
+        for frame in base_shares.keys() | target_shares.keys():
+            before = base_shares.get(frame, empty)
+            after = target_shares.get(frame, empty)
+            rows.append({
+                "frame": frame,
+                "base_self_pct": before["self_pct"],
+                "target_self_pct": after["self_pct"],
+                "self_delta": round(after["self_pct"] - before["self_pct"], 2),
+                "base_total_pct": before["total_pct"],
+                "target_total_pct": after["total_pct"],
+                "total_delta": round(after["total_pct"] - before["total_pct"], 2)
+            })
+        rows.sort(key=lambda row: (abs(row["total_delta"]), abs(row["self_delta"])), reverse=True)
+        return rows[:limit]
+
+
+# Global profiler instance
+profiler = SamplingProfiler()
@@ -0,0 +1,137 @@
+"""
+Background sampling of host and process resources for the admin API
+One task samples CPU, memory, disk, open sockets and event-loop lag every
+RESOURCE_SAMPLE_INTERVAL seconds into a ring buffer, and rolls the samples up into
+per-minute buckets for the last hour. Admin endpoints only read these buffers, so an
+operator refreshing the dashboard never blocks the loop (psutil runs in a worker thread).
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+import psutil
+
+# Seconds between samples; the raw ring buffer covers RECENT_SAMPLES of them (10 minutes)
+RESOURCE_SAMPLE_INTERVAL = 5.0
+RECENT_SAMPLES = 120
+
+# Downsampled history: one bucket per minute for the last hour
+HISTORY_BUCKET_SECONDS = 60
+HISTORY_BUCKETS = 60
+
+# Fields averaged into history buckets; the rest keep their peak
+_AVERAGED_FIELDS = ("cpu_percent", "memory_percent", "process_rss_mb", "disk_percent")
+_PEAK_FIELDS = ("loop_lag_ms", "open_sockets", "websockets")
+
+
+class ResourceSampler:
+    """Fixed-cadence resource samples with an hour of per-minute history"""
+
+    def __init__(self):
+        self.logger = logging.getLogger("ResourceSampler")
+        self.recent: Deque[Dict] = deque(maxlen=RECENT_SAMPLES)
+        self.history: Deque[Dict] = deque(maxlen=HISTORY_BUCKETS)
+        self._bucket: List[Dict] = []
+        self._process = psutil.Process()
+        self._task: Optional[asyncio.Task] = None
+        self._websocket_count: Callable[[], int] = lambda: 0
+
+    async def start(self, websocket_count: Optional[Callable[[], int]] = None):
+        """Start sampling; websocket_count is read on the event loop with each sample"""
+        if websocket_count:
+            self._websocket_count = websocket_count
+        # Prime the CPU counters: cpu_percent(interval=None) reports usage since the previous call
+        await asyncio.to_thread(self._prime)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ========== READERS ==========
+
+    def latest(self) -> Optional[Dict]:
+        """Most recent sample, or None before the first one"""
+        return self.recent[-1] if self.recent else None
+
+    def series(self, window: str = "recent") -> List[Dict]:
+        """Raw samples ("recent", last 10 minutes) or per-minute buckets ("hour")"""
+        if window == "hour":
+            return list(self.history) + ([self._summarize(self._bucket)] if self._bucket else [])
+        return list(self.recent)
+
+    # ========== SAMPLING ==========
+
+    def _prime(self):
+        psutil.cpu_percent(interval=None)
+        self._process.cpu_percent(interval=None)
+
+    def _collect(self) -> Dict:
+        """Runs in a worker thread: every psutil call of a sample"""
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage('/')
+        try:
+            connections = getattr(self._process, "net_connections", self._process.connections)
+            open_sockets = len(connections(kind="inet"))
+        except (psutil.Error, OSError):
+            open_sockets = None
+        return {
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "process_cpu_percent": self._process.cpu_percent(interval=None),
+            "memory_percent": memory.percent,
+            "memory_used_mb": memory.used // (1024 * 1024),
+            "memory_total_mb": memory.total // (1024 * 1024),
+            "process_rss_mb": self._process.memory_info().rss // (1024 * 1024),
+            "disk_percent": round(disk.used / disk.total * 100, 1),
+            "disk_free_gb": disk.free // (1024 * 1024 * 1024),
+            "open_sockets": open_sockets
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # How late the loop wakes us is the scheduling delay every other task saw too
+            expected = loop.time() + RESOURCE_SAMPLE_INTERVAL
+            await asyncio.sleep(RESOURCE_SAMPLE_INTERVAL)
+            lag = max(0.0, loop.time() - expected)
+            try:
+                sample = await asyncio.to_thread(self._collect)
+            except Exception as e:
+                self.logger.error("Resource sample failed: %s", e)
+                continue
+            sample["timestamp"] = int(time.time())
+            sample["loop_lag_ms"] = round(lag * 1000, 1)
+            sample["websockets"] = self._websocket_count()
+            self._record(sample)
+
+    def _record(self, sample: Dict):
+        self.recent.append(sample)
+        if self._bucket and sample["timestamp"] // HISTORY_BUCKET_SECONDS != self._bucket[0]["timestamp"] // HISTORY_BUCKET_SECONDS:
+            self.history.append(self._summarize(self._bucket))
+            self._bucket = []
+        self._bucket.append(sample)
+
+    @staticmethod
+    def _summarize(samples: List[Dict]) -> Dict:
+        """One history bucket: averages of the level fields, peaks of the spiky ones"""
+        bucket = {"timestamp": samples[0]["timestamp"] // HISTORY_BUCKET_SECONDS * HISTORY_BUCKET_SECONDS,
+                  "samples": len(samples)}
+        for field in _AVERAGED_FIELDS:
+            values = [s[field] for s in samples if s.get(field) is not None]
+            bucket[field] = round(sum(values) / len(values), 1) if values else None
+        for field in _PEAK_FIELDS:
+            values = [s[field] for s in samples if s.get(field) is not None]
+            bucket[f"{field}_max"] = max(values) if values else None
+        return bucket
+
+
+# Global sampler instance
+resource_sampler = ResourceSampler()
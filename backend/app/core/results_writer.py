@@ -0,0 +1,257 @@
+"""
+Write-behind persistence of match results
+Finished games and matches are queued as plain records and written by one background
+task: everything that arrives within RESULTS_FLUSH_INTERVAL goes to the database as a
+few bulk statements in one transaction (Game upserts, GamePlayer and GameHistory
+inserts, User counter updates), in a worker thread so gameplay never waits on the
+database. Rows are keyed by the match's record_id (live match ids are reused), and
+players are linked only to the account their access token was verified for. A failed
+batch is rolled back and retried; when the queue is full, producers
+wait up to RESULTS_ENQUEUE_TIMEOUT and the record is dropped (and counted) after that.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, select, update
+
+from app.core.database import SessionLocal
+from app.models.game import Game, GamePlayer, GameStatus, GameVisibility
+from app.models.game_history import GameHistory
+from app.models.user import User
+
+# Records gathered into one batch; the first record of a batch waits at most this long
+RESULTS_FLUSH_INTERVAL = 1.0
+RESULTS_BATCH_SIZE = 500
+
+# Bound on queued records; past it producers wait (backpressure), then drop
+RESULTS_QUEUE_SIZE = 10000
+RESULTS_ENQUEUE_TIMEOUT = 2.0
+
+# Delay before each retry of a failed batch (the last one repeats until the database is back)
+RESULTS_RETRY_DELAYS = [0.5, 1, 2, 5, 10, 30]
+
+
+def _timestamp(seconds: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(seconds, tz=timezone.utc) if seconds else None
+
+
+def _match_row(match, status: GameStatus) -> Dict:
+    """games row for a match (keyed by record_id; "host" is resolved to host_id at write time)"""
+    completed = status == GameStatus.COMPLETED
+    return {
+        "id": match.record_id,
+        "name": match.name,
+        "description": match.description,
+        "host": match.player_accounts.get(match.host),
+        "status": status,
+        "visibility": GameVisibility(match.visibility) if match.visibility in ("public", "private") else GameVisibility.PUBLIC,
+        "max_players": match.max_players,
+        "ai_count": len(match.ai_players),
+        "ai_skill_level": match.ai_skill_level,
+        "time_limit_seconds": match.config.get("time_limit_seconds"),
+        "allow_spectators": match.allow_spectators,
+        "current_round": match.games_played,
+        "game_state": {
+            "match_id": match.match_id,
+            "match_scores": dict(match.match_scores),
+            "games_played": match.games_played,
+            "games_to_play": match.games_to_play,
+            "seed": match.seed
+        },
+        "created_at": _timestamp(match.created_at),
+        "completed_at": _timestamp(match.game_history[-1]["completed_at"]) if completed and match.game_history else None
+    }
+
+
+class ResultsWriter:
+    """Queue of finished games/matches flushed to the database in bulk"""
+
+    def __init__(self):
+        self.logger = logging.getLogger("ResultsWriter")
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=RESULTS_QUEUE_SIZE)
+        self.stats = {"queued": 0, "written": 0, "batches": 0, "retries": 0, "dropped": 0}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the writer after one last attempt at whatever is still queued"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        batch = self._drain(RESULTS_QUEUE_SIZE)
+        if batch:
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                self.logger.error("Dropped %s results at shutdown: %s", len(batch), e)
+
+    # ========== PRODUCERS ==========
+
+    async def record_game(self, match, summary: Dict):
+        """Queue one finished game of a match (call right after complete_current_game)"""
+        await self._put({
+            "kind": "game",
+            "match": _match_row(match, GameStatus.IN_PROGRESS),
+            "game": dict(summary),
+            "winner_account": match.player_accounts.get(summary["winner"])
+        })
+
+    async def record_match(self, match):
+        """Queue a finished match: final Game row, its players and their user counters"""
+        winner = min(match.match_scores.keys(), key=lambda p: match.match_scores[p])
+        await self._put({
+            "kind": "match",
+            "match": _match_row(match, GameStatus.COMPLETED),
+            "players": [{
+                "name": player,
+                "is_ai": player in match.ai_players,
+                "account": None if player in match.ai_players else match.player_accounts.get(player),
+                "score": match.match_scores.get(player, 0)
+            } for player in match.players],
+            "winner": winner
+        })
+
+    async def _put(self, record: Dict):
+        try:
+            await asyncio.wait_for(self.queue.put(record), RESULTS_ENQUEUE_TIMEOUT)
+            self.stats["queued"] += 1
+        except asyncio.TimeoutError:
+            self.stats["dropped"] += 1
+            self.logger.error("Results queue full - dropped %s result for match %s", record['kind'], record['match']['id'])
+
+    # ========== WRITER ==========
+
+    def _drain(self, limit: int) -> List[Dict]:
+        batch = []
+        while len(batch) < limit and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            flush_at = loop.time() + RESULTS_FLUSH_INTERVAL
+            while len(batch) < RESULTS_BATCH_SIZE:
+                batch.extend(self._drain(RESULTS_BATCH_SIZE - len(batch)))
+                remaining = flush_at - loop.time()
+                if len(batch) >= RESULTS_BATCH_SIZE or remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            attempt = 0
+            while True:
+                try:
+                    await asyncio.to_thread(self._write_batch, batch)
+                    break
+                except Exception as e:
+                    delay = RESULTS_RETRY_DELAYS[min(attempt, len(RESULTS_RETRY_DELAYS) - 1)]
+                    attempt += 1
+                    self.stats["retries"] += 1
+                    self.logger.error("Writing %s results failed (attempt %s), retrying in %ss: %s", len(batch), attempt, delay, e)
+                    await asyncio.sleep(delay)
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+
+    def _write_batch(self, batch: List[Dict]):
+        """Runs in a worker thread: the whole batch commits or nothing does"""
+        # Latest row per match wins (a match's final record supersedes its per-game ones)
+        match_rows: Dict[str, Dict] = {}
+        for record in batch:
+            match_rows[record["match"]["id"]] = record["match"]
+
+        accounts = {row["host"] for row in match_rows.values()}
+        for record in batch:
+            if record["kind"] == "game":
+                accounts.add(record["winner_account"])
+            else:
+                accounts.update(player["account"] for player in record["players"])
+        accounts.discard(None)
+
+        with SessionLocal() as session:
+            # Verified accounts that still exist; guests and deleted accounts stay unlinked
+            user_ids = {user_id: user_id for user_id in session.scalars(
+                select(User.id).where(User.id.in_(accounts))
+            )} if accounts else {}
+
+            games = []
+            for row in match_rows.values():
+                game = {key: value for key, value in row.items() if key != "host"}
+                game["host_id"] = user_ids.get(row["host"])
+                games.append(game)
+            self._upsert_games(session, games)
+
+            history = [{
+                "game_id": record["match"]["id"],
+                "round_number": record["game"]["game_number"],
+                "player_scores": record["game"]["scores"],
+                "winner_id": user_ids.get(record["winner_account"]),
+                "completed_at": _timestamp(record["game"]["completed_at"])
+            } for record in batch if record["kind"] == "game"]
+            if history:
+                session.execute(GameHistory.__table__.insert(), history)
+
+            seats = []
+            counters = []
+            for record in batch:
+                if record["kind"] != "match":
+                    continue
+                for index, player in enumerate(record["players"]):
+                    user_id = user_ids.get(player["account"])
+                    seats.append({
+                        "game_id": record["match"]["id"],
+                        "user_id": user_id,
+                        "player_index": index,
+                        "is_ai": player["is_ai"],
+                        "ai_name": player["name"] if player["is_ai"] else None,
+                        "score": player["score"]
+                    })
+                    if user_id is not None:
+                        counters.append({
+                            "uid": user_id,
+                            "won": 1 if player["name"] == record["winner"] else 0,
+                            "score": player["score"]
+                        })
+            if seats:
+                session.execute(GamePlayer.__table__.insert(), seats)
+            if counters:
+                users = User.__table__
+                session.execute(
+                    update(users).where(users.c.id == bindparam("uid")).values(
+                        games_played=users.c.games_played + 1,
+                        games_won=users.c.games_won + bindparam("won"),
+                        total_score=users.c.total_score + bindparam("score")
+                    ),
+                    counters
+                )
+            session.commit()
+
+    def _upsert_games(self, session, rows: List[Dict]):
+        """Insert-or-update games rows in one statement where the database supports it"""
+        if not rows:
+            return
+        table = Game.__table__
+        dialect = session.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            for row in rows:
+                session.merge(Game(**row))
+            return
+        statement = insert(table).values(rows)
+        updated = {column: statement.excluded[column] for column in rows[0] if column not in ("id", "created_at")}
+        session.execute(statement.on_conflict_do_update(index_elements=[table.c.id], set_=updated))
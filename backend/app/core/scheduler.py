@@ -0,0 +1,156 @@
+"""
+Deadline scheduler for per-match timers
+Timers sit in one heap ordered by deadline and a single background task sleeps until
+the earliest one, so timers fire on time, scheduling and cancelling are O(log n) and an
+idle server wakes up for nothing. Each timer is keyed by (match_id, name): scheduling a
+key again replaces its timer, and cancel_match() drops every timer of a match.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.core.log import bind_match
+
+TimerKey = Tuple[str, str]  # (match_id, timer name)
+
+
+class _Timer:
+    __slots__ = ("when", "seq", "key", "callback", "args", "cancelled")
+
+    def __init__(self, when: float, seq: int, key: TimerKey, callback: Callable[..., Awaitable], args: tuple):
+        self.when = when
+        self.seq = seq  # Ties fire in scheduling order
+        self.key = key
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def __lt__(self, other: '_Timer') -> bool:
+        return (self.when, self.seq) < (other.when, other.seq)
+
+
+class TimerScheduler:
+    """Keyed one-shot timers that run coroutine callbacks on the event loop"""
+
+    def __init__(self):
+        self.logger = logging.getLogger("TimerScheduler")
+        self._heap: List[_Timer] = []
+        self._timers: Dict[TimerKey, _Timer] = {}  # key -> live timer
+        self._match_keys: Dict[str, Set[TimerKey]] = {}  # match_id -> keys of its live timers
+        self._cancelled = 0  # Cancelled timers still in the heap (removed lazily)
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._callbacks: Set[asyncio.Task] = set()  # Callbacks still running
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop firing timers; pending ones are dropped and running callbacks cancelled"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._callbacks):
+            task.cancel()
+        self._heap.clear()
+        self._timers.clear()
+        self._match_keys.clear()
+        self._cancelled = 0
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    # ========== SCHEDULING ==========
+
+    def call_later(self, delay: float, key: TimerKey, callback: Callable[..., Awaitable], *args):
+        """Run await callback(*args) after delay seconds, replacing any timer with the same key"""
+        self.call_at(time.monotonic() + max(0.0, delay), key, callback, *args)
+
+    def call_at(self, when: float, key: TimerKey, callback: Callable[..., Awaitable], *args):
+        """Like call_later, with a time.monotonic() deadline"""
+        self.cancel(key)
+        timer = _Timer(when, next(self._seq), key, callback, args)
+        self._timers[key] = timer
+        self._match_keys.setdefault(key[0], set()).add(key)
+        heapq.heappush(self._heap, timer)
+        if self._heap[0] is timer and self._wakeup is not None:
+            self._wakeup.set()  # New earliest deadline
+
+    def cancel(self, key: TimerKey) -> bool:
+        """Drop a pending timer; False if there was none"""
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        timer.cancelled = True
+        self._cancelled += 1
+        self._forget_key(key)
+        if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+            # Mostly tombstones: rebuild rather than let them pile up
+            self._heap = [t for t in self._heap if not t.cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+        return True
+
+    def cancel_match(self, match_id: str):
+        """Drop every pending timer of a match"""
+        for key in list(self._match_keys.get(match_id, ())):
+            self.cancel(key)
+
+    def remaining(self, key: TimerKey) -> Optional[float]:
+        """Seconds until the timer fires, or None if it is not scheduled"""
+        timer = self._timers.get(key)
+        return max(0.0, timer.when - time.monotonic()) if timer else None
+
+    def _forget_key(self, key: TimerKey):
+        keys = self._match_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._match_keys[key[0]]
+
+    # ========== FIRING ==========
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            while self._heap and self._heap[0].cancelled:
+                heapq.heappop(self._heap)
+                self._cancelled -= 1
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0].when - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            timer = heapq.heappop(self._heap)
+            del self._timers[timer.key]
+            self._forget_key(timer.key)
+            # Each callback runs as its own task so a slow one never delays the next deadline
+            task = asyncio.create_task(self._fire(timer))
+            self._callbacks.add(task)
+            task.add_done_callback(self._callbacks.discard)
+
+    async def _fire(self, timer: _Timer):
+        try:
+            with bind_match(timer.key[0]):
+                await timer.callback(*timer.args)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.error("Timer %s failed: %s", timer.key, e)
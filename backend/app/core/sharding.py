@@ -0,0 +1,69 @@
+"""
+Consistent-hash placement of matches onto shard processes
+Each shard runs its own GameManager; the router (app.router) uses the same ring to forward requests
+"""
+
+import bisect
+import hashlib
+import math
+import random
+from typing import List, Optional
+
+from app.core.config import settings
+
+# Virtual nodes per shard - more points keep the key spread even with few shards
+RING_REPLICAS = 128
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent-hash ring over shard base URLs.
+
+    Adding or removing a shard only moves the matches that hashed to its
+    points, so the other shards keep their matches.
+    """
+
+    def __init__(self, nodes: List[str], replicas: int = RING_REPLICAS):
+        self.nodes = list(nodes)
+        self._points: List[int] = []
+        self._owners: List[str] = []
+
+        points = sorted(
+            (_hash(f"{node}#{replica}"), node)
+            for node in self.nodes
+            for replica in range(replicas)
+        )
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key: str) -> str:
+        """Shard that owns a key"""
+        if not self._points:
+            raise ValueError("Hash ring has no shards")
+        position = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[position]
+
+
+shard_ring: Optional[HashRing] = HashRing(settings.shard_urls) if settings.shard_urls else None
+
+
+def is_sharded() -> bool:
+    return shard_ring is not None
+
+
+def owns_match(match_id: str) -> bool:
+    """Whether this process is the shard responsible for a match"""
+    if shard_ring is None:
+        return True
+    return shard_ring.node_for(match_id) == settings.shard_urls[settings.shard_index]
+
+
+def new_match_id() -> str:
+    """Generate a 6-digit match ID that hashes onto this shard"""
+    while True:
+        match_id = str(math.floor(100000 + random.random() * 900000))
+        if owns_match(match_id):
+            return match_id
@@ -0,0 +1,257 @@
+"""
+Shared match state for running GameManager on several nodes
+A StateStore holds each match's serialized state, a lease that names the one node
+allowed to mutate the match, and pub/sub channels the nodes talk over
+(see app.websockets.backplane). RedisStateStore is the production store;
+MemoryStateStore keeps everything in-process so several GameManagers in one
+process can stand in for a multi-node deployment.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional
+
+from app.core.config import settings
+
+# Prefix for every key and channel, so the store can share a Redis database
+KEY_PREFIX = "mt:"
+
+# Called with each text published on a subscribed channel, in publish order
+MessageHandler = Callable[[str], None]
+
+
+def default_node_id() -> str:
+    return settings.node_id or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class StateStore(ABC):
+    """Interface shared by the store backends; a backend must implement every abstract method"""
+
+    def __init__(self, node_id: str):
+        self.node_id = node_id
+
+    # Match state
+    @abstractmethod
+    async def save_match(self, match_id: str, data: bytes):
+        ...
+
+    @abstractmethod
+    async def load_match(self, match_id: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def delete_match(self, match_id: str):
+        ...
+
+    # Leases: only the holder mutates a match; a lease that is not renewed expires
+    @abstractmethod
+    async def acquire_lease(self, match_id: str, ttl: float) -> bool:
+        """Take the lease if it is free (or already ours, which renews it)"""
+
+    @abstractmethod
+    async def renew_lease(self, match_id: str, ttl: float) -> bool:
+        """Extend our lease; False if it expired or another node holds it"""
+
+    @abstractmethod
+    async def release_lease(self, match_id: str):
+        ...
+
+    @abstractmethod
+    async def lease_owner(self, match_id: str) -> Optional[str]:
+        ...
+
+    # Pub/sub
+    @abstractmethod
+    async def publish(self, channel: str, text: str):
+        ...
+
+    @abstractmethod
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        ...
+
+    @abstractmethod
+    async def unsubscribe(self, channel: str):
+        ...
+
+    async def close(self):
+        pass
+
+
+class MemoryBackplane:
+    """State shared by every MemoryStateStore in the process"""
+
+    def __init__(self):
+        self.matches: Dict[str, bytes] = {}
+        self.leases: Dict[str, tuple] = {}  # match_id -> (node_id, expires_at)
+        self.subscribers: Dict[str, Dict['MemoryStateStore', MessageHandler]] = {}
+
+
+class MemoryStateStore(StateStore):
+    """In-process store; stores built on the same MemoryBackplane behave like nodes sharing one Redis"""
+
+    shared_backplane = MemoryBackplane()
+
+    def __init__(self, node_id: str, backplane: MemoryBackplane = None):
+        super().__init__(node_id)
+        self.backplane = backplane or self.shared_backplane
+
+    async def save_match(self, match_id: str, data: bytes):
+        self.backplane.matches[match_id] = data
+
+    async def load_match(self, match_id: str) -> Optional[bytes]:
+        return self.backplane.matches.get(match_id)
+
+    async def delete_match(self, match_id: str):
+        self.backplane.matches.pop(match_id, None)
+
+    async def acquire_lease(self, match_id: str, ttl: float) -> bool:
+        owner = await self.lease_owner(match_id)
+        if owner not in (None, self.node_id):
+            return False
+        self.backplane.leases[match_id] = (self.node_id, time.monotonic() + ttl)
+        return True
+
+    async def renew_lease(self, match_id: str, ttl: float) -> bool:
+        if await self.lease_owner(match_id) != self.node_id:
+            return False
+        self.backplane.leases[match_id] = (self.node_id, time.monotonic() + ttl)
+        return True
+
+    async def release_lease(self, match_id: str):
+        if await self.lease_owner(match_id) == self.node_id:
+            del self.backplane.leases[match_id]
+
+    async def lease_owner(self, match_id: str) -> Optional[str]:
+        lease = self.backplane.leases.get(match_id)
+        if lease is None:
+            return None
+        if lease[1] <= time.monotonic():
+            del self.backplane.leases[match_id]
+            return None
+        return lease[0]
+
+    async def publish(self, channel: str, text: str):
+        # Handlers run on a later loop iteration, like messages arriving from Redis
+        loop = asyncio.get_running_loop()
+        for handler in list(self.backplane.subscribers.get(channel, {}).values()):
+            loop.call_soon(handler, text)
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        self.backplane.subscribers.setdefault(channel, {})[self] = handler
+
+    async def unsubscribe(self, channel: str):
+        handlers = self.backplane.subscribers.get(channel)
+        if handlers is not None:
+            handlers.pop(self, None)
+            if not handlers:
+                del self.backplane.subscribers[channel]
+
+    async def close(self):
+        for channel in [c for c, handlers in self.backplane.subscribers.items() if self in handlers]:
+            await self.unsubscribe(channel)
+
+
+class RedisStateStore(StateStore):
+    """Redis store: match state in plain keys, leases as SET NX PX keys, one pub/sub connection per node"""
+
+    # Compare-and-set scripts so a node never renews or deletes a lease it lost
+    RENEW_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+    RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+    def __init__(self, node_id: str, redis_url: str = None, client=None):
+        super().__init__(node_id)
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(redis_url or settings.redis_url)
+        self.redis = client
+        self.logger = logging.getLogger("RedisStateStore")
+        self.handlers: Dict[str, MessageHandler] = {}
+        self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        self._reader: Optional[asyncio.Task] = None
+        self._renew = self.redis.register_script(self.RENEW_SCRIPT)
+        self._release = self.redis.register_script(self.RELEASE_SCRIPT)
+
+    def _match_key(self, match_id: str) -> str:
+        return f"{KEY_PREFIX}match:{match_id}"
+
+    def _lease_key(self, match_id: str) -> str:
+        return f"{KEY_PREFIX}lease:{match_id}"
+
+    async def save_match(self, match_id: str, data: bytes):
+        await self.redis.set(self._match_key(match_id), data)
+
+    async def load_match(self, match_id: str) -> Optional[bytes]:
+        return await self.redis.get(self._match_key(match_id))
+
+    async def delete_match(self, match_id: str):
+        await self.redis.delete(self._match_key(match_id))
+
+    async def acquire_lease(self, match_id: str, ttl: float) -> bool:
+        key = self._lease_key(match_id)
+        if await self.redis.set(key, self.node_id, nx=True, px=int(ttl * 1000)):
+            return True
+        return await self.renew_lease(match_id, ttl)
+
+    async def renew_lease(self, match_id: str, ttl: float) -> bool:
+        return bool(await self._renew(keys=[self._lease_key(match_id)], args=[self.node_id, int(ttl * 1000)]))
+
+    async def release_lease(self, match_id: str):
+        await self._release(keys=[self._lease_key(match_id)], args=[self.node_id])
+
+    async def lease_owner(self, match_id: str) -> Optional[str]:
+        owner = await self.redis.get(self._lease_key(match_id))
+        return owner.decode("utf-8") if owner is not None else None
+
+    async def publish(self, channel: str, text: str):
+        await self.redis.publish(KEY_PREFIX + channel, text)
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        self.handlers[KEY_PREFIX + channel] = handler
+        await self.pubsub.subscribe(KEY_PREFIX + channel)
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._read_messages())
+
+    async def unsubscribe(self, channel: str):
+        self.handlers.pop(KEY_PREFIX + channel, None)
+        await self.pubsub.unsubscribe(KEY_PREFIX + channel)
+
+    async def _read_messages(self):
+        while True:
+            try:
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error("Pub/sub read failed: %s", e)
+                await asyncio.sleep(1.0)
+                continue
+            if message is None:
+                continue
+            channel = message["channel"].decode("utf-8")
+            handler = self.handlers.get(channel)
+            if handler is not None:
+                data = message["data"]
+                handler(data.decode("utf-8") if isinstance(data, bytes) else data)
+
+    async def close(self):
+        if self._reader:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+        await self.pubsub.aclose()
+        await self.redis.aclose()
+
+
+def create_state_store() -> Optional[StateStore]:
+    """Store selected by settings.state_store; None runs every match in this process only"""
+    if settings.state_store == "redis":
+        return RedisStateStore(default_node_id(), settings.redis_url)
+    if settings.state_store == "memory":
+        return MemoryStateStore(default_node_id())
+    return None
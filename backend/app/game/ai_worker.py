@@ -0,0 +1,48 @@
+"""
+Process pool for AI move decisions
+Scoring runs on a snapshot of the game in a worker process so long searches never block the event loop
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+# Worker processes for AI decisions; leave one core for the event loop
+AI_WORKER_PROCESSES = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# Forkserver where the platform has it (not Windows); spawn otherwise
+AI_WORKER_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_ai_executor() -> ProcessPoolExecutor:
+    """Shared AI worker pool, started on first use"""
+    global _executor
+    if _executor is None:
+        # Forkserver workers start from a clean process instead of a copy of the server's memory,
+        # sockets and threads (fork would duplicate the event loop and the log writer thread)
+        _executor = ProcessPoolExecutor(
+            max_workers=AI_WORKER_PROCESSES,
+            mp_context=multiprocessing.get_context(AI_WORKER_START_METHOD)
+        )
+    return _executor
+
+
+def shutdown_ai_executor():
+    """Stop the worker pool without waiting for decisions still running"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def choose_move_from_snapshot(snapshot: Dict) -> Tuple[int, str, tuple]:
+    """Worker entry point: score the snapshot's moves and return (index of chosen move, reason, RNG state after)"""
+    from app.game.mexican_train import MexicanTrainGame
+
+    game, valid_moves = MexicanTrainGame.from_ai_snapshot(snapshot)
+    chosen = game._apply_strategy(snapshot["ai_player"], valid_moves, snapshot["strategy"])
+    move_index = next(i for i, move in enumerate(valid_moves) if move is chosen)
+    return move_index, chosen['reason'], game.rng.getstate()
@@ -0,0 +1,169 @@
+"""
+Compact tile representation for Mexican Train
+Each tile of a double-N set is a small integer index, and hands/boneyard are int bitmasks
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Yield the indices of the set bits in a mask, lowest first"""
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+
+class TileSet:
+    """Immutable lookup tables for a double-N domino set.
+
+    One instance is shared by every game using the same max_domino, so the
+    Domino objects it hands out are never copied per game.
+    """
+
+    def __init__(self, max_domino: int):
+        from app.game.mexican_train import Domino
+
+        self.max_domino = max_domino
+        self.tiles: List[Domino] = []
+        self.pips: List[Tuple[int, int]] = []
+        self.values: List[int] = []
+        self.index_by_id: Dict[str, int] = {}
+        self.index_by_pips: Dict[Tuple[int, int], int] = {}
+        self.pip_masks: List[int] = [0] * (max_domino + 1)
+        self.double_index: List[int] = [0] * (max_domino + 1)
+        self.double_mask = 0
+
+        for left in range(max_domino + 1):
+            for right in range(left, max_domino + 1):
+                index = len(self.tiles)
+                domino = Domino(left, right, f"{left}-{right}")
+                self.tiles.append(domino)
+                self.pips.append((left, right))
+                self.values.append(left + right)
+                self.index_by_id[domino.id] = index
+                self.index_by_pips[(left, right)] = index
+                self.index_by_pips[(right, left)] = index
+                bit = 1 << index
+                self.pip_masks[left] |= bit
+                self.pip_masks[right] |= bit
+                if left == right:
+                    self.double_index[left] = index
+                    self.double_mask |= bit
+
+        self.size = len(self.tiles)
+        self.full_mask = (1 << self.size) - 1
+
+    def index_of(self, domino) -> Optional[int]:
+        """Resolve a Domino (or client-supplied copy of one) to its tile index"""
+        index = self.index_by_id.get(domino.id)
+        if index is None:
+            index = self.index_by_pips.get((domino.left, domino.right))
+        return index
+
+    def mask_value(self, mask: int) -> int:
+        """Total pip count of every tile in the mask"""
+        return sum(self.values[index] for index in iter_bits(mask))
+
+    def dominoes(self, mask: int) -> List:
+        """Materialize the Domino objects for a mask"""
+        return [self.tiles[index] for index in iter_bits(mask)]
+
+    def serialize(self, mask: int) -> List[Dict]:
+        """JSON-ready list of the tiles in a mask"""
+        return [
+            {"left": left, "right": right, "id": f"{left}-{right}"}
+            for left, right in (self.pips[index] for index in iter_bits(mask))
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_tile_set(max_domino: int) -> TileSet:
+    """Shared TileSet for a double-N set"""
+    return TileSet(max_domino)
+
+
+# (max_domino, mask, open end) -> longest chain length; shared across moves, turns and games
+CHAIN_CACHE_SIZE = 1 << 18
+
+
+@lru_cache(maxsize=CHAIN_CACHE_SIZE)
+def _longest_chain(max_domino: int, mask: int, end: int) -> int:
+    tile_set = get_tile_set(max_domino)
+    candidates = mask & tile_set.pip_masks[end]
+    if not candidates:
+        return 0
+
+    upper_bound = mask.bit_count()
+    best = 0
+    for index in iter_bits(candidates):
+        left, right = tile_set.pips[index]
+        next_end = right if left == end else left
+        length = 1 + _longest_chain(max_domino, mask ^ (1 << index), next_end)
+        if length > best:
+            best = length
+            if best == upper_bound:
+                break
+    return best
+
+
+def longest_chain(tile_set: TileSet, mask: int, start: int) -> int:
+    """Most tiles from mask that can be played in sequence starting from an open end of start.
+
+    Longest trail in the hand's pip multigraph, memoized on (remaining mask, open end).
+    """
+    return _longest_chain(tile_set.max_domino, mask, start)
+
+
+def best_chain(tile_set: TileSet, mask: int, start: int) -> List[Tuple[int, int, int]]:
+    """One longest chain as (tile index, matching end, exposed end) steps, in play order"""
+    chain = []
+    end = start
+    remaining = longest_chain(tile_set, mask, start)
+    while remaining:
+        for index in iter_bits(mask & tile_set.pip_masks[end]):
+            left, right = tile_set.pips[index]
+            next_end = right if left == end else left
+            if _longest_chain(tile_set.max_domino, mask ^ (1 << index), next_end) == remaining - 1:
+                chain.append((index, end, next_end))
+                mask ^= 1 << index
+                end = next_end
+                remaining -= 1
+                break
+    return chain
+
+
+class TileMaskView(Sequence):
+    """Read-only list view over a tile bitmask.
+
+    Lets callers keep using ``len(hand)``, iteration and indexing on hands and
+    the boneyard while the game itself only stores the mask.
+    """
+
+    __slots__ = ("_tile_set", "_mask")
+
+    def __init__(self, tile_set: TileSet, mask: int):
+        self._tile_set = tile_set
+        self._mask = mask
+
+    def __len__(self) -> int:
+        return self._mask.bit_count()
+
+    def __bool__(self) -> bool:
+        return self._mask != 0
+
+    def __iter__(self):
+        tiles = self._tile_set.tiles
+        for index in iter_bits(self._mask):
+            yield tiles[index]
+
+    def __contains__(self, domino) -> bool:
+        index = self._tile_set.index_of(domino)
+        return index is not None and bool(self._mask >> index & 1)
+
+    def __getitem__(self, item):
+        return self._tile_set.dominoes(self._mask)[item]
+
+    def __repr__(self) -> str:
+        return f"TileMaskView({[d.id for d in self]})"
@@ -1,11 +1,58 @@
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Optional, Set, Tuple
+from collections import deque
+from concurrent.futures import BrokenExecutor
+import asyncio
 from dataclasses import dataclass
 from enum import Enum
 import random
-import uuid
 import time
 import logging
+import uuid
 from app.core.ai_config import ai_config
+from app.core.log import match_logger
+from app.core.metrics import AI_THINK_BUCKETS, Counter, Histogram
+from app.game.bitboard import TileMaskView, best_chain, get_tile_set, iter_bits, longest_chain
+
+# Number of patch batches kept for clients catching up before they need a full snapshot
+STATE_PATCH_HISTORY = 64
+
+# Relative cost of each AI tactic; when an offloaded decision misses its deadline the
+# cheapest tactic of the strategy is applied in-process instead
+AI_TACTIC_COST = {
+    "random": 0,
+    "prefer_own_train": 1,
+    "prefer_mexican_train": 1,
+    "prefer_open_trains": 1,
+    "preserve_doubles": 1,
+    "dump_doubles": 1,
+    "maximize_pips": 2,
+    "minimize_pips": 2,
+    "endgame_awareness": 2,
+    "block_opponents": 3,
+    "hand_composition": 3,
+    "chain_length": 10,
+}
+
+# Engine metrics served at /metrics (see app.core.metrics)
+VALID_MOVES_CALLS = Counter("mexican_train_valid_moves_calls_total", "Calls to MexicanTrainGame.get_valid_moves")
+AI_THINK_SECONDS = Histogram("mexican_train_ai_think_seconds", "Time for an AI to choose a move, by strategy and skill level",
+                             ["strategy", "level"], buckets=AI_THINK_BUCKETS)
+AI_FALLBACKS = Counter("mexican_train_ai_fallbacks_total", "Offloaded AI decisions that missed their deadline and used the cheapest tactic")
+
+# Column order of the AI tactic feature matrix
+AI_TACTICS = tuple(AI_TACTIC_COST)
+AI_TACTIC_INDEX = {name: column for column, name in enumerate(AI_TACTICS)}
+
+# (tactic name, weight) pairs -> (weight vector, non-zero columns); strategies are few and rarely edited
+_strategy_weight_cache: Dict[Tuple, Tuple[Tuple[float, ...], Tuple[int, ...]]] = {}
+
+
+def new_seed(seed: Optional[int] = None) -> int:
+    """Seed for a match or game RNG: the configured one, or a fresh one from the OS when unset"""
+    if seed is None:
+        return random.SystemRandom().getrandbits(64)
+    return int(seed)
+
 
 class TrainType(str, Enum):
     PERSONAL = "personal"
@@ -19,7 +66,8 @@ class Domino:
     
     def __post_init__(self):
         if self.id is None:
-            self.id = str(uuid.uuid4())
+            # Same ID the shared TileSet gives this tile, so IDs never depend on creation order
+            self.id = f"{min(self.left, self.right)}-{max(self.left, self.right)}"
     
     def matches(self, value: int) -> bool:
         return self.left == value or self.right == value
@@ -67,6 +115,51 @@ class Train:
         
         return True
 
+class _MoveArrays:
+    """Per-move attribute columns the tactic features are computed from, each gathered on first use"""
+    
+    def __init__(self, tile_set, valid_moves: List[Dict]):
+        self.tile_set = tile_set
+        self.moves = valid_moves
+        self.count = len(valid_moves)
+        self._columns: Dict[str, List] = {}
+    
+    def _column(self, name: str, build) -> List:
+        column = self._columns.get(name)
+        if column is None:
+            column = self._columns[name] = build()
+        return column
+    
+    @property
+    def trains(self) -> List[str]:
+        return self._column("trains", lambda: [move['train'] for move in self.moves])
+    
+    @property
+    def tile_indices(self) -> List[int]:
+        return self._column("tile_indices", lambda: [self.tile_set.index_of(move['domino']) for move in self.moves])
+    
+    @property
+    def values(self) -> List[int]:
+        return self._column("values", lambda: [move['domino'].left + move['domino'].right for move in self.moves])
+    
+    @property
+    def is_double(self) -> List[bool]:
+        return self._column("is_double", lambda: [move['domino'].left == move['domino'].right for move in self.moves])
+    
+    @property
+    def played(self) -> List[int]:
+        """Number each move connects with (flipped moves connect on the right end)"""
+        return self._column("played", lambda: [
+            move['domino'].right if move.get('flipped') else move['domino'].left for move in self.moves
+        ])
+    
+    @property
+    def exposed(self) -> List[int]:
+        """Number left open after each move"""
+        return self._column("exposed", lambda: [
+            move['domino'].left if move.get('flipped') else move['domino'].right for move in self.moves
+        ])
+
 class MexicanTrainMatch:
     """A Mexican Train Match contains multiple games and tracks overall scoring"""
     
@@ -76,7 +169,7 @@ class MexicanTrainMatch:
         self.ai_players: List[str] = []
         self.spectators: List[str] = []
         self.created_at = time.time()
-        self.logger = logging.getLogger(f"MexicanTrainMatch.{match_id}")
+        self.logger = match_logger("MexicanTrainMatch", match_id)
         
         # Match configuration
         self.config = config or {}
@@ -103,14 +196,25 @@ class MexicanTrainMatch:
         self.max_domino = self.config.get("max_domino", 12)  # Double-12 set by default
         self.games_to_play = self.config.get("games_to_play", 13)  # Traditional: 12 down to 0 + bonus rounds
         
+        # Seeded RNG - each game's seed is drawn from it, so one match seed replays the whole match
+        self.seed = new_seed(self.config.get("seed"))
+        self.rng = random.Random(self.seed)
+        
+        # Persisted results are keyed by record_id: match ids are short and reused once a match is gone
+        self.record_id = self.config.get("record_id") or str(uuid.uuid4())
+        self.player_accounts: Dict[str, int] = {}  # player name -> users.id verified from their access token
+        
         # Match state
         self.match_started = False
         self.match_completed = False
         self.current_game_number = 1
         self.games_played = 0
         
-        # NEW: Store all games within the match instead of separate entities
-        self.games: List['MexicanTrainGame'] = []  # All games played in this match
+        # Command log sink (see MexicanTrainGame.event_sink); game events are forwarded with their game number
+        self.event_sink: Optional[Callable[[Dict], None]] = None
+        
+        # Games live inside the match; once finished each is compacted to a summary (see MexicanTrainGame.summarize)
+        self.game_history: List[Dict] = []  # Summaries of completed games, in order
         self.current_game: Optional['MexicanTrainGame'] = None  # Currently active game
         
         # Match scoring - tracks scores across all games
@@ -139,9 +243,11 @@ class MexicanTrainMatch:
             self._add_ai_players_to_max()
             
         self.match_started = True
+        self._log_event("start_match")
         
         # Initialize match scores for all players (including AI)
         self.match_scores = {player: 0 for player in self.players}
+        self.match_stats["games_won_by_player"] = {player: 0 for player in self.players}
         
         # Start first game
         return self.start_next_game()
@@ -158,6 +264,7 @@ class MexicanTrainMatch:
         game_config["game_number"] = self.current_game_number
         game_config["match_id"] = self.match_id
         game_config["verbose"] = self.config.get("verbose", True)
+        game_config["seed"] = self.rng.getrandbits(64)
         
         # Create game and add it to the match's games list
         new_game = MexicanTrainGame(internal_game_id, self.players.copy(), self.max_domino, game_config)
@@ -169,9 +276,9 @@ class MexicanTrainMatch:
         
         if result["success"]:
             self.current_game = new_game
-            self.games.append(new_game)  # Store in match's game list
+            self._attach_game_sink(new_game)
             
-            self.logger.info(f"Started game {self.current_game_number} of {self.games_to_play} in match {self.match_id}")
+            self.logger.info("Started game %s of %s in match %s", self.current_game_number, self.games_to_play, self.match_id)
             return {
                 "success": True,
                 "message": f"Started game {self.current_game_number} of {self.games_to_play}",
@@ -199,14 +306,14 @@ class MexicanTrainMatch:
             self.match_stats["games_won_by_player"][winner] += 1
         
         # Update match statistics
-        game_state = completed_game.get_game_state()
-        self.match_stats["total_dominoes_played"] += game_state.get("dominoes_played", 0)
-        self.match_stats["total_turns_taken"] += game_state.get("turns_taken", 0)
+        summary = completed_game.summarize(self.current_game_number, game_scores)
+        self.match_stats["total_dominoes_played"] += summary["dominoes_played"]
+        self.match_stats["total_turns_taken"] += summary["turns"]
         
         # Track game duration and scoring statistics
-        game_duration = game_state.get("game_duration", 0)
+        game_duration = summary["duration"]
         total_game_score = sum(game_scores.values())
-        max_dominoes_at_end = max([len(game_state.get("player_hands", {}).get(p, [])) for p in game_scores.keys()] or [0])
+        max_dominoes_at_end = max(summary["tiles_left"].values(), default=0)
         
         self.match_stats["most_dominoes_in_hand_at_end"] = max(
             self.match_stats["most_dominoes_in_hand_at_end"], 
@@ -243,9 +350,8 @@ class MexicanTrainMatch:
                 "winner": winner
             }
         
-        # Mark current game as completed (but keep it in the games list)
-        completed_game.completed_at = time.time()
-        completed_game.final_scores = game_scores.copy()
+        # Keep only the summary; the finished game (hands, trains, patch history) is released
+        self.game_history.append(summary)
         
         self.current_game_number += 1
         self.games_played += 1
@@ -253,15 +359,83 @@ class MexicanTrainMatch:
         
         # Check if match is complete
         if self.current_game_number > self.games_to_play:
-            return self._complete_match()
+            result = self._complete_match()
         else:
             # Start next game
-            return self.start_next_game()
+            result = self.start_next_game()
+        self._log_event("complete_game", scores=game_scores)
+        return result
+    
+    def link_account(self, player_name: str, account_id: int) -> bool:
+        """Credit a seat's results to a verified account; the first account to claim a seat keeps it,
+        and an account holds at most one seat"""
+        if player_name not in self.players:
+            return False
+        linked = self.player_accounts.get(player_name)
+        if linked is not None:
+            return linked == account_id
+        if account_id in self.player_accounts.values():
+            return False
+        self.player_accounts[player_name] = account_id
+        self._log_event("link_account", player=player_name, account_id=account_id)
+        return True
+    
+    def _log_event(self, op: str, **fields):
+        """Pass one state-changing match command to the event sink, if any"""
+        if self.event_sink is not None:
+            fields["op"] = op
+            self.event_sink(fields)
+    
+    def _attach_game_sink(self, game: 'MexicanTrainGame'):
+        game_number = self.current_game_number
+        
+        def forward(event: Dict):
+            if self.event_sink is not None:
+                event["game"] = game_number
+                self.event_sink(event)
+        game.event_sink = forward
+    
+    def set_event_sink(self, sink: Optional[Callable[[Dict], None]]):
+        """Start (or stop, with None) sending this match's commands to sink"""
+        self.event_sink = sink
+        if self.current_game:
+            self._attach_game_sink(self.current_game)
+    
+    def __getstate__(self):
+        # Sinks belong to the running server, not to the match state
+        state = self.__dict__.copy()
+        state["event_sink"] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.current_game:
+            self._attach_game_sink(self.current_game)
     
     def is_match_complete(self) -> bool:
         """Check if the match is complete"""
         return self.match_completed or self.games_played >= self.games_to_play
     
+    def start_countdown(self):
+        """Start the lobby countdown: auto-start or deletion when it runs out (see GameTimerManager)"""
+        self.countdown_start_time = time.time()
+        self.logger.info("Match %s countdown started: %s minutes", self.match_id, self.countdown_minutes)
+    
+    def get_countdown_seconds(self) -> Optional[float]:
+        """Exact seconds left on the countdown (None if it never started)"""
+        if not self.countdown_start_time:
+            return None
+        return max(0.0, self.countdown_start_time + self.countdown_minutes * 60 - time.time())
+    
+    def get_countdown_remaining(self) -> Optional[int]:
+        """Get remaining countdown time in whole seconds"""
+        remaining = self.get_countdown_seconds()
+        return int(remaining) if remaining is not None else None
+    
+    def can_auto_start(self) -> bool:
+        """Check if match can auto-start (has minimum players)"""
+        return len(self.players) >= self.min_players and not self.match_started
+    
     def _complete_match(self) -> Dict:
         """Complete the match and determine winner"""
         self.match_completed = True
@@ -275,9 +449,9 @@ class MexicanTrainMatch:
         # Calculate final analytics
         final_analytics = {
             "match_winner": winner,
-            "total_games_played": len(self.games),
+            "total_games_played": len(self.game_history),
             "match_duration_minutes": round(self.match_stats["total_match_duration"] / 60, 2),
-            "average_game_duration": round(self.match_stats["total_match_duration"] / len(self.games) / 60, 2) if self.games else 0,
+            "average_game_duration": round(self.match_stats["total_match_duration"] / len(self.game_history) / 60, 2) if self.game_history else 0,
             "most_games_won": max(self.match_stats["games_won_by_player"].items(), key=lambda x: x[1]),
             "lowest_final_score": min(self.match_scores.items(), key=lambda x: x[1]),
             "highest_final_score": max(self.match_scores.items(), key=lambda x: x[1]),
@@ -307,10 +481,10 @@ class MexicanTrainMatch:
         achievements = []
         
         if self.match_stats["longest_game"]:
-            achievements.append(f"Longest game: Game #{self.match_stats['longest_game']['game_number']} lasting {self.match_stats['longest_game']['duration']:.1f} minutes")
+            achievements.append(f"Longest game: Game #{self.match_stats['longest_game']['game_number']} lasting {self.match_stats['longest_game']['duration'] / 60:.1f} minutes")
         
         if self.match_stats["shortest_game"]:
-            achievements.append(f"Quickest victory: Game #{self.match_stats['shortest_game']['game_number']} in {self.match_stats['shortest_game']['duration']:.1f} minutes")
+            achievements.append(f"Quickest victory: Game #{self.match_stats['shortest_game']['game_number']} in {self.match_stats['shortest_game']['duration'] / 60:.1f} minutes")
         
         if self.match_stats["lowest_scoring_game"]:
             low_game = self.match_stats["lowest_scoring_game"]
@@ -339,22 +513,10 @@ class MexicanTrainMatch:
                 ai_name = ai_names[i]
                 self.ai_players.append(ai_name)
                 self.players.append(ai_name)
-                self.logger.info(f"Added AI player: {ai_name} (Level {self.ai_skill_level})")
+                self.logger.info("Added AI player: %s (Level %s)", ai_name, self.ai_skill_level)
     
     def get_match_state(self, requesting_player: str = None) -> Dict:
         """Get current match state with all games and analytics"""
-        # Build game history from the stored games list
-        game_history = []
-        for i, game in enumerate(self.games):
-            if hasattr(game, 'final_scores'):  # Completed games
-                game_history.append({
-                    "game_number": i + 1,
-                    "scores": game.final_scores,
-                    "winner": min(game.final_scores.keys(), key=lambda p: game.final_scores[p]),
-                    "completed_at": getattr(game, 'completed_at', None),
-                    "duration": game.get_game_state().get("game_duration", 0)
-                })
-        
         return {
             "match_id": self.match_id,
             "name": self.name,
@@ -369,7 +531,7 @@ class MexicanTrainMatch:
             "games_to_play": self.games_to_play,
             "games_played": self.games_played,
             "match_scores": self.match_scores,
-            "game_history": game_history,
+            "game_history": self.game_history,
             "match_statistics": self.match_stats,  # New: Analytics data
             "current_game_state": self.current_game.get_game_state(requesting_player) if self.current_game else None,
             "max_players": self.max_players,
@@ -377,7 +539,8 @@ class MexicanTrainMatch:
             "allow_spectators": self.allow_spectators,
             "visibility": self.visibility,
             "created_at": self.created_at,
-            "total_games": len(self.games)  # New: Total games stored in match
+            "countdown_remaining": self.get_countdown_remaining() if not self.match_started else None,
+            "total_games": len(self.game_history) + (1 if self.current_game else 0)
         }
 
 class MexicanTrainGame:
@@ -386,12 +549,13 @@ class MexicanTrainGame:
         self.players = players
         self.ai_players: List[str] = []  # Track AI players separately
         self.max_domino = max_domino
-        self.logger = logging.getLogger(f"MexicanTrainGame.{game_id}")
-        # Remove old verbose system - now using logging
-        # self.verbose = config.get('verbose', True) if config else True
+        # One shared logger; match games are tagged with their match's id rather than the internal game id
+        self.logger = match_logger("MexicanTrainGame", (config or {}).get("match_id") or game_id, game_id=game_id)
         self.current_round = max_domino
         self.current_player_index = 0
         self.game_started = False  # Track if game has actually started with multiple players
+        self.started_at: Optional[float] = None
+        self.turns_taken = 0
         self.spectators: List[str] = []  # Track spectators (can watch but not play)
         
         # Game configuration
@@ -416,14 +580,49 @@ class MexicanTrainGame:
         self.countdown_start_time = None  # Will be set when countdown starts
         self.auto_start_scheduled = False
         
-        # Game state
+        # Turn clock: each turn gets turn_seconds, then draws on the player's time bank for this game;
+        # when both run out the seat is auto-played (GameManager). A time limit of 0 turns the clock off
+        time_limit = self.config.get("time_limit_seconds")
+        self.turn_seconds = 60 if time_limit is None else time_limit
+        self.time_bank_seconds = self.config.get("time_bank_seconds", 300)
+        self.time_banks: Dict[str, float] = {}  # player -> bank seconds left
+        self.turn_started_at: Optional[float] = None  # Wall-clock start of the current turn
+        self.away_players: Set[str] = set()  # Timed out while disconnected: auto-played every turn until back
+        
+        # Seeded RNG for dealing and AI tie-breaking: same seed + same moves = same game
+        self.seed = new_seed(self.config.get("seed"))
+        self.rng = random.Random(self.seed)
+        
+        # Game state - tiles are indices into the shared TileSet, hands/boneyard are bitmasks
         self.dominoes_per_player = self._calculate_dominoes_per_player()
-        self.boneyard: List[Domino] = []
-        self.player_hands: Dict[str, List[Domino]] = {}
+        self.tile_set = get_tile_set(max_domino)
+        self.hand_masks: Dict[str, int] = {}
+        self.boneyard_mask: int = 0
+        self.draw_pile: List[int] = []  # Shuffled tile indices still in the boneyard, drawn from the end
         self.trains: Dict[str, Train] = {}
         self.mexican_train: Optional[Train] = None
         self.engine_domino: Optional[Domino] = None
         
+        # Train end-value index: pip value -> trains ending on it, kept in sync by _index_train/_set_train_open
+        self.train_end_values: Dict[Tuple[str, Optional[str]], int] = {}
+        self.trains_by_end_value: Dict[int, Dict[Tuple[str, Optional[str]], Train]] = {}
+        self.open_end_mask: int = 0  # Tiles playable on the Mexican train or any open personal train
+        
+        # Per-pip tile counters: tiles already on the table, and tiles in each hand. What a player has
+        # not seen (opponents' hands + boneyard) follows from these without looking at other hands
+        self.table_pip_counts: List[int] = [0] * (max_domino + 1)
+        self.hand_pip_counts: Dict[str, List[int]] = {}
+        
+        # Versioned state stream: sequence-numbered patch batches so clients only receive what changed
+        self.state_seq: int = 0
+        self.snapshot_seq: int = 0  # Clients behind this sequence number need a full snapshot
+        self.state_patches: deque = deque(maxlen=STATE_PATCH_HISTORY)  # (seq, patches) batches
+        self._pending_patches: List[Dict] = []
+        
+        # Command log: when set, every state-changing command is passed here as a compact event
+        # (see app.game.move_log); replaying the events on a game with the same seed rebuilds it
+        self.event_sink: Optional[Callable[[Dict], None]] = None
+        
         # Doubles tracking
         self.unsatisfied_doubles: List[Tuple[str, str]] = []  # List of (train_type, train_owner) with unsatisfied doubles
         self.player_has_played_double: bool = False  # Track if current player played a double this turn
@@ -450,7 +649,7 @@ class MexicanTrainGame:
                 ai_name = ai_names[i]
                 self.ai_players.append(ai_name)
                 self.players.append(ai_name)  # Add to main players list too
-                self.logger.info(f"Added AI player: {ai_name} (Level {self.ai_skill_level})")
+                self.logger.info("Added AI player: %s (Level %s)", ai_name, self.ai_skill_level)
     
     def _calculate_dominoes_per_player(self) -> int:
         player_count = len(self.players)
@@ -463,90 +662,97 @@ class MexicanTrainGame:
         else:
             return 10
     
-    def _create_domino_set(self) -> List[Domino]:
-        dominoes = []
-        for left in range(self.max_domino + 1):
-            for right in range(left, self.max_domino + 1):
-                dominoes.append(Domino(left, right))
-        return dominoes
+    @property
+    def player_hands(self) -> Dict[str, TileMaskView]:
+        """Hands as read-only Domino views over the bitmask core"""
+        return {player: TileMaskView(self.tile_set, mask) for player, mask in self.hand_masks.items()}
+    
+    @property
+    def boneyard(self) -> TileMaskView:
+        """Boneyard as a read-only Domino view over the bitmask core"""
+        return TileMaskView(self.tile_set, self.boneyard_mask)
+    
+    def _create_domino_set(self) -> List[int]:
+        return list(range(self.tile_set.size))
     
     def setup_round(self):
+        tile_set = self.tile_set
+        
         # Create and shuffle dominoes
-        all_dominoes = self._create_domino_set()
-        random.shuffle(all_dominoes)
+        all_tiles = self._create_domino_set()
+        self.rng.shuffle(all_tiles)
         
         # Deal to players first (so we can find highest double in hands)
-        self.player_hands = {}
+        self.hand_masks = {}
         for i, player in enumerate(self.players):
             start_idx = i * self.dominoes_per_player
             end_idx = start_idx + self.dominoes_per_player
-            self.player_hands[player] = all_dominoes[start_idx:end_idx]
+            mask = 0
+            for index in all_tiles[start_idx:end_idx]:
+                mask |= 1 << index
+            self.hand_masks[player] = mask
+        
+        # Remaining dominoes go to boneyard (excluding dealt cards)
+        dealt_count = len(self.players) * self.dominoes_per_player
+        self.draw_pile = all_tiles[dealt_count:]
+        self.boneyard_mask = 0
+        for index in self.draw_pile:
+            self.boneyard_mask |= 1 << index
         
         # Find highest double among all player hands
-        highest_double_value = -1
         starting_player = None
-        engine_domino = None
+        engine_index = None
         
-        for player, hand in self.player_hands.items():
-            for domino in hand:
-                if domino.is_double() and domino.left > highest_double_value:
-                    highest_double_value = domino.left
+        for value in range(self.max_domino, -1, -1):
+            double_bit = 1 << tile_set.double_index[value]
+            for player, mask in self.hand_masks.items():
+                if mask & double_bit:
                     starting_player = player
-                    engine_domino = domino
+                    engine_index = tile_set.double_index[value]
+                    break
+            if engine_index is not None:
+                break
         
-        # If no double found, use the highest value domino
-        if engine_domino is None:
+        if engine_index is not None:
+            # Remove the actual engine domino from player's hand
+            self.hand_masks[starting_player] &= ~(1 << engine_index)
+            self.current_round = tile_set.pips[engine_index][0]
+            self.logger.debug("Engine: %s-%s from %s's hand", self.current_round, self.current_round, starting_player)
+        else:
+            # No double dealt - the highest value domino decides the engine and starting player
             highest_value = -1
-            for player, hand in self.player_hands.items():
-                for domino in hand:
-                    total_value = domino.left + domino.right
-                    if total_value > highest_value:
-                        highest_value = total_value
+            for player, mask in self.hand_masks.items():
+                for index in iter_bits(mask):
+                    if tile_set.values[index] > highest_value:
+                        highest_value = tile_set.values[index]
                         starting_player = player
                         # Use the higher end as the engine value
-                        engine_value = max(domino.left, domino.right)
-                        engine_domino = Domino(engine_value, engine_value)  # Create a double
-        
-        # Set engine domino and current round value
-        if engine_domino:
-            if engine_domino.is_double():
-                self.current_round = engine_domino.left
-                self.engine_domino = engine_domino
-                # Remove the actual engine domino from player's hand
-                if starting_player:
-                    if engine_domino in self.player_hands[starting_player]:
-                        self.player_hands[starting_player].remove(engine_domino)
-                    else:
-                        self.logger.warning(f"Engine domino {engine_domino.left}-{engine_domino.right} not found in {starting_player}'s hand")
-                    self.logger.debug(f"Engine: {engine_domino.left}-{engine_domino.right} from {starting_player}'s hand")
+                        self.current_round = max(tile_set.pips[index])
+            
+            if starting_player is None:
+                # Fallback to double-12
+                self.current_round = self.max_domino
+                self.logger.debug("Engine: %s-%s (fallback)", self.max_domino, self.max_domino)
             else:
-                # Create a double from highest single domino
-                self.current_round = max(engine_domino.left, engine_domino.right)
-                self.engine_domino = Domino(self.current_round, self.current_round)
-                self.logger.debug(f"Engine: {self.current_round}-{self.current_round} (no doubles found)")
-        else:
-            # Fallback to double-12
-            self.current_round = self.max_domino
-            self.engine_domino = Domino(self.max_domino, self.max_domino)
-            self.logger.debug(f"Engine: {self.max_domino}-{self.max_domino} (fallback)")
+                self.logger.debug("Engine: %s-%s (no doubles found)", self.current_round, self.current_round)
+            
+            # The engine double is not in any hand, so it has to come out of the boneyard
+            engine_index = tile_set.double_index[self.current_round]
+            if self.boneyard_mask >> engine_index & 1:
+                self.boneyard_mask &= ~(1 << engine_index)
+                self.draw_pile.remove(engine_index)
+            else:
+                self.logger.warning("Engine domino %s-%s not found in boneyard", self.current_round, self.current_round)
+        
+        self.engine_domino = tile_set.tiles[engine_index]
         
         # Set starting player
         if starting_player:
             self.current_player_index = self.players.index(starting_player)
-            self.logger.info(f"Starting player: {starting_player} (had the highest double/value)")
+            self.logger.info("Starting player: %s (had the highest double/value)", starting_player)
         else:
             self.current_player_index = 0
-            self.logger.info(f"Starting player: {self.players[0]} (default)")
-        
-        # Remaining dominoes go to boneyard (excluding dealt cards)
-        dealt_count = len(self.players) * self.dominoes_per_player
-        self.boneyard = all_dominoes[dealt_count:]
-        
-        # Remove engine domino from boneyard if it wasn't from a player's hand
-        if not starting_player and self.engine_domino and self.engine_domino in self.boneyard:
-            self.boneyard.remove(self.engine_domino)
-        elif not starting_player and self.engine_domino:
-            self.logger.warning(f"Engine domino {self.engine_domino.left}-{self.engine_domino.right} not found in boneyard")
+            self.logger.info("Starting player: %s (default)", self.players[0])
         
         # Initialize trains
         self.trains = {}
@@ -556,96 +762,224 @@ class MexicanTrainGame:
         # Initialize Mexican Train (always open to all players)
         self.mexican_train = Train(TrainType.MEXICAN, None, [])
         self.mexican_train.is_open = True  # Mexican train is always open
+        
+        self._rebuild_train_index()
+        self._rebuild_pip_counts()
+        self._invalidate_state_patches()
+        
+        self.time_banks = {player: float(self.time_bank_seconds or 0) for player in self.players}
+        self.turn_started_at = time.time()
     
     def get_current_player(self) -> str:
         return self.players[self.current_player_index]
     
-    def get_valid_moves(self, player_id: str) -> List[Dict]:
+    def _train_required_value(self, train: Train) -> int:
+        """Pip value a domino must match to extend this train"""
+        return train.get_end_value() if train.dominoes else self.current_round
+    
+    def _playable_trains(self, player_id: str) -> List[Tuple[str, Optional[str], Train]]:
+        """Trains the player may currently extend, as (train_type, train_owner, train)"""
+        if self.has_unsatisfied_doubles():
+            # Only allow moves on trains that have unsatisfied doubles
+            trains = []
+            for train_type, train_owner in self.unsatisfied_doubles:
+                if train_type == "mexican":
+                    if self.mexican_train:
+                        trains.append(("mexican", None, self.mexican_train))
+                elif train_type == "personal" and train_owner in self.trains:
+                    trains.append(("personal", train_owner, self.trains[train_owner]))
+            return trains
+        
+        # Personal train (always can play on your own train), open opponent trains, then Mexican train
+        trains = []
+        if player_id in self.trains:
+            trains.append(("personal", player_id, self.trains[player_id]))
+        for train_owner, train in self.trains.items():
+            if train_owner != player_id and train.is_open:
+                trains.append(("personal", train_owner, train))
+        if self.mexican_train:
+            trains.append(("mexican", None, self.mexican_train))
+        return trains
+    
+    def _moves_for_mask(self, mask: int, trains: List[Tuple[str, Optional[str], Train]]) -> List[Dict]:
+        """Build move dicts for every tile in mask against the given trains"""
+        tile_set = self.tile_set
+        targets = [(train_type, train_owner, tile_set.pip_masks[self._train_required_value(train)])
+                   for train_type, train_owner, train in trains]
+        
+        playable = 0
+        for _, _, pip_mask in targets:
+            playable |= pip_mask
+        
         moves = []
-        hand = self.player_hands.get(player_id, [])
+        for index in iter_bits(mask & playable):
+            bit = 1 << index
+            domino = tile_set.tiles[index]
+            for train_type, train_owner, pip_mask in targets:
+                if pip_mask & bit:
+                    moves.append({
+                        "domino": domino,
+                        "train": train_type,
+                        "train_owner": train_owner
+                    })
+        return moves
+    
+    # ========== UNSEEN TILE COUNTERS ==========
+    
+    def _pip_counts(self, mask: int) -> List[int]:
+        return [(mask & number_mask).bit_count() for number_mask in self.tile_set.pip_masks]
+    
+    def _rebuild_pip_counts(self):
+        """Recount from the hands and boneyard (round setup, late joins)"""
+        in_hand_or_boneyard = self.boneyard_mask
+        for mask in self.hand_masks.values():
+            in_hand_or_boneyard |= mask
+        self.table_pip_counts = self._pip_counts(self.tile_set.full_mask & ~in_hand_or_boneyard)
+        self.hand_pip_counts = {player: self._pip_counts(mask) for player, mask in self.hand_masks.items()}
+    
+    def _shift_pip_counts(self, counts: List[int], tile_index: int, delta: int):
+        left, right = self.tile_set.pips[tile_index]
+        counts[left] += delta
+        if right != left:
+            counts[right] += delta
+    
+    def hand_count(self, player_id: str) -> int:
+        """Tiles in player_id's hand (public: every client sees the counts)"""
+        return self.hand_masks.get(player_id, 0).bit_count()
+    
+    def boneyard_count(self) -> int:
+        return self.boneyard_mask.bit_count()
+    
+    def unseen_pip_count(self, player_id: str, number: int) -> int:
+        """Tiles showing number that player_id has not seen (in opponents' hands or the boneyard)"""
+        hand_counts = self.hand_pip_counts.get(player_id)
+        in_hand = hand_counts[number] if hand_counts else 0
+        return self.max_domino + 1 - self.table_pip_counts[number] - in_hand
+    
+    # ========== TRAIN END-VALUE INDEX ==========
+    
+    def _rebuild_train_index(self):
+        """Rebuild the end-value index from scratch (round setup)"""
+        self.train_end_values = {}
+        self.trains_by_end_value = {}
+        for owner, train in self.trains.items():
+            self._index_train("personal", owner, train)
+        if self.mexican_train:
+            self._index_train("mexican", None, self.mexican_train)
+        self._refresh_open_end_mask()
+    
+    def _index_train(self, train_type: str, train_owner: Optional[str], train: Train):
+        """Move a train to the bucket for its current end value"""
+        key = (train_type, train_owner if train_type == "personal" else None)
+        new_value = self._train_required_value(train)
+        old_value = self.train_end_values.get(key)
+        if old_value == new_value:
+            return
         
-        # If there are unsatisfied doubles, player can only play on those trains
+        if old_value is not None:
+            bucket = self.trains_by_end_value[old_value]
+            del bucket[key]
+            if not bucket:
+                del self.trains_by_end_value[old_value]
+        self.trains_by_end_value.setdefault(new_value, {})[key] = train
+        self.train_end_values[key] = new_value
+        
+        if train_type == "mexican" or train.is_open:
+            self._refresh_open_end_mask()
+    
+    def _set_train_open(self, player_id: str, is_open: bool):
+        """Open or close a personal train, keeping the open-end mask in sync"""
+        train = self.trains.get(player_id)
+        if train and train.is_open != is_open:
+            train.is_open = is_open
+            self._refresh_open_end_mask()
+            self._record_patch("train_open", train_owner=player_id, is_open=is_open)
+    
+    def _refresh_open_end_mask(self):
+        pip_masks = self.tile_set.pip_masks
+        mask = 0
+        for value, bucket in self.trains_by_end_value.items():
+            for (train_type, _), train in bucket.items():
+                if train_type == "mexican" or train.is_open:
+                    mask |= pip_masks[value]
+                    break
+        self.open_end_mask = mask
+    
+    def _playable_mask(self, player_id: str) -> int:
+        """Every tile the player could legally play right now, as a mask over the full set"""
+        pip_masks = self.tile_set.pip_masks
         if self.has_unsatisfied_doubles():
-            for domino in hand:
-                moves.extend(self._get_moves_for_domino_doubles_only(player_id, domino))
-        else:
-            # Normal play - can play anywhere
-            for domino in hand:
-                moves.extend(self._get_moves_for_domino(player_id, domino))
+            mask = 0
+            for _, _, train in self._playable_trains(player_id):
+                mask |= pip_masks[self._train_required_value(train)]
+            return mask
+        
+        mask = self.open_end_mask
+        own_value = self.train_end_values.get(("personal", player_id))
+        if own_value is not None:
+            mask |= pip_masks[own_value]
+        return mask
+    
+    def _indexed_moves(self, player_id: str, mask: int) -> List[Dict]:
+        """Moves for the tiles in mask, read from the end-value index (ignores double restrictions)"""
+        tile_set = self.tile_set
+        own_value = self.train_end_values.get(("personal", player_id))
+        playable = self.open_end_mask
+        if own_value is not None:
+            playable |= tile_set.pip_masks[own_value]
         
+        moves = []
+        for index in iter_bits(mask & playable):
+            left, right = tile_set.pips[index]
+            domino = tile_set.tiles[index]
+            for value in ((left,) if left == right else (left, right)):
+                for (train_type, train_owner), train in self.trains_by_end_value.get(value, {}).items():
+                    if train_type == "mexican" or train_owner == player_id or train.is_open:
+                        moves.append({
+                            "domino": domino,
+                            "train": train_type,
+                            "train_owner": train_owner
+                        })
         return moves
     
+    def has_valid_moves(self, player_id: str) -> bool:
+        """Cheap check for whether the player has any legal move"""
+        return bool(self.hand_masks.get(player_id, 0) & self._playable_mask(player_id))
+    
+    def get_valid_moves(self, player_id: str) -> List[Dict]:
+        VALID_MOVES_CALLS.inc()
+        hand = self.hand_masks.get(player_id, 0)
+        
+        # If there are unsatisfied doubles, player can only play on those trains
+        if self.has_unsatisfied_doubles():
+            return self._moves_for_mask(hand, self._playable_trains(player_id))
+        
+        # Normal play - intersect the hand with the end-value index
+        return self._indexed_moves(player_id, hand)
+    
     def get_valid_moves_for_domino(self, player_id: str, domino: Domino) -> List[Dict]:
         """Get valid moves for a specific domino"""
         # Verify the domino is in the player's hand
-        hand = self.player_hands.get(player_id, [])
-        domino_in_hand = None
-        for d in hand:
-            if d.id == domino.id:
-                domino_in_hand = d
-                break
-        
-        if not domino_in_hand:
-            self.logger.debug(f"Domino {domino.left}-{domino.right} (ID: {domino.id}) not found in {player_id}'s hand")
+        index = self.tile_set.index_by_id.get(domino.id)
+        if index is None or not self.hand_masks.get(player_id, 0) >> index & 1:
+            self.logger.debug("Domino %s-%s (ID: %s) not found in %s's hand", domino.left, domino.right, domino.id, player_id)
             return []
         
-        return self._get_moves_for_domino(player_id, domino_in_hand)
+        return self._get_moves_for_domino(player_id, self.tile_set.tiles[index])
     
     def _get_moves_for_domino(self, player_id: str, domino: Domino) -> List[Dict]:
         """Helper method to get all valid moves for a specific domino"""
-        moves = []
-        
-        # Check personal train (always can play on your own train)
-        if self._can_play_on_train(domino, self.trains[player_id], self.current_round):
-            moves.append({
-                "domino": domino,
-                "train": "personal", 
-                "train_owner": player_id
-            })
-        
-        # Check other players' trains (only if they're open)
-        for train_owner, train in self.trains.items():
-            if train_owner != player_id and train.is_open:
-                if self._can_play_on_train(domino, train, self.current_round):
-                    moves.append({
-                        "domino": domino,
-                        "train": "personal",
-                        "train_owner": train_owner
-                    })
-        
-        # Check Mexican train  
-        if self.mexican_train and self._can_play_on_train(domino, self.mexican_train, self.current_round):
-            moves.append({
-                "domino": domino,
-                "train": "mexican",
-                "train_owner": None
-            })
-        
-        return moves
+        index = self.tile_set.index_of(domino)
+        if index is None:
+            return []
+        return self._indexed_moves(player_id, 1 << index)
     
     def _get_moves_for_domino_doubles_only(self, player_id: str, domino: Domino) -> List[Dict]:
         """Get valid moves for a domino when there are unsatisfied doubles (restricted to double trains only)"""
-        moves = []
-        
-        # Only allow moves on trains that have unsatisfied doubles
-        for train_type, train_owner in self.unsatisfied_doubles:
-            if train_type == "mexican":
-                if self.mexican_train and self._can_play_on_train(domino, self.mexican_train, self.current_round):
-                    moves.append({
-                        "domino": domino,
-                        "train": "mexican",
-                        "train_owner": None
-                    })
-            elif train_type == "personal" and train_owner in self.trains:
-                train = self.trains[train_owner]
-                if self._can_play_on_train(domino, train, self.current_round):
-                    moves.append({
-                        "domino": domino,
-                        "train": "personal",
-                        "train_owner": train_owner
-                    })
-        
-        return moves
+        index = self.tile_set.index_of(domino)
+        if index is None:
+            return []
+        return self._moves_for_mask(1 << index, self._playable_trains(player_id))
     
     def _can_play_on_train(self, domino: Domino, train: Train, engine_value: int) -> bool:
         if not train.dominoes:
@@ -655,20 +989,29 @@ class MexicanTrainGame:
             # Must match end of train
             return domino.matches(train.get_end_value())
     
-    async def make_ai_move(self, ai_player_name: str) -> Dict:
-        """AI makes a move automatically using strategy based on skill level"""
-        import random
+    async def make_ai_move(self, ai_player_name: str, deadline: Optional[float] = None) -> Dict:
+        """AI makes a move automatically using strategy based on skill level
         
-        self.logger.debug(f"AI PLAYER {ai_player_name} MAKING MOVE (Level {self.ai_skill_level})")
+        With a deadline (seconds) the decision runs on the AI worker pool so the event loop
+        stays free; without one it is computed in-process (headless runners).
+        """
+        self.logger.debug("AI PLAYER %s MAKING MOVE (Level %s)", ai_player_name, self.ai_skill_level)
         
         # Get all valid moves for the AI player
         valid_moves = self.get_valid_moves(ai_player_name)
-        self.logger.debug(f"Found {len(valid_moves)} valid moves")
+        self.logger.debug("Found %s valid moves", len(valid_moves))
         
         if valid_moves:
             # Choose move based on AI skill level strategy
-            chosen_move = self._choose_ai_move(ai_player_name, valid_moves)
-            self.logger.debug(f"AI chose: {chosen_move['domino'].left}-{chosen_move['domino'].right} on {chosen_move['train']} train ({chosen_move.get('reason', 'no reason given')})")
+            started = time.perf_counter()
+            if deadline is None:
+                chosen_move = self._choose_ai_move(ai_player_name, valid_moves)
+            else:
+                chosen_move = await self._choose_ai_move_offloaded(ai_player_name, valid_moves, deadline)
+            strategy = ai_config.get_strategy(self.ai_skill_level)
+            AI_THINK_SECONDS.labels(strategy.get('name', 'unknown') if strategy else 'none',
+                                    str(self.ai_skill_level)).observe(time.perf_counter() - started)
+            self.logger.debug("AI chose: %s-%s on %s train (%s)", chosen_move['domino'].left, chosen_move['domino'].right, chosen_move['train'], chosen_move.get('reason', 'no reason given'))
             
             # Make the move
             result = self.make_move(
@@ -679,19 +1022,19 @@ class MexicanTrainGame:
             )
             
             if result['success']:
-                self.logger.debug(f"AI successfully played domino")
+                self.logger.debug("AI successfully played domino")
             else:
-                self.logger.debug(f"AI failed to play: {result.get('error')}")
+                self.logger.debug("AI failed to play: %s", result.get('error'))
             
             return result
         else:
             # No valid moves, must draw from boneyard
-            self.logger.debug(f"No valid moves, drawing from boneyard")
+            self.logger.debug("No valid moves, drawing from boneyard")
             draw_result = self.draw_from_boneyard(ai_player_name)
             
             if draw_result['success'] and draw_result.get('can_play_drawn'):
                 # AI drew a domino they can play - make the move immediately
-                self.logger.debug(f"Drew domino: {draw_result['domino']['left']}-{draw_result['domino']['right']}")
+                self.logger.debug("Drew domino: %s-%s", draw_result['domino']['left'], draw_result['domino']['right'])
                 
                 drawn_domino = Domino(
                     draw_result['domino']['left'],
@@ -704,8 +1047,8 @@ class MexicanTrainGame:
                 
                 if new_valid_moves:
                     # Pick a move and play it
-                    chosen_move = random.choice(new_valid_moves)
-                    self.logger.debug(f"AI playing drawn domino on {chosen_move['train']} train")
+                    chosen_move = self.rng.choice(new_valid_moves)
+                    self.logger.debug("AI playing drawn domino on %s train", chosen_move['train'])
                     
                     result = self.make_move(
                         ai_player_name,
@@ -715,12 +1058,12 @@ class MexicanTrainGame:
                     )
                     
                     if result['success']:
-                        self.logger.debug(f"AI played drawn domino")
+                        self.logger.debug("AI played drawn domino")
                     return result
             
             # Either draw failed, couldn't play drawn domino, or turn was already passed
             # The draw_from_boneyard method handles all the turn passing logic
-            self.logger.debug(f"AI draw completed: {draw_result.get('message', 'Draw handled')}")
+            self.logger.debug("AI draw completed: %s", draw_result.get('message', 'Draw handled'))
             return draw_result
     
     def _choose_ai_move(self, ai_player_name: str, valid_moves: List[Dict]) -> Dict:
@@ -730,12 +1073,95 @@ class MexicanTrainGame:
         
         if not strategy:
             # Fallback to random if no strategy configured
-            chosen = random.choice(valid_moves)
+            chosen = self.rng.choice(valid_moves)
             chosen['reason'] = 'no strategy configured - random fallback'
             return chosen
         
         return self._apply_strategy(ai_player_name, valid_moves, strategy)
     
+    async def _choose_ai_move_offloaded(self, ai_player_name: str, valid_moves: List[Dict], deadline: float) -> Dict:
+        """Choose a move on the AI worker pool, falling back to the cheapest tactic if it misses the deadline"""
+        from app.game.ai_worker import get_ai_executor, choose_move_from_snapshot, shutdown_ai_executor
+        
+        strategy = ai_config.get_strategy(self.ai_skill_level)
+        if not strategy or not strategy.get('tactics'):
+            return self._choose_ai_move(ai_player_name, valid_moves)
+        
+        snapshot = self.get_ai_snapshot(ai_player_name, valid_moves, strategy)
+        loop = asyncio.get_running_loop()
+        try:
+            move_index, reason, rng_state = await asyncio.wait_for(
+                loop.run_in_executor(get_ai_executor(), choose_move_from_snapshot, snapshot),
+                timeout=deadline
+            )
+        except (asyncio.TimeoutError, BrokenExecutor) as e:
+            if isinstance(e, BrokenExecutor):
+                shutdown_ai_executor()  # A fresh pool is started on the next decision
+            self.logger.warning("AI decision for %s missed its deadline (%r), using fallback tactic", ai_player_name, e)
+            AI_FALLBACKS.inc()
+            return self._choose_fallback_move(ai_player_name, valid_moves, strategy)
+        
+        self.rng.setstate(rng_state)  # Keep the RNG stream identical to an in-process decision
+        chosen = valid_moves[move_index]
+        chosen['reason'] = reason
+        return chosen
+    
+    def _choose_fallback_move(self, ai_player_name: str, valid_moves: List[Dict], strategy: Dict) -> Dict:
+        """Score moves with only the cheapest tactic the strategy uses"""
+        cheapest = min(strategy['tactics'], key=lambda t: AI_TACTIC_COST.get(t['name'], len(AI_TACTIC_COST)))
+        fallback_strategy = {
+            'name': f"{strategy.get('name', 'Unknown')} (fallback)",
+            'tactics': [cheapest]
+        }
+        return self._apply_strategy(ai_player_name, valid_moves, fallback_strategy)
+    
+    def get_ai_snapshot(self, ai_player_name: str, valid_moves: List[Dict], strategy: Dict) -> Dict:
+        """Compact, picklable view of what the AI tactics read, for scoring in another process
+        
+        Only the AI's own hand is sent; opponents and the boneyard appear as counts, as they do to clients.
+        """
+        return {
+            "game_id": self.game_id,
+            "max_domino": self.max_domino,
+            "players": list(self.players),
+            "ai_player": ai_player_name,
+            "hand_mask": self.hand_masks.get(ai_player_name, 0),
+            "hand_counts": {player: self.hand_count(player) for player in self.hand_masks},
+            "boneyard_count": self.boneyard_count(),
+            "table_pip_counts": list(self.table_pip_counts),
+            "open_trains": [owner for owner, train in self.trains.items() if train.is_open],
+            "personal_trains": list(self.trains),
+            "strategy": strategy,
+            "rng_state": self.rng.getstate(),
+            "moves": [
+                (self.tile_set.index_of(move['domino']), move['train'], move['train_owner'])
+                for move in valid_moves
+            ],
+        }
+    
+    @classmethod
+    def from_ai_snapshot(cls, snapshot: Dict) -> Tuple['MexicanTrainGame', List[Dict]]:
+        """Rebuild a minimal game and its move list from get_ai_snapshot() output"""
+        game = AISnapshotGame(snapshot["game_id"], snapshot["players"], snapshot["max_domino"])
+        ai_player = snapshot["ai_player"]
+        game.hand_masks = {ai_player: snapshot["hand_mask"]}
+        game.hand_counts = snapshot["hand_counts"]
+        game.boneyard_tiles = snapshot["boneyard_count"]
+        game.table_pip_counts = snapshot["table_pip_counts"]
+        game.hand_pip_counts = {ai_player: game._pip_counts(snapshot["hand_mask"])}
+        game.rng.setstate(snapshot["rng_state"])
+        open_trains = set(snapshot["open_trains"])
+        game.trains = {
+            owner: Train(TrainType.PERSONAL, owner, [], is_open=owner in open_trains)
+            for owner in snapshot["personal_trains"]
+        }
+        tiles = game.tile_set.tiles
+        valid_moves = [
+            {"domino": tiles[index], "train": train_type, "train_owner": train_owner}
+            for index, train_type, train_owner in snapshot["moves"]
+        ]
+        return game, valid_moves
+    
     def _apply_strategy(self, ai_player_name: str, valid_moves: List[Dict], strategy: Dict) -> Dict:
         """Apply a configured strategy to choose the best move"""
         strategy_name = strategy.get('name', 'Unknown')
@@ -743,226 +1169,194 @@ class MexicanTrainGame:
         
         if not tactics:
             # No tactics defined, fallback to random
-            chosen = random.choice(valid_moves)
+            chosen = self.rng.choice(valid_moves)
             chosen['reason'] = f'{strategy_name}: no tactics - random fallback'
             return chosen
         
-        # Initialize scoring for all moves
-        for move in valid_moves:
-            move['score'] = 0.0
-            move['reason_parts'] = []
-        
-        # Apply each tactic in priority order
-        for tactic_config in sorted(tactics, key=lambda t: t.get('priority', 999)):
-            tactic_name = tactic_config['name']
-            tactic_weight = tactic_config.get('weight', 1.0)
-            
-            tactic_method = getattr(self, f'_tactic_{tactic_name}', None)
-            if tactic_method:
-                try:
-                    tactic_method(ai_player_name, valid_moves, tactic_weight)
-                except Exception as e:
-                    self.logger.error(f"Error applying tactic {tactic_name}: {e}")
+        # A strategy is a weight vector over the tactic features: score = features . weights
+        weights, active_columns = self._strategy_weights(tactics)
+        features = self._tactic_features(ai_player_name, valid_moves, active_columns)
+        scores = None
+        for column, feature in features.items():
+            weight = weights[column]
+            if scores is None:
+                scores = [weight * value for value in feature]
             else:
-                self.logger.warning(f"Tactic '{tactic_name}' not implemented")
-        
-        # Choose the highest scoring move
-        best_move = max(valid_moves, key=lambda m: m['score'])
-        reason_text = f"{strategy_name}: " + ", ".join(best_move['reason_parts'])
-        best_move['reason'] = reason_text
+                scores = [score + weight * value for score, value in zip(scores, feature)]
+        if scores is None:
+            scores = [0.0] * len(valid_moves)
+        
+        # Choose the highest scoring move (first one on ties)
+        best_index = max(range(len(scores)), key=scores.__getitem__)
+        best_move = valid_moves[best_index]
+        best_move['score'] = scores[best_index]
+        
+        if self.logger.isEnabledFor(logging.DEBUG):
+            reason_parts = []
+            ordered_tactics = sorted(tactics, key=lambda t: t.get('priority', 999))
+            for tactic_name in dict.fromkeys(t['name'] for t in ordered_tactics):
+                column = AI_TACTIC_INDEX.get(tactic_name)
+                if column in features and features[column][best_index]:
+                    reason_parts.append(f"{tactic_name}({weights[column] * features[column][best_index]:+.2f})")
+            best_move['reason'] = f"{strategy_name}: " + ", ".join(reason_parts)
+        else:
+            best_move['reason'] = strategy_name
         
         return best_move
     
+    def _strategy_weights(self, tactics: List[Dict]) -> Tuple[Tuple[float, ...], Tuple[int, ...]]:
+        """Weight vector over AI_TACTICS for a strategy's tactic list, plus its non-zero columns"""
+        key = tuple((t['name'], t.get('weight', 1.0)) for t in tactics)
+        cached = _strategy_weight_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        vector = [0.0] * len(AI_TACTICS)
+        for tactic_name, weight in key:
+            column = AI_TACTIC_INDEX.get(tactic_name)
+            if column is None:
+                self.logger.warning("Tactic '%s' not implemented", tactic_name)
+                continue
+            vector[column] += weight
+        cached = _strategy_weight_cache[key] = (
+            tuple(vector),
+            tuple(column for column, weight in enumerate(vector) if weight)
+        )
+        return cached
+    
+    def _tactic_features(self, ai_player_name: str, valid_moves: List[Dict], columns: Tuple[int, ...]) -> Dict[int, List[float]]:
+        """Feature columns (tactic column -> score per move at weight 1.0) for the given tactics"""
+        moves = _MoveArrays(self.tile_set, valid_moves)
+        features = {}
+        for column in columns:
+            tactic_name = AI_TACTICS[column]
+            try:
+                features[column] = getattr(self, f'_tactic_{tactic_name}')(ai_player_name, moves)
+            except Exception as e:
+                self.logger.error("Error applying tactic %s: %s", tactic_name, e)
+        return features
+    
     # ========== AI TACTICS ==========
+    # Each tactic returns its score for every move at weight 1.0
     
-    def _tactic_random(self, ai_player_name: str, valid_moves: List[Dict], weight: float) -> None:
+    def _tactic_random(self, ai_player_name: str, moves: _MoveArrays) -> List[float]:
         """Apply random scoring to moves"""
-        for move in valid_moves:
-            move['score'] += random.random() * weight
-            move['reason_parts'].append(f"random({weight:.1f})")
+        rng = self.rng
+        return [rng.random() for _ in range(moves.count)]
     
-    def _tactic_maximize_pips(self, ai_player_name: str, valid_moves: List[Dict], weight: float) -> None:
+    def _tactic_maximize_pips(self, ai_player_name: str, moves: _MoveArrays) -> List[float]:
         """Prefer moves with higher pip counts to reduce penalties"""
-        if not valid_moves:
-            return
-        
-        max_pips = max(move['domino'].value() for move in valid_moves)
-        for move in valid_moves:
-            pip_score = (move['domino'].value() / max_pips) * weight if max_pips > 0 else 0
-            move['score'] += pip_score
-            if pip_score > 0:
-                move['reason_parts'].append(f"max_pips({move['domino'].value()})")
+        max_pips = max(moves.values)
+        if max_pips <= 0:
+            return [0.0] * moves.count
+        return [value / max_pips for value in moves.values]
     
-    def _tactic_minimize_pips(self, ai_player_name: str, valid_moves: List[Dict], weight: float) -> None:
+    def _tactic_minimize_pips(self, ai_player_name: str, moves: _MoveArrays) -> List[float]:
         """Prefer moves with lower pip counts"""
-        if not valid_moves:
-            return
-        
-        min_pips = min(move['domino'].value() for move in valid_moves)
-        max_pips = max(move['domino'].value() for move in valid_moves)
-        for move in valid_moves:
-            pip_score = ((max_pips - move['domino'].value()) / max_pips) * weight if max_pips > 0 else 0
-            move['score'] += pip_score
-            if pip_score > 0:
-                move['reason_parts'].append(f"min_pips({move['domino'].value()})")
+        max_pips = max(moves.values)
+        if max_pips <= 0:
+            return [0.0] * moves.count
+        return [(max_pips - value) / max_pips for value in moves.values]
     
-    def _tactic_prefer_own_train(self, ai_player_name: str, valid_moves: List[Dict], weight: float) -> None:
+    def _tactic_prefer_own_train(self, ai_player_name: str, moves: _MoveArrays) -> List[float]:
         """Prefer playing on own train to keep it closed"""
-        for move in valid_moves:
-            if move['train'] == ai_player_name:
-                move['score'] += weight
-                move['reason_parts'].append(f"own_train({weight:.1f})")
+        return [1.0 if train == ai_player_name else 0.0 for train in moves.trains]
     
-    def _tactic_prefer_mexican_train(self, ai_player_name: str, valid_moves: List[Dict], weight: float) -> None:
+    def _tactic_prefer_mexican_train(self, ai_player_name: str, moves: _MoveArrays) -> List[float]:
         """Prefer playing on the Mexican train"""
-        for move in valid_moves:
-            if move['train'] == 'mexican':
-                move['score'] += weight
-                move['reason_parts'].append(f"mexican({weight:.1f})")
+        return [1.0 if train == 'mexican' else 0.0 for train in moves.trains]
     
-    def _tactic_prefer_open_trains(self, ai_player_name: str, valid_moves: List[Dict], weight: float) -> None:
+    def _tactic_prefer_open_trains(self, ai_player_name: str, moves: _MoveArrays) -> List[float]:
         """Prefer playing on opponent's open trains"""
-        for move in valid_moves:
-            train_name = move['train']
-            if (train_name != ai_player_name and train_name != 'mexican' and 
-                train_name in self.trains and self.trains[train_name].is_open):
-                move['score'] += weight
-                move['reason_parts'].append(f"open_train({weight:.1f})")
+        return [
+            1.0 if (train != ai_player_name and train != 'mexican' and
+                    train in self.trains and self.trains[train].is_open) else 0.0
+            for train in moves.trains
+        ]
     
-    def _tactic_block_opponents(self, ai_player_name: str, valid_moves: List[Dict], weight: float) -> None:
+    def _tactic_block_opponents(self, ai_player_name: str, moves: _MoveArrays) -> List[float]:
         """Try to play dominoes that make it harder for opponents"""
-        # Simple blocking: prefer uncommon numbers that opponents likely can't match
-        for move in valid_moves:
-            domino = move['domino']
-            played_number = domino.right if move.get('flipped') else domino.left
-            
-            # Count how many dominoes in play have this number
-            number_frequency = 0
-            for player_id in self.players:
-                if player_id != ai_player_name:  # Check opponents
-                    for hand_domino in self.player_hands[player_id]:
-                        if hand_domino.left == played_number or hand_domino.right == played_number:
-                            number_frequency += 1
-            
+        # Prefer numbers opponents are unlikely to hold, estimated only from public information:
+        # the tiles this player has not seen are spread over opponents' hands and the boneyard
+        opponent_tiles = sum(self.hand_count(player) for player in self.players if player != ai_player_name)
+        unseen_tiles = opponent_tiles + self.boneyard_count()
+        in_opponent_hands = opponent_tiles / unseen_tiles if unseen_tiles else 0.0
+        
+        blocking_scores = {}
+        for number in set(moves.played):
+            expected_frequency = self.unseen_pip_count(ai_player_name, number) * in_opponent_hands
             # Lower frequency = better blocking potential
-            blocking_score = weight * (1.0 / (number_frequency + 1))
-            move['score'] += blocking_score
-            if blocking_score > 0:
-                move['reason_parts'].append(f"block({played_number})")
+            blocking_scores[number] = 1.0 / (expected_frequency + 1)
+        return [blocking_scores[number] for number in moves.played]
     
-    def _tactic_preserve_doubles(self, ai_player_name: str, valid_moves: List[Dict], weight: float) -> None:
+    def _tactic_preserve_doubles(self, ai_player_name: str, moves: _MoveArrays) -> List[float]:
         """Avoid playing doubles unless necessary"""
-        for move in valid_moves:
-            if move['domino'].left == move['domino'].right:  # It's a double
-                move['score'] -= weight  # Negative score to discourage
-                move['reason_parts'].append(f"preserve_double(-{weight:.1f})")
+        return [-1.0 if is_double else 0.0 for is_double in moves.is_double]
     
-    def _tactic_dump_doubles(self, ai_player_name: str, valid_moves: List[Dict], weight: float) -> None:
+    def _tactic_dump_doubles(self, ai_player_name: str, moves: _MoveArrays) -> List[float]:
         """Play doubles when possible to avoid being stuck"""
-        for move in valid_moves:
-            if move['domino'].left == move['domino'].right:  # It's a double
-                move['score'] += weight
-                move['reason_parts'].append(f"dump_double({weight:.1f})")
+        return [1.0 if is_double else 0.0 for is_double in moves.is_double]
     
-    def _tactic_endgame_awareness(self, ai_player_name: str, valid_moves: List[Dict], weight: float) -> None:
+    def _tactic_endgame_awareness(self, ai_player_name: str, moves: _MoveArrays) -> List[float]:
         """Adjust strategy when few dominoes remain"""
-        total_hand_size = sum(len(hand) for hand in self.player_hands.values())
-        if total_hand_size <= 8:  # Endgame threshold
-            # In endgame, prioritize getting rid of high-value dominoes
-            max_pips = max(move['domino'].value() for move in valid_moves) if valid_moves else 0
-            for move in valid_moves:
-                if max_pips > 0:
-                    endgame_score = (move['domino'].value() / max_pips) * weight
-                    move['score'] += endgame_score
-                    move['reason_parts'].append(f"endgame({move['domino'].value()})")
-    
-    def _tactic_hand_composition(self, ai_player_name: str, valid_moves: List[Dict], weight: float) -> None:
+        total_hand_size = sum(self.hand_count(player) for player in self.players)
+        max_pips = max(moves.values)
+        if total_hand_size > 8 or max_pips <= 0:  # Endgame threshold
+            return [0.0] * moves.count
+        # In endgame, prioritize getting rid of high-value dominoes
+        return [value / max_pips for value in moves.values]
+    
+    def _tactic_hand_composition(self, ai_player_name: str, moves: _MoveArrays) -> List[float]:
         """Consider overall hand makeup when choosing moves"""
-        ai_hand = self.player_hands[ai_player_name]
-        if not ai_hand:
-            return
-        
-        # Count numbers in hand to see what we have most/least of
-        number_counts = {}
-        for domino in ai_hand:
-            number_counts[domino.left] = number_counts.get(domino.left, 0) + 1
-            number_counts[domino.right] = number_counts.get(domino.right, 0) + 1
+        ai_hand = self.hand_masks.get(ai_player_name, 0)
+        doubles = ai_hand & self.tile_set.double_mask
         
-        for move in valid_moves:
-            domino = move['domino']
-            # Numbers that will be exposed after playing this domino
-            exposed_numbers = []
-            if move.get('flipped'):
-                exposed_numbers.append(domino.left)
-            else:
-                exposed_numbers.append(domino.right)
-            
-            # Prefer moves that expose numbers we have more of
-            composition_score = 0
-            for num in exposed_numbers:
-                composition_score += number_counts.get(num, 0) * 0.5
-            
-            move['score'] += composition_score * weight
-            if composition_score > 0:
-                move['reason_parts'].append(f"hand_comp({composition_score:.1f})")
+        # Prefer moves that expose numbers we have more of (a double counts both ends)
+        composition_scores = {}
+        for number in set(moves.exposed):
+            number_mask = self.tile_set.pip_masks[number]
+            composition_scores[number] = ((ai_hand & number_mask).bit_count() + (doubles & number_mask).bit_count()) * 0.5
+        return [composition_scores[number] for number in moves.exposed]
     
-    def _tactic_chain_length(self, ai_player_name: str, valid_moves: List[Dict], weight: float) -> None:
+    def _tactic_chain_length(self, ai_player_name: str, moves: _MoveArrays) -> List[float]:
         """Prefer moves that enable the longest chain of plays from current hand"""
-        ai_hand = self.player_hands[ai_player_name]
+        ai_hand = self.hand_masks.get(ai_player_name, 0)
         if not ai_hand:
-            return
-        
-        max_chain_length = 0
-        move_chain_lengths = {}
-        
-        for move in valid_moves:
-            domino = move['domino']
-            train_name = move['train']
-            
-            # Calculate what number would be exposed after playing this domino
-            if move.get('flipped'):
-                exposed_number = domino.left
-            else:
-                exposed_number = domino.right
-            
-            # Create a copy of the hand without this domino to simulate the move
-            remaining_hand = [d for d in ai_hand if d != domino]
-            
-            # Calculate chain length from this position
-            chain_length = self._calculate_chain_length(remaining_hand, exposed_number, train_name)
-            move_chain_lengths[id(move)] = chain_length
-            max_chain_length = max(max_chain_length, chain_length)
+            return [0.0] * moves.count
         
-        # Score moves based on their chain length potential
-        for move in valid_moves:
-            chain_length = move_chain_lengths[id(move)]
-            if max_chain_length > 0:
-                chain_score = (chain_length / max_chain_length) * weight
-                move['score'] += chain_score
-                if chain_length > 0:
-                    move['reason_parts'].append(f"chain({chain_length})")
+        # Chain length from the hand without each move's domino (memoized across moves and turns)
+        chain_lengths = [
+            longest_chain(self.tile_set, ai_hand & ~(1 << index), exposed)
+            for index, exposed in zip(moves.tile_indices, moves.exposed)
+        ]
+        max_chain_length = max(chain_lengths)
+        if max_chain_length <= 0:
+            return [0.0] * moves.count
+        return [chain_length / max_chain_length for chain_length in chain_lengths]
     
     def _calculate_chain_length(self, hand: List, start_number: int, train_name: str) -> int:
         """Calculate the maximum number of dominoes that could be played in sequence"""
-        if not hand:
-            return 0
-        
-        max_length = 0
-        
-        # Try each domino that can connect to the start_number
-        for i, domino in enumerate(hand):
-            if domino.left == start_number or domino.right == start_number:
-                # Determine what number would be exposed if we play this domino
-                next_number = domino.right if domino.left == start_number else domino.left
-                
-                # Create remaining hand without this domino
-                remaining_hand = hand[:i] + hand[i+1:]
-                
-                # Recursively calculate chain length from this position
-                chain_length = 1 + self._calculate_chain_length(remaining_hand, next_number, train_name)
-                max_length = max(max_length, chain_length)
-        
-        return max_length
+        mask = 0
+        for domino in hand:
+            mask |= 1 << self.tile_set.index_of(domino)
+        return longest_chain(self.tile_set, mask, start_number)
+    
+    def get_suggested_run(self, player_id: str) -> Dict:
+        """Longest run the player could lay from their own train's open end, for a UI hint"""
+        train = self.trains.get(player_id)
+        hand = self.hand_masks.get(player_id, 0)
+        if not train or not hand:
+            return {"train_owner": player_id, "length": 0, "dominoes": []}
+        
+        chain = best_chain(self.tile_set, hand, self._train_required_value(train))
+        return {
+            "train_owner": player_id,
+            "length": len(chain),
+            "dominoes": [
+                {"left": matching_end, "right": exposed_end, "id": self.tile_set.tiles[index].id}
+                for index, matching_end, exposed_end in chain
+            ]
+        }
     
     # ========== LEGACY AI METHODS (kept for backward compatibility) ==========
     
@@ -973,9 +1367,7 @@ class MexicanTrainGame:
         return best_move
     
     def _ai_hand_management(self, ai_player_name: str, valid_moves: List[Dict]) -> Dict:
-        """Level 3 AI: Hand management + train preference"""
-        import random
-        
+        """Level 3 AI: Hand management + train preference"""        
         # Prefer playing on own train to keep it closed
         own_train_moves = [m for m in valid_moves if m['train'] == 'personal' and m['train_owner'] == ai_player_name]
         
@@ -991,15 +1383,13 @@ class MexicanTrainGame:
         return best_move
     
     def _ai_blocking_strategy(self, ai_player_name: str, valid_moves: List[Dict]) -> Dict:
-        """Level 4 AI: Opponent awareness + strategic blocking"""
-        import random
-        
+        """Level 4 AI: Opponent awareness + strategic blocking"""        
         # Check if in endgame (someone has ≤ 3 dominoes)
         min_hand_size = min(len(hand) for hand in self.player_hands.values())
         is_endgame = min_hand_size <= 3
         
         if is_endgame:
-            self.logger.debug(f"AI detects endgame (min hand: {min_hand_size})")
+            self.logger.debug("AI detects endgame (min hand: %s)", min_hand_size)
             # In endgame, prioritize going out or minimize penalty
             if len(self.player_hands[ai_player_name]) == min_hand_size:
                 # We might win - play lowest pip to get closer to going out
@@ -1030,16 +1420,14 @@ class MexicanTrainGame:
         return best_move
     
     def _ai_expert_strategy(self, ai_player_name: str, valid_moves: List[Dict]) -> Dict:
-        """Level 5 AI: Multi-layer expert optimization"""
-        import random
-        
+        """Level 5 AI: Multi-layer expert optimization"""        
         # Advanced game state analysis
         my_hand_size = len(self.player_hands[ai_player_name])
         opponent_hands = {p: len(hand) for p, hand in self.player_hands.items() if p != ai_player_name}
         min_opponent_hand = min(opponent_hands.values()) if opponent_hands else 999
         total_dominoes_left = sum(len(hand) for hand in self.player_hands.values())
         
-        self.logger.debug(f"Expert analysis: My hand={my_hand_size}, Min opponent={min_opponent_hand}, Total left={total_dominoes_left}")
+        self.logger.debug("Expert analysis: My hand=%s, Min opponent=%s, Total left=%s", my_hand_size, min_opponent_hand, total_dominoes_left)
         
         # Multi-factor scoring
         for move in valid_moves:
@@ -1109,73 +1497,82 @@ class MexicanTrainGame:
         
         # Choose the highest scoring move
         best_move = max(valid_moves, key=lambda move: move['score'])
-        self.logger.debug(f"Expert chose move with score: {best_move['score']:.1f}")
+        self.logger.debug("Expert chose move with score: %.1f", best_move['score'])
         return best_move
     
     def make_move(self, player_id: str, domino: Domino, train_type: str, train_owner: Optional[str] = None) -> Dict:
-        self.logger.debug(f"MAKE_MOVE: {player_id} playing {domino.left}-{domino.right} on {train_type} train (owner: {train_owner})")
+        self.logger.debug("MAKE_MOVE: %s playing %s-%s on %s train (owner: %s)", player_id, domino.left, domino.right, train_type, train_owner)
         
         if self.get_current_player() != player_id:
-            self.logger.info(f"Invalid turn: {player_id} tried to play, but it's {self.get_current_player()}'s turn")
+            self.logger.info("Invalid turn: %s tried to play, but it's %s's turn", player_id, self.get_current_player())
             return {"success": False, "error": "Not your turn"}
         
         # Find the domino in the player's hand by ID
-        player_hand = self.player_hands.get(player_id, [])
-        self.logger.debug(f"Player {player_id} has {len(player_hand)} dominos in hand")
-        
-        domino_in_hand = None
-        for d in player_hand:
-            if d.id == domino.id:
-                domino_in_hand = d
-                self.logger.debug(f"Found domino in hand: {d.left}-{d.right}")
-                break
+        hand_mask = self.hand_masks.get(player_id, 0)
+        self.logger.debug("Player %s has %s dominos in hand", player_id, hand_mask.bit_count())
         
-        if not domino_in_hand:
-            self.logger.debug(f"Domino not found in player's hand!")
-            self.logger.debug(f"Looking for ID: {domino.id}")
-            self.logger.debug(f"Hand IDs: {[d.id for d in player_hand[:3]]}...") # Show first 3 IDs
+        tile_index = self.tile_set.index_by_id.get(domino.id)
+        if tile_index is None or not hand_mask >> tile_index & 1:
+            self.logger.debug("Domino not found in player's hand!")
+            self.logger.debug("Looking for ID: %s", domino.id)
             return {"success": False, "error": "Domino not in hand"}
         
+        domino_in_hand = self.tile_set.tiles[tile_index]
+        self.logger.debug("Found domino in hand: %s-%s", domino_in_hand.left, domino_in_hand.right)
+        
         # Determine target train
         if train_type == "mexican":
             if not self.mexican_train:
                 self.mexican_train = Train(TrainType.MEXICAN, None, [])
+                self._index_train("mexican", None, self.mexican_train)
             target_train = self.mexican_train
             required_value = self.current_round if not target_train.dominoes else target_train.get_end_value()
         else:
             target_train = self.trains[train_owner]
             required_value = self.current_round if not target_train.dominoes else target_train.get_end_value()
         
-        self.logger.debug(f"Target train has {len(target_train.dominoes)} dominos")
-        self.logger.debug(f"Required value to match: {required_value}")
-        self.logger.debug(f"Domino values: {domino_in_hand.left}-{domino_in_hand.right}")
-        self.logger.debug(f"Does domino match? {domino_in_hand.matches(required_value)}")
+        self.logger.debug("Target train has %s dominos", len(target_train.dominoes))
+        self.logger.debug("Required value to match: %s", required_value)
+        self.logger.debug("Domino values: %s-%s", domino_in_hand.left, domino_in_hand.right)
+        self.logger.debug("Does domino match? %s", domino_in_hand.matches(required_value))
         
         # Validate move (use the domino from hand)
         if not target_train.can_play_domino(domino_in_hand, required_value):
-            self.logger.debug(f"Invalid move - domino doesn't match required value {required_value}")
+            self.logger.debug("Invalid move - domino doesn't match required value %s", required_value)
             return {"success": False, "error": f"Invalid move - need {required_value}"}
         
-        self.logger.debug(f"Valid move! Adding domino to train...")
+        self.logger.debug("Valid move! Adding domino to train...")
         
         # Make the move
         target_train.add_domino(domino_in_hand, required_value)
+        self._index_train(train_type, train_owner, target_train)
+        played = target_train.dominoes[-1]
+        self._record_patch(
+            "train_append",
+            train_type=train_type,
+            train_owner=train_owner if train_type == "personal" else None,
+            domino={"left": played.left, "right": played.right, "id": played.id},
+            needs_double_satisfaction=target_train.needs_double_satisfaction
+        )
         
-        # Safely remove domino from hand (double-check it's still there)
-        if domino_in_hand in self.player_hands[player_id]:
-            self.player_hands[player_id].remove(domino_in_hand)
-        else:
-            self.logger.warning(f"Domino {domino_in_hand.id} not found in hand during removal (already removed?)")
+        # Remove domino from hand
+        hand_mask &= ~(1 << tile_index)
+        self.hand_masks[player_id] = hand_mask
+        self._shift_pip_counts(self.hand_pip_counts[player_id], tile_index, -1)
+        self._shift_pip_counts(self.table_pip_counts, tile_index, 1)
+        self._record_patch("hand_count", player=player_id, count=hand_mask.bit_count())
+        self._record_patch("hand_remove", private_to=player_id, domino_id=domino_in_hand.id)
+        self._log_event("play", player=player_id, tile=domino_in_hand.id, train=train_type, owner=train_owner)
         
-        self.logger.debug(f"Move successful! Player now has {len(self.player_hands[player_id])} dominos")
+        self.logger.debug("Move successful! Player now has %s dominos", hand_mask.bit_count())
         
         # Close the player's train if they played on their own train and it was open
         if train_type == "personal" and train_owner == player_id and target_train.is_open:
-            target_train.is_open = False
-            self.logger.debug(f"{player_id}'s train is now CLOSED (played on own train)")
+            self._set_train_open(player_id, False)
+            self.logger.debug("%s's train is now CLOSED (played on own train)", player_id)
         
         # Check for round end
-        if not self.player_hands[player_id]:
+        if not hand_mask:
             return self._end_round(player_id)
         
         # Handle doubles according to traditional Mexican Train rules
@@ -1186,12 +1583,13 @@ class MexicanTrainGame:
             # Player played a double - it needs to be satisfied
             self.add_unsatisfied_double(train_type, train_owner)
             self.player_has_played_double = True
-            self.logger.debug(f"{player_id} played a double - gets another turn and must satisfy it")
+            self._record_patch("played_double", player_has_played_double=True)
+            self.logger.debug("%s played a double - gets another turn and must satisfy it", player_id)
             # Player gets another turn but must satisfy the double eventually
         elif is_satisfying_double:
             # Player satisfied an existing double
             self.remove_unsatisfied_double(train_type, train_owner)
-            self.logger.debug(f"{player_id} satisfied a double on {train_type} train")
+            self.logger.debug("%s satisfied a double on %s train", player_id, train_type)
         
         # Determine if turn should continue or pass
         if is_double_played:
@@ -1202,16 +1600,16 @@ class MexicanTrainGame:
             # Normal move or satisfied a double - check if turn should end
             if self.player_has_played_double and self.has_unsatisfied_doubles():
                 # Player played a double earlier but hasn't satisfied it - train opens and turn ends
-                self.logger.debug(f"{player_id} failed to satisfy their double - train opens")
-                if player_id in self.trains:
-                    self.trains[player_id].is_open = True
+                self.logger.debug("%s failed to satisfy their double - train opens", player_id)
+                self._set_train_open(player_id, True)
             
             # Turn ends
-            self.next_turn()
+            self._advance_turn()
         
+        # No game_state here: the result is broadcast to every socket, and boards update through
+        # game_state_patch (or a personalized snapshot) instead
         return {
             "success": True,
-            "game_state": self.get_game_state(),
             "next_player": self.get_current_player(),
             "should_trigger_ai": self.get_current_player() in self.ai_players
         }
@@ -1229,37 +1627,114 @@ class MexicanTrainGame:
         double_location = (train_type, train_owner or "")
         if double_location not in self.unsatisfied_doubles:
             self.unsatisfied_doubles.append(double_location)
-            self.logger.debug(f"Added unsatisfied double on {train_type} train (owner: {train_owner})")
+            self._record_patch("double_added", train_type=train_type, train_owner=train_owner or None)
+            self._log_event("double_opened", train=train_type, owner=train_owner or None)
+            self.logger.debug("Added unsatisfied double on %s train (owner: %s)", train_type, train_owner)
     
     def remove_unsatisfied_double(self, train_type: str, train_owner: Optional[str]):
         """Remove a satisfied double"""
         double_location = (train_type, train_owner or "")
         if double_location in self.unsatisfied_doubles:
             self.unsatisfied_doubles.remove(double_location)
-            self.logger.debug(f"Satisfied double on {train_type} train (owner: {train_owner})")
+            self._record_patch("double_removed", train_type=train_type, train_owner=train_owner or None)
+            self._log_event("double_satisfied", train=train_type, owner=train_owner or None)
+            self.logger.debug("Satisfied double on %s train (owner: %s)", train_type, train_owner)
     
     def must_satisfy_doubles(self, player_id: str) -> bool:
         """Check if player must satisfy doubles before making other moves"""
         return self.has_unsatisfied_doubles()
     
     def next_turn(self):
+        """Pass the current player's turn (timeouts, admin actions)"""
+        self._log_event("pass", player=self.get_current_player())
+        self._advance_turn()
+    
+    def _advance_turn(self):
         """Move to the next player's turn"""
         # Reset the double-played flag for the new turn
         self.player_has_played_double = False
+        self._charge_turn_clock()
+        self.turns_taken += 1
         self.current_player_index = (self.current_player_index + 1) % len(self.players)
-        self.logger.debug(f"Turn passes to: {self.get_current_player()}")
+        self._record_patch("turn", current_player=self.get_current_player(), player_has_played_double=False)
+        self._record_patch("turn_clock", **self.get_turn_clock())
+        self.logger.debug("Turn passes to: %s", self.get_current_player())
+    
+    # ========== TURN CLOCK ==========
+    
+    def _charge_turn_clock(self):
+        """Take the part of the ending turn beyond turn_seconds off the player's time bank, then restart the clock"""
+        now = time.time()
+        if self.turn_seconds and self.turn_started_at is not None and self.players:
+            player = self.get_current_player()
+            overtime = now - self.turn_started_at - self.turn_seconds
+            if overtime > 0 and player in self.time_banks:
+                self.time_banks[player] = max(0.0, self.time_banks[player] - overtime)
+        self.turn_started_at = now
+    
+    def get_turn_deadline(self) -> Optional[float]:
+        """Wall-clock time the current player's turn runs out (None while turns are untimed)"""
+        if not self.turn_seconds or self.turn_started_at is None or not self.game_started:
+            return None
+        player = self.get_current_player()
+        return self.turn_started_at + self.turn_seconds + self.time_banks.get(player, 0.0)
+    
+    def get_turn_clock(self) -> Dict:
+        """Clock values sent to clients with the game state"""
+        return {
+            "turn_seconds": self.turn_seconds,
+            "turn_deadline": self.get_turn_deadline(),
+            "time_banks": {player: round(bank, 1) for player, bank in self.time_banks.items()},
+            "away_players": sorted(self.away_players)
+        }
+    
+    def set_player_away(self, player_id: str, away: bool):
+        """Mark a seat as auto-played (timed out while disconnected) or back under its player's control"""
+        if away == (player_id in self.away_players):
+            return
+        if away:
+            self.away_players.add(player_id)
+        else:
+            self.away_players.discard(player_id)
+        self._record_patch("turn_clock", **self.get_turn_clock())
+    
+    def summarize(self, game_number: int, game_scores: Dict[str, int]) -> Dict:
+        """Compact record of a finished game; the match keeps this instead of the game"""
+        completed_at = time.time()
+        return {
+            "game_number": game_number,
+            "scores": dict(game_scores),
+            "winner": min(game_scores.keys(), key=lambda p: game_scores[p]),
+            "completed_at": completed_at,
+            "duration": completed_at - self.started_at if self.started_at else 0,  # seconds
+            "turns": self.turns_taken,
+            "dominoes_played": sum(len(train.dominoes) for train in self.trains.values())
+                               + (len(self.mexican_train.dominoes) if self.mexican_train else 0),
+            "tiles_left": {player: self.hand_masks.get(player, 0).bit_count() for player in self.players},
+            "seed": self.seed
+        }
+    
+    def end_blocked_game(self) -> Dict:
+        """End a game nobody can finish (is_game_over() with tiles in every hand): all hands are scored
+        
+        If the round was already scored (its last tile was played), that result is returned unchanged.
+        """
+        if any(self.round_scores.values()):
+            return self._end_game()
+        return self._end_round(None)
     
     def draw_from_boneyard(self, player_id: str) -> Dict:
         if self.get_current_player() != player_id:
             return {"success": False, "error": "Not your turn"}
         
-        if not self.boneyard:
+        if not self.draw_pile:
             # No dominoes left to draw, player must pass
-            self.logger.debug(f"Boneyard empty, {player_id} passes turn")
+            self.logger.debug("Boneyard empty, %s passes turn", player_id)
             if player_id in self.trains:
-                self.trains[player_id].is_open = True
-                self.logger.debug(f"{player_id}'s train is now OPEN (couldn't draw)")
-            self.next_turn()
+                self._set_train_open(player_id, True)
+                self.logger.debug("%s's train is now OPEN (couldn't draw)", player_id)
+            self._log_event("draw", player=player_id)
+            self._advance_turn()
             return {
                 "success": True, 
                 "action": "passed_empty_boneyard",
@@ -1270,14 +1745,22 @@ class MexicanTrainGame:
             }
         
         # Check if player has valid moves (they shouldn't be able to draw if they can play)
-        valid_moves = self.get_valid_moves(player_id)
-        if valid_moves:
+        if self.has_valid_moves(player_id):
+            valid_moves = self.get_valid_moves(player_id)
             return {"success": False, "error": f"You must play a domino - you have {len(valid_moves)} valid moves"}
         
         # Draw one domino from boneyard
-        domino = self.boneyard.pop()
-        self.player_hands[player_id].append(domino)
-        self.logger.debug(f"{player_id} drew domino {domino.left}-{domino.right} from boneyard")
+        tile_index = self.draw_pile.pop()
+        self.boneyard_mask &= ~(1 << tile_index)
+        self.hand_masks[player_id] |= 1 << tile_index
+        self._shift_pip_counts(self.hand_pip_counts[player_id], tile_index, 1)
+        domino = self.tile_set.tiles[tile_index]
+        self._log_event("draw", player=player_id)
+        self.logger.debug("%s drew domino %s-%s from boneyard", player_id, domino.left, domino.right)
+        self._record_patch("boneyard_count", count=self.boneyard_mask.bit_count())
+        self._record_patch("hand_count", player=player_id, count=self.hand_masks[player_id].bit_count())
+        self._record_patch("hand_add", private_to=player_id,
+                           domino={"left": domino.left, "right": domino.right, "id": domino.id})
         
         # Check if the newly drawn domino can be played (respecting doubles rules)
         if self.has_unsatisfied_doubles():
@@ -1289,7 +1772,7 @@ class MexicanTrainGame:
         
         if drawn_moves:
             # Player can play the drawn domino - they get to continue their turn
-            self.logger.debug(f"{player_id} can play the drawn domino")
+            self.logger.debug("%s can play the drawn domino", player_id)
             return {
                 "success": True,
                 "domino": {
@@ -1304,12 +1787,12 @@ class MexicanTrainGame:
             }
         else:
             # Player cannot play the drawn domino - turn ends, train opens
-            self.logger.debug(f"{player_id} cannot play drawn domino, turn passes")
+            self.logger.debug("%s cannot play drawn domino, turn passes", player_id)
             if player_id in self.trains:
-                self.trains[player_id].is_open = True
-                self.logger.debug(f"{player_id}'s train is now OPEN (couldn't play drawn domino)")
+                self._set_train_open(player_id, True)
+                self.logger.debug("%s's train is now OPEN (couldn't play drawn domino)", player_id)
             
-            self.next_turn()
+            self._advance_turn()
             return {
                 "success": True,
                 "domino": {
@@ -1328,9 +1811,10 @@ class MexicanTrainGame:
         # Calculate scores for this game
         game_scores = {}
         for player_id in self.players:
-            score = sum(d.value() for d in self.player_hands[player_id])
+            score = self.tile_set.mask_value(self.hand_masks[player_id])
             game_scores[player_id] = score
             self.round_scores[player_id].append(score)
+        self._invalidate_state_patches()
         
         # In the new structure, each game is a single round, so end the game
         return self._end_game(game_scores)
@@ -1339,24 +1823,24 @@ class MexicanTrainGame:
         """Check if the game is over"""
         # Game is over if any player has no dominoes left
         for player_id in self.players:
-            if len(self.player_hands.get(player_id, [])) == 0:
+            if not self.hand_masks.get(player_id, 0):
                 return True
         
         # Game is over if no one can play and boneyard is empty
-        if not self.boneyard:
+        if not self.boneyard_mask:
             all_stuck = True
             for player_id in self.players:
-                if self.get_valid_moves(player_id):
+                if self.has_valid_moves(player_id):
                     all_stuck = False
                     break
             if all_stuck:
                 return True
         
         # Game is also over if there are unsatisfied doubles, boneyard is empty, and no one can satisfy them
-        if self.has_unsatisfied_doubles() and not self.boneyard:
+        if self.has_unsatisfied_doubles() and not self.boneyard_mask:
             can_satisfy = False
             for player_id in self.players:
-                if self.get_valid_moves(player_id):  # This will check doubles-only moves if doubles exist
+                if self.has_valid_moves(player_id):  # This will check doubles-only moves if doubles exist
                     can_satisfy = True
                     break
             if not can_satisfy:
@@ -1389,7 +1873,7 @@ class MexicanTrainGame:
         """Start the countdown timer for auto-start or deletion"""
         import time
         self.countdown_start_time = time.time()
-        self.logger.info(f"Game {self.game_id} countdown started: {self.countdown_minutes} minutes")
+        self.logger.info("Game %s countdown started: %s minutes", self.game_id, self.countdown_minutes)
     
     def get_countdown_remaining(self) -> Optional[int]:
         """Get remaining countdown time in seconds"""
@@ -1411,9 +1895,84 @@ class MexicanTrainGame:
         total_players = len(self.players)
         return total_players >= self.min_players and not self.game_started
     
-    def get_game_state(self, requesting_player: str = None) -> Dict:
+    # ========== COMMAND LOG ==========
+    
+    def _log_event(self, op: str, **fields):
+        """Pass one state-changing command to the event sink, if any"""
+        if self.event_sink is not None:
+            fields["op"] = op
+            self.event_sink(fields)
+    
+    def __getstate__(self):
+        # The sink belongs to the running server, not to the game state
+        state = self.__dict__.copy()
+        state["event_sink"] = None
+        return state
+    
+    # ========== STATE PATCH STREAM ==========
+    
+    def _record_patch(self, op: str, private_to: Optional[str] = None, **fields):
+        """Queue a state change for the next patch batch; private patches only go to one player"""
+        patch = {"op": op, **fields}
+        if private_to is not None:
+            patch["private_to"] = private_to
+        self._pending_patches.append(patch)
+    
+    def _commit_state_patches(self):
+        """Seal queued patches into a new sequence-numbered batch"""
+        if self._pending_patches:
+            self.state_seq += 1
+            self.state_patches.append((self.state_seq, self._pending_patches))
+            self._pending_patches = []
+    
+    def _invalidate_state_patches(self):
+        """Mark a change too broad for patches (new deal, roster change) - clients resync from a snapshot"""
+        self.state_seq += 1
+        self.snapshot_seq = self.state_seq
+        self.state_patches.clear()
+        self._pending_patches = []
+    
+    def get_state_patch_parts(self, since_seq: int) -> Optional[Tuple[List[Dict], Dict[str, List[Dict]]]]:
+        """Patches that bring a client at since_seq up to state_seq, split into shared and per-player parts.
+        
+        Returns None when the client is too far behind (or behind a snapshot-only change)
+        and needs a full snapshot instead.
+        """
+        self._commit_state_patches()
+        if since_seq >= self.state_seq:
+            return [], {}
+        if since_seq < self.snapshot_seq or not self.state_patches or self.state_patches[0][0] > since_seq + 1:
+            return None
+        
+        public_patches = []
+        private_patches: Dict[str, List[Dict]] = {}
+        for seq, batch in self.state_patches:
+            if seq <= since_seq:
+                continue
+            for patch in batch:
+                owner = patch.get("private_to")
+                if owner is None:
+                    public_patches.append(patch)
+                else:
+                    private_patches.setdefault(owner, []).append(
+                        {k: v for k, v in patch.items() if k != "private_to"}
+                    )
+        return public_patches, private_patches
+    
+    def get_state_patches(self, since_seq: int, requesting_player: str = None) -> Optional[List[Dict]]:
+        """Patches for one viewer; spectators pass no requesting_player and never see hand patches"""
+        parts = self.get_state_patch_parts(since_seq)
+        if parts is None:
+            return None
+        public_patches, private_patches = parts
+        return public_patches + private_patches.get(requesting_player, [])
+    
+    def get_public_game_state(self) -> Dict:
+        """Game state shared by every viewer - everything except the requesting player's hand"""
+        self._commit_state_patches()
         return {
             "game_id": self.game_id,
+            "state_seq": self.state_seq,
             "players": self.players,
             "current_player": self.get_current_player() if self.game_started and self.players else None,
             "current_round": self.current_round,
@@ -1424,18 +1983,12 @@ class MexicanTrainGame:
                 "needs_double_satisfaction": train.needs_double_satisfaction
             } for owner, train in self.trains.items()} if self.trains else {},
             "mexican_train": {
-                "dominoes": [{"left": d.left, "right": d.right, "id": d.id} for d in self.mexican_train.dominoes] if self.mexican_train else [],
+                "dominoes": [{"left": d.left, "right": d.right, "id": d.id} for d in self.mexican_train.dominoes],
                 "is_open": True,
-                "needs_double_satisfaction": self.mexican_train.needs_double_satisfaction if self.mexican_train else False
+                "needs_double_satisfaction": self.mexican_train.needs_double_satisfaction
             } if self.mexican_train else None,
-            "boneyard_count": len(self.boneyard) if hasattr(self, 'boneyard') else 0,
-            "player_hand_counts": {player: len(hand) for player, hand in self.player_hands.items()} if hasattr(self, 'player_hands') else {},
-            "player_hands": {
-                requesting_player: [
-                    {"left": d.left, "right": d.right, "id": d.id} 
-                    for d in self.player_hands.get(requesting_player, [])
-                ]
-            } if requesting_player and hasattr(self, 'player_hands') and requesting_player in self.players else {},
+            "boneyard_count": self.boneyard_mask.bit_count(),
+            "player_hand_counts": {player: mask.bit_count() for player, mask in self.hand_masks.items()},  # Only counts, not actual cards
             "round_scores": self.round_scores,
             "started": self.game_started,  # True when game has actually started with multiple players
             "name": self.name,
@@ -1459,55 +2012,26 @@ class MexicanTrainGame:
                 for train_type, train_owner in self.unsatisfied_doubles
             ],
             "must_satisfy_doubles": self.has_unsatisfied_doubles(),
-            "player_has_played_double": self.player_has_played_double
+            "player_has_played_double": self.player_has_played_double,
+            "turn_clock": self.get_turn_clock()
         }
     
+    def get_player_hands_state(self, requesting_player: str = None) -> Dict:
+        """The private part of the game state: the requesting player's own hand"""
+        if requesting_player and requesting_player in self.players:
+            return {requesting_player: self.tile_set.serialize(self.hand_masks.get(requesting_player, 0))}
+        return {}
+    
+    def get_game_state(self, requesting_player: str = None) -> Dict:
+        state = self.get_public_game_state()
+        state["player_hands"] = self.get_player_hands_state(requesting_player)
+        return state
+    
     def get_spectator_game_state(self) -> Dict:
         """Get game state for spectators (without player hands or sensitive info)"""
-        return {
-            "game_id": self.game_id,
-            "players": self.players,
-            "current_player": self.get_current_player(),
-            "current_round": self.current_round,
-            "engine_value": self.current_round,
-            "trains": {owner: {
-                "dominoes": [{"left": d.left, "right": d.right, "id": d.id} for d in train.dominoes],
-                "is_open": train.is_open,
-                "needs_double_satisfaction": train.needs_double_satisfaction
-            } for owner, train in self.trains.items()},
-            "mexican_train": {
-                "dominoes": [{"left": d.left, "right": d.right, "id": d.id} for d in self.mexican_train.dominoes] if self.mexican_train else [],
-                "is_open": True,
-                "needs_double_satisfaction": self.mexican_train.needs_double_satisfaction if self.mexican_train else False
-            } if self.mexican_train else None,
-            "boneyard_count": len(self.boneyard),
-            "player_hand_counts": {player: len(hand) for player, hand in self.player_hands.items()},  # Only counts, not actual cards
-            "round_scores": self.round_scores,
-            "started": self.game_started,
-            "name": self.name,
-            "description": self.description,
-            "host": self.host,
-            "max_players": self.max_players,
-            "min_players": self.min_players,
-            "allow_spectators": self.allow_spectators,
-            "visibility": self.visibility,
-            "spectators": self.spectators,
-            "spectator_count": len(self.spectators),
-            "ai_enabled": self.ai_enabled,
-            "ai_skill_level": self.ai_skill_level,
-            "ai_players": self.ai_players,
-            "countdown_minutes": self.countdown_minutes,
-            "countdown_remaining": self.get_countdown_remaining(),
-            "can_auto_start": self.can_auto_start(),
-            # Doubles tracking for traditional Mexican Train rules
-            "unsatisfied_doubles": [
-                {"train_type": train_type, "train_owner": train_owner if train_owner else None}
-                for train_type, train_owner in self.unsatisfied_doubles
-            ],
-            "must_satisfy_doubles": self.has_unsatisfied_doubles(),
-            "player_has_played_double": self.player_has_played_double,
-            "is_spectator_view": True  # Flag to indicate this is spectator-safe
-        }
+        state = self.get_public_game_state()
+        state["is_spectator_view"] = True  # Flag to indicate this is spectator-safe
+        return state
     
     def can_add_player(self, player_name: str) -> Tuple[bool, str]:
         """Check if a player can be added to the game"""
@@ -1537,23 +2061,29 @@ class MexicanTrainGame:
         self.round_scores[player_name] = []
         
         # If hands have been dealt (game setup already called), deal cards to new player
-        if len(self.player_hands) > 0:
-            self.logger.info(f"Dealing cards to new player '{player_name}'")
+        if len(self.hand_masks) > 0:
+            self.logger.info("Dealing cards to new player '%s'", player_name)
             # Deal the appropriate number of dominoes to the new player
-            new_hand = []
+            new_hand = 0
             for _ in range(self.dominoes_per_player):
-                if self.boneyard:
-                    domino = self.boneyard.pop()
-                    new_hand.append(domino)
-            self.player_hands[player_name] = new_hand
+                if self.draw_pile:
+                    tile_index = self.draw_pile.pop()
+                    self.boneyard_mask &= ~(1 << tile_index)
+                    new_hand |= 1 << tile_index
+            self.hand_masks[player_name] = new_hand
+            self._rebuild_pip_counts()
             
             # Create a personal train for the new player
             self.trains[player_name] = Train(TrainType.PERSONAL, player_name, [])
+            self._index_train("personal", player_name, self.trains[player_name])
+        
+        self._invalidate_state_patches()
+        self._log_event("join", player=player_name)
         
         # Note: Game is no longer auto-started when 2nd player joins
         # Host must manually start the game when ready
         
-        self.logger.info(f"Player '{player_name}' joined game {self.game_id}. Players: {self.players}")
+        self.logger.info("Player '%s' joined game %s. Players: %s", player_name, self.game_id, self.players)
         
         return {
             "success": True,
@@ -1583,7 +2113,7 @@ class MexicanTrainGame:
         # Add AI players if enabled and fill_to_max is set
         if self.ai_enabled and self.ai_fill_to_max:
             self._add_ai_players_to_max()
-            self.logger.info(f"Added AI players: {self.ai_players}")
+            self.logger.info("Added AI players: %s", self.ai_players)
         
         # Update player count after adding AIs
         current_players = len(self.players)
@@ -1603,7 +2133,9 @@ class MexicanTrainGame:
         
         # Start the game
         self.game_started = True
-        self.logger.info(f"Game {self.game_id} started manually by host with {current_players} players: {self.players}")
+        self.started_at = time.time()
+        self._log_event("start_game", force=force_start)
+        self.logger.info("Game %s started manually by host with %s players: %s", self.game_id, current_players, self.players)
         
         return {
             "success": True,
@@ -1637,7 +2169,8 @@ class MexicanTrainGame:
             }
         
         self.spectators.append(spectator_name)
-        self.logger.info(f"Spectator '{spectator_name}' joined game {self.game_id}. Spectators: {self.spectators}")
+        self._record_patch("spectators", spectators=list(self.spectators))
+        self.logger.info("Spectator '%s' joined game %s. Spectators: %s", spectator_name, self.game_id, self.spectators)
         
         return {
             "success": True,
@@ -1650,6 +2183,19 @@ class MexicanTrainGame:
         """Remove a spectator from the game"""
         if spectator_name in self.spectators:
             self.spectators.remove(spectator_name)
-            self.logger.info(f"Spectator '{spectator_name}' left game {self.game_id}")
+            self._record_patch("spectators", spectators=list(self.spectators))
+            self.logger.info("Spectator '%s' left game %s", spectator_name, self.game_id)
             return True
-        return False
\ No newline at end of file
+        return False
+
+class AISnapshotGame(MexicanTrainGame):
+    """Game rebuilt in an AI worker: the AI's own hand plus public counts in place of other hands"""
+    
+    hand_counts: Dict[str, int] = {}
+    boneyard_tiles: int = 0
+    
+    def hand_count(self, player_id: str) -> int:
+        return self.hand_counts.get(player_id, 0)
+    
+    def boneyard_count(self) -> int:
+        return self.boneyard_tiles
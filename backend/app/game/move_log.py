@@ -0,0 +1,288 @@
+"""
+Write-ahead move log for live matches
+Every state-changing command a match or its games perform is appended to
+<log_dir>/<match_id>.log as one JSON line, with a pickled snapshot of the match
+every few hundred events. On startup recover() loads each snapshot and replays the
+log tail; games are seeded (see MexicanTrainMatch.seed), so replaying the same
+commands rebuilds the same deals and the same state.
+
+Appends are buffered in memory and group-committed by one background task
+(write + fsync in a worker thread), so logging never adds disk latency to a move.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.game.mexican_train import MexicanTrainMatch
+
+# Longest time an event may sit in memory before it is on disk
+MOVE_LOG_FLUSH_INTERVAL = 0.05
+
+# Events between match snapshots; recovery replays at most this many per match
+MOVE_LOG_SNAPSHOT_EVERY = 256
+
+# Bumped when match/game attributes change incompatibly; older snapshots are ignored (full replay)
+SNAPSHOT_FORMAT = 5
+
+# Events that only record consequences of another command and are skipped on replay
+DERIVED_EVENTS = {"double_opened", "double_satisfied"}
+
+
+def dump_match_snapshot(match: MexicanTrainMatch, seq: int = 0) -> bytes:
+    """Serialize a match (between commands) along with the number of events it reflects"""
+    return pickle.dumps({"format": SNAPSHOT_FORMAT, "seq": seq, "match": match}, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_match_snapshot(data: bytes) -> Tuple[Optional[MexicanTrainMatch], int]:
+    """Inverse of dump_match_snapshot; (None, 0) for snapshots of an incompatible format"""
+    snapshot = pickle.loads(data)
+    if snapshot.get("format") != SNAPSHOT_FORMAT:
+        return None, 0
+    return snapshot["match"], snapshot["seq"]
+
+
+def apply_event(match: MexicanTrainMatch, event: Dict) -> bool:
+    """Re-run one logged command against a match; False if it did not apply cleanly"""
+    op = event["op"]
+    if op in DERIVED_EVENTS:
+        return True
+    if op == "start_match":
+        return match.start_match().get("success", False)
+    if op == "complete_game":
+        return match.current_game is not None and "error" not in match.complete_current_game(event["scores"])
+    if op == "link_account":
+        return match.link_account(event["player"], event["account_id"])
+
+    game = match.current_game
+    if game is None or event.get("game") != match.current_game_number:
+        return False
+    if op == "play":
+        domino = game.tile_set.tiles[game.tile_set.index_by_id[event["tile"]]]
+        result = game.make_move(event["player"], domino, event["train"], event["owner"])
+    elif op == "draw":
+        result = game.draw_from_boneyard(event["player"])
+    elif op == "pass":
+        if game.get_current_player() != event["player"]:
+            return False
+        game.next_turn()
+        return True
+    elif op == "join":
+        result = game.add_player(event["player"])
+    elif op == "start_game":
+        result = game.start_game(force_start=event["force"])
+    else:
+        return False
+    return result.get("success", False)
+
+
+class MoveLog:
+    """Per-match append-only command logs with periodic snapshots"""
+
+    def __init__(self, log_dir: str):
+        self.log_dir = Path(log_dir)
+        self.logger = logging.getLogger("MoveLog")
+        self.matches: Dict[str, MexicanTrainMatch] = {}  # match_id -> match being logged
+        self.event_counts: Dict[str, int] = {}  # match_id -> events logged so far
+        self._pending: Dict[str, List[str]] = {}  # match_id -> encoded lines not yet on disk
+        self._snapshot_due: Set[str] = set()  # matches to snapshot at the next flush
+        self._finished: List[str] = []  # matches whose files are retired after the next flush
+        self._files = {}  # match_id -> open log file (used only by the flush thread)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _log_path(self, match_id: str) -> Path:
+        return self.log_dir / f"{match_id}.log"
+
+    def _snapshot_path(self, match_id: str) -> Path:
+        return self.log_dir / f"{match_id}.snapshot"
+
+    # ========== RECORDING ==========
+
+    def open_match(self, match: MexicanTrainMatch):
+        """Start logging a newly created match; its event sink must then call record()"""
+        self.event_counts[match.match_id] = 0
+        self._append(match, {
+            "op": "create",
+            "players": list(match.players),
+            "config": dict(match.config, seed=match.seed, record_id=match.record_id),
+            "created_at": match.created_at
+        })
+        self.matches[match.match_id] = match
+        self._wake()
+
+    def record(self, match: MexicanTrainMatch, event: Dict):
+        """Buffer one event; the match is snapshotted every MOVE_LOG_SNAPSHOT_EVERY events"""
+        seq = self._append(match, event)
+        if match.match_completed:
+            self.matches.pop(match.match_id, None)
+            self._snapshot_due.discard(match.match_id)
+            self._finished.append(match.match_id)
+        elif seq % MOVE_LOG_SNAPSHOT_EVERY == 0:
+            # Events can arrive mid-command, so the snapshot is taken at the next flush, between commands
+            self._snapshot_due.add(match.match_id)
+        self._wake()
+
+    def retire_match(self, match_id: str):
+        """Stop logging a match that was deleted unfinished; it is not recovered after a restart"""
+        if self.matches.pop(match_id, None) is not None:
+            self._snapshot_due.discard(match_id)
+            self._finished.append(match_id)
+            self._wake()
+    
+    def _append(self, match: MexicanTrainMatch, event: Dict) -> int:
+        seq = self.event_counts.get(match.match_id, 0) + 1
+        self.event_counts[match.match_id] = seq
+        event["seq"] = seq
+        self._pending.setdefault(match.match_id, []).append(json.dumps(event, separators=(",", ":")) + "\n")
+        return seq
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # ========== FLUSHING ==========
+
+    async def start(self):
+        """Start the background flusher"""
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self._wakeup = asyncio.Event()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """Flush everything still buffered and stop the flusher"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await asyncio.to_thread(self._write_batch, *self._take_batch())
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    async def _flush_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                await asyncio.to_thread(self._write_batch, *self._take_batch())
+            except OSError as e:
+                self.logger.error("Move log flush failed: %s", e)
+            await asyncio.sleep(MOVE_LOG_FLUSH_INTERVAL)  # Group commit: gather the next batch
+
+    def _take_batch(self):
+        """Swap out everything buffered; runs on the event loop, so no command is half-applied"""
+        pending, self._pending = self._pending, {}
+        snapshots = {}
+        for match_id in self._snapshot_due:
+            match = self.matches.get(match_id)
+            if match is not None:
+                seq = self.event_counts[match_id]
+                snapshots[match_id] = (seq, dump_match_snapshot(match, seq))
+        self._snapshot_due = set()
+        finished, self._finished = self._finished, []
+        return pending, snapshots, finished
+
+    def _write_batch(self, pending: Dict[str, List[str]], snapshots: Dict[str, Tuple[int, bytes]], finished: List[str]):
+        """Runs in a worker thread: log lines first, then the snapshots they lead up to"""
+        for match_id, lines in pending.items():
+            f = self._files.get(match_id)
+            if f is None:
+                f = self._files[match_id] = open(self._log_path(match_id), "a", encoding="utf-8")
+            f.write("".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+
+        for match_id, (seq, data) in snapshots.items():
+            path = self._snapshot_path(match_id)
+            tmp_path = path.with_suffix(".snapshot.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+
+        for match_id in finished:
+            self._retire_files(match_id)
+
+    def _retire_files(self, match_id: str):
+        """Completed matches are not recovered; keep the log next to the others for inspection"""
+        f = self._files.pop(match_id, None)
+        if f:
+            f.close()
+        if self._log_path(match_id).exists():
+            self._log_path(match_id).rename(self.log_dir / f"{match_id}.log.completed")
+        self._snapshot_path(match_id).unlink(missing_ok=True)
+        self.event_counts.pop(match_id, None)
+
+    # ========== RECOVERY ==========
+
+    def recover(self) -> Dict[str, MexicanTrainMatch]:
+        """Rebuild every unfinished match from its snapshot and log (call before start()); sinks must then call record()"""
+        matches = {}
+        if not self.log_dir.exists():
+            return matches
+        for path in sorted(self.log_dir.glob("*.log")):
+            match_id = path.stem
+            started = time.perf_counter()
+            try:
+                match, replayed = self._recover_match(match_id, path)
+            except Exception as e:
+                self.logger.error("Could not recover match %s: %s", match_id, e)
+                continue
+            if match is None:
+                continue
+            if match.match_completed:
+                # Completed before the crash but not yet retired: retire it now rather than replay it every start
+                self._retire_files(match_id)
+                self.logger.info("Retired completed match %s found in the move log", match_id)
+                continue
+            self.matches[match_id] = match
+            matches[match_id] = match
+            self.logger.info("Recovered match %s: replayed %s events in %.0fms",
+                             match_id, replayed, (time.perf_counter() - started) * 1000)
+        return matches
+
+    def _recover_match(self, match_id: str, path: Path) -> Tuple[Optional[MexicanTrainMatch], int]:
+        events = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break  # Torn final write from the crash; nothing after it was acknowledged
+        if not events or events[0]["op"] != "create":
+            return None, 0
+
+        match, seq = self._load_snapshot(match_id)
+        if match is None:
+            create = events[0]
+            match = MexicanTrainMatch(match_id, create["players"], config=create["config"])
+            match.created_at = create["created_at"]
+            seq = 1
+
+        tail = [event for event in events if event["seq"] > seq]
+        for event in tail:
+            if not apply_event(match, event):
+                self.logger.warning("Match %s: event %s (%s) did not replay cleanly", match_id, event['seq'], event['op'])
+        self.event_counts[match_id] = events[-1]["seq"]
+        return match, len(tail)
+
+    def _load_snapshot(self, match_id: str) -> Tuple[Optional[MexicanTrainMatch], int]:
+        path = self._snapshot_path(match_id)
+        if not path.exists():
+            return None, 0
+        try:
+            with open(path, "rb") as f:
+                return load_match_snapshot(f.read())
+        except Exception as e:
+            self.logger.warning("Ignoring unreadable snapshot for match %s: %s", match_id, e)
+            return None, 0
@@ -1,26 +1,45 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.api import auth, games, admin, ai_config
 from app.websockets.game_manager import game_manager
 from app.core.config import settings
-from app.core.database import engine
+from app.core import metrics
+from app.core.database import engine, async_engine
+from app.core.log import configure_logging, shutdown_logging
 from app.core.game_timer import timer_manager
+from app.core.resource_sampler import resource_sampler
+from app.core.loop_monitor import loop_monitor
+from app.game.ai_worker import shutdown_ai_executor
+from app.utils.auth import auth_utils, password_hasher
 from app.models import user, game, game_history
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    configure_logging()
+    if settings.loop_monitor_enabled:
+        await loop_monitor.start(threshold_ms=settings.loop_slow_callback_ms)
     await game_manager.initialize()
     await timer_manager.start()
+    await resource_sampler.start(
+        websocket_count=lambda: sum(len(c) for c in game_manager.game_connections.values()) + len(game_manager.lobby_connections)
+    )
     # Create database tables
     from app.core.database import Base
     Base.metadata.create_all(bind=engine)
     yield
     # Shutdown
+    await resource_sampler.stop()
     await timer_manager.stop()
     await game_manager.cleanup()
+    await async_engine.dispose()
+    shutdown_ai_executor()
+    password_hasher.shutdown()
+    await loop_monitor.stop()
+    shutdown_logging()
 
 app = FastAPI(
     title="Mexican Train Domino Game",
@@ -45,8 +64,14 @@ app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 app.include_router(ai_config.router, prefix="/api/ai", tags=["ai-config"])
 
 @app.websocket("/ws/game/{game_id}")
-async def websocket_endpoint(websocket: WebSocket, game_id: str, user_id: str = None, display_name: str = None):
-    await game_manager.connect(websocket, game_id, user_id, display_name)
+async def websocket_endpoint(websocket: WebSocket, game_id: str, user_id: str = None, display_name: str = None, token: str = None):
+    # user_id and display_name are whatever the client says; only the signed token identifies an account
+    account_id = auth_utils.decode_access_token(token)
+    if not await game_manager.claim_match(game_id):
+        # Another node owns this match - pipe the socket to it
+        await game_manager.relay_websocket(websocket, game_id, user_id, display_name, account_id)
+        return
+    await game_manager.connect(websocket, game_id, user_id, display_name, account_id)
     try:
         while True:
             data = await websocket.receive_json()
@@ -72,15 +97,22 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    if settings.shard_urls:
+        return {"status": "healthy", "shard_index": settings.shard_index, "shard_count": len(settings.shard_urls)}
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Gameplay metrics in the Prometheus text format, for a local scraper"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/debug/games")
 async def debug_games():
     return {
         "message": "Debug games endpoint working", 
         "status": "ok",
-        "active_games": list(game_manager.active_games.keys()),
-        "game_count": len(game_manager.active_games)
+        "active_games": list(game_manager.active_matches.keys()),
+        "game_count": len(game_manager.active_matches)
     }
 
 @app.get("/api/users/online")
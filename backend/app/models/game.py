@@ -20,7 +20,7 @@ class Game(Base):
     id = Column(String, primary_key=True)  # UUID
     name = Column(String, nullable=False)
     description = Column(String)
-    host_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    host_id = Column(Integer, ForeignKey("users.id"))  # Null when the host played as a guest
     status = Column(Enum(GameStatus), default=GameStatus.WAITING)
     visibility = Column(Enum(GameVisibility), default=GameVisibility.PUBLIC)
     password_hash = Column(String)  # For private games
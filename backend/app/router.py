@@ -0,0 +1,223 @@
+"""
+Front router for sharded match hosting
+Forwards match traffic to the shard that owns the match (consistent hash of match_id)
+and aggregates the list endpoints across every shard.
+
+Run with SHARD_URLS set to the same list every shard uses:
+    uvicorn app.router:app --port 8000
+or start shards and router together locally with: python -m app.run_sharded
+"""
+
+import asyncio
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, List
+
+import httpx
+import websockets
+from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.core.config import settings
+from app.core.log import configure_logging, shutdown_logging
+from app.core.sharding import shard_ring
+
+# Headers that describe a single hop and must not be forwarded
+HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade", "host", "content-length",
+}
+
+# Shard for everything that is not tied to a match (auth, admin, AI config, lobby)
+PRIMARY_SHARD = settings.shard_urls[0] if settings.shard_urls else None
+
+logger = logging.getLogger(__name__)
+
+http_client: httpx.AsyncClient = None
+_create_targets = itertools.cycle(settings.shard_urls)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global http_client
+    if shard_ring is None:
+        raise RuntimeError("SHARD_URLS must list the shard processes to route to")
+    configure_logging()
+    http_client = httpx.AsyncClient(timeout=30.0)
+    logger.info("Routing across %s shards: %s", len(settings.shard_urls), ", ".join(settings.shard_urls))
+    yield
+    await http_client.aclose()
+    shutdown_logging()
+
+app = FastAPI(
+    title="Mexican Train Shard Router",
+    description="Routes matches to the shard process that owns them",
+    version="0.1.1",
+    lifespan=lifespan
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=settings.allowed_origins,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+# ========== HTTP FORWARDING ==========
+
+async def forward(request: Request, shard_url: str) -> Response:
+    """Replay a request against one shard and relay its response"""
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS}
+    upstream = await http_client.request(
+        request.method,
+        shard_url + request.url.path,
+        params=request.query_params,
+        headers=headers,
+        content=await request.body()
+    )
+    # httpx has already decoded the body, so drop content-encoding too
+    response_headers = {
+        k: v for k, v in upstream.headers.items()
+        if k.lower() not in HOP_HEADERS and k.lower() != "content-encoding"
+    }
+    return Response(upstream.content, status_code=upstream.status_code, headers=response_headers)
+
+
+async def gather_from_shards(request: Request) -> List[Dict]:
+    """GET the same path from every shard; shards that fail are skipped"""
+    async def fetch(shard_url: str):
+        response = await http_client.get(shard_url + request.url.path, params=request.query_params)
+        response.raise_for_status()
+        return response.json()
+
+    results = await asyncio.gather(*(fetch(url) for url in settings.shard_urls), return_exceptions=True)
+    payloads = []
+    for shard_url, result in zip(settings.shard_urls, results):
+        if isinstance(result, Exception):
+            logger.warning("Shard %s did not answer %s: %s", shard_url, request.url.path, result)
+            continue
+        payloads.append(result)
+    return payloads
+
+
+@app.get("/api/games/list")
+async def list_games(request: Request):
+    """Matches from every shard"""
+    games = []
+    for payload in await gather_from_shards(request):
+        games.extend(payload.get("games", []))
+    return {
+        "games": games,
+        "total": len(games),
+        "waiting": len([g for g in games if g["status"] == "waiting"]),
+        "in_progress": len([g for g in games if g["status"] == "in-progress"])
+    }
+
+
+@app.get("/api/games/user/{user_id}/active")
+async def get_user_active_matches(request: Request, user_id: str):
+    """A user's matches across every shard"""
+    active_matches = []
+    total_connections = 0
+    for payload in await gather_from_shards(request):
+        active_matches.extend(payload.get("active_matches", []))
+        total_connections += payload.get("total_connections", 0)
+    return {
+        "user_id": user_id,
+        "active_matches": active_matches,
+        "total_connections": total_connections
+    }
+
+
+@app.get("/api/users/online")
+async def get_online_users(request: Request):
+    """Connected users across every shard (a user connected to several shards is listed once)"""
+    users = {}
+    total_connections = 0
+    for payload in await gather_from_shards(request):
+        total_connections += payload.get("total_connections", 0)
+        for user in payload.get("users", []):
+            if user["id"] in users:
+                users[user["id"]]["connection_count"] += user.get("connection_count", 0)
+                users[user["id"]]["active_games"] += user.get("active_games", 0)
+                if user.get("status") == "in-game":
+                    users[user["id"]]["status"] = "in-game"
+            else:
+                users[user["id"]] = dict(user)
+    return {
+        "users": list(users.values()),
+        "total_online": len(users),
+        "total_connections": total_connections
+    }
+
+
+@app.post("/api/games")
+@app.post("/api/games/")
+async def create_game(request: Request):
+    """New matches are spread round-robin; the receiving shard picks a match ID it owns"""
+    return await forward(request, next(_create_targets))
+
+
+@app.api_route("/api/games/{game_id}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+@app.api_route("/api/games/{game_id}/{rest:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+async def forward_match_request(request: Request, game_id: str, rest: str = ""):
+    return await forward(request, shard_ring.node_for(game_id))
+
+
+# ========== WEBSOCKET FORWARDING ==========
+
+async def proxy_websocket(websocket: WebSocket, shard_url: str):
+    """Pipe a client websocket to the same path on a shard until either side closes"""
+    upstream_url = shard_url.replace("http", "ws", 1) + websocket.url.path
+    if websocket.url.query:
+        upstream_url += "?" + websocket.url.query
+
+    await websocket.accept()
+    close_code = 1000
+    try:
+        async with websockets.connect(upstream_url, max_size=None) as upstream:
+            async def client_to_shard():
+                while True:
+                    await upstream.send(await websocket.receive_text())
+
+            async def shard_to_client():
+                async for text in upstream:
+                    await websocket.send_text(text)
+
+            tasks = [asyncio.create_task(client_to_shard()), asyncio.create_task(shard_to_client())]
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            for task in done:
+                task.exception()  # Disconnects end the pipe; nothing to report
+            if upstream.close_code not in (None, 1005, 1006):  # Reserved codes cannot be sent on
+                close_code = upstream.close_code
+    except WebSocketDisconnect:
+        close_code = 1011  # Client left before the pipe was up
+    except (OSError, websockets.WebSocketException):
+        logger.exception("Websocket proxy to %s failed", shard_url)
+        close_code = 1011
+
+    try:
+        await websocket.close(code=close_code)
+    except Exception:
+        pass  # Client already gone
+
+
+@app.websocket("/ws/game/{game_id}")
+async def websocket_endpoint(websocket: WebSocket, game_id: str):
+    await proxy_websocket(websocket, shard_ring.node_for(game_id))
+
+
+@app.websocket("/ws/lobby")
+async def lobby_websocket_endpoint(websocket: WebSocket):
+    await proxy_websocket(websocket, PRIMARY_SHARD)
+
+
+@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+async def forward_to_primary(request: Request, path: str):
+    """Auth, admin, AI config and health are served by the primary shard"""
+    return await forward(request, PRIMARY_SHARD)
@@ -0,0 +1,60 @@
+"""
+Run sharded match hosting on one machine: N shard processes plus the front router
+Usage: python -m app.run_sharded --shards 4 --port 8000
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start shard workers and the router locally")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 2, help="Number of shard processes")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface the router listens on")
+    parser.add_argument("--port", type=int, default=8000, help="Router port")
+    parser.add_argument("--shard-base-port", type=int, default=8100, help="First shard port")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    shard_urls = [f"http://127.0.0.1:{args.shard_base_port + index}" for index in range(args.shards)]
+    env = dict(os.environ, SHARD_URLS=json.dumps(shard_urls))
+
+    processes = []
+    for index in range(args.shards):
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app",
+             "--host", "127.0.0.1", "--port", str(args.shard_base_port + index)],
+            env=dict(env, SHARD_INDEX=str(index))
+        ))
+    processes.append(subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.router:app", "--host", args.host, "--port", str(args.port)],
+        env=env
+    ))
+    logger.info("%s shards on ports %s-%s, router on %s:%s", args.shards, args.shard_base_port,
+                args.shard_base_port + args.shards - 1, args.host, args.port)
+
+    try:
+        while all(process.poll() is None for process in processes):
+            time.sleep(1)
+        for name, process in zip([f"shard {index}" for index in range(args.shards)] + ["router"], processes):
+            if process.poll() is not None:
+                logger.warning("%s exited with code %s - stopping the rest", name.capitalize(), process.returncode)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -25,9 +25,11 @@ class CreateGameRequest(BaseModel):
     ai_skill_level: int = 1  # 1=Easy, 2=Medium, 3=Hard, 4=Expert, 5=Legendary
     ai_fill_to_max: bool = True  # Fill with AI to reach max_players
     countdown_minutes: int = 10  # Minutes before auto-start or deletion
-    time_limit_seconds: Optional[int] = None  # Per-turn time limit
+    time_limit_seconds: Optional[int] = None  # Per-turn time limit (default 60s, 0 = untimed)
+    time_bank_seconds: int = 300  # Extra time per player per game, used once a turn runs over
     allow_spectators: bool = True
     games_to_play: int = 13  # Number of games in this match
+    seed: Optional[int] = None  # Fixed RNG seed to replay a match; random when unset
 
 class JoinGameRequest(BaseModel):
     password: Optional[str] = None
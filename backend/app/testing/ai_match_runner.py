@@ -45,9 +45,10 @@ class AIMatchRunner:
         self, 
         ai_configs: List[Dict[str, any]], 
         games_to_play: int = 13,
-        match_id: str = None
+        match_id: str = None,
+        seed: int = None
     ) -> Dict:
-        """Run a single AI-only match and return results"""
+        """Run a single AI-only match and return results (the same seed replays the same match)"""
         
         if not match_id:
             match_id = f"test_match_{uuid.uuid4().hex[:8]}"
@@ -90,7 +91,8 @@ class AIMatchRunner:
                 'max_players': len(players),
                 'ai_enabled': True,
                 'ai_skill_level': 3,  # Default, individual AIs can override
-                'name': f'AI Test Match {match_id}'
+                'name': f'AI Test Match {match_id}',
+                'seed': seed
             }
         )
         
@@ -115,6 +117,7 @@ class AIMatchRunner:
         
         result = {
             "match_id": match_id,
+            "seed": match.seed,
             "timestamp": datetime.now().isoformat(),
             "duration_seconds": round(match_duration, 2),
             "games_played": final_state.get('games_played', 0),
@@ -124,7 +127,7 @@ class AIMatchRunner:
                     "strategy": ai_players.get(player, {}).get('strategy', 'default'),
                     "skill_level": ai_players.get(player, {}).get('skill_level', 3),
                     "total_score": final_state.get('match_scores', {}).get(player, 0),
-                    "games_won": len([g for g in final_state.get('game_results', []) 
+                    "games_won": len([g for g in final_state.get('game_history', []) 
                                     if g.get('winner') == player]),
                     "average_game_score": 0,
                     "best_game_score": 0,
@@ -132,7 +135,7 @@ class AIMatchRunner:
                 } for player in players
             },
             "winner": match_winner,
-            "game_results": final_state.get('game_results', []),
+            "game_results": final_state.get('game_history', []),
             "match_completed": final_state.get('match_completed', False)
         }
         
@@ -178,6 +181,15 @@ class AIMatchRunner:
             self.logger.error(f"Error running match: {e}")
             return {"success": False, "error": str(e)}
     
+    def _player_strategy(self, match: Optional[MexicanTrainMatch], player_name: str) -> Optional[Dict]:
+        """Strategy configured for this AI in run_single_match (by name, or by skill level)"""
+        if not match or not isinstance(match.ai_players, dict):
+            return None
+        player_config = match.ai_players.get(player_name, {})
+        if 'strategy' in player_config:
+            return ai_config.get_strategy_by_name(player_config['strategy'])
+        return ai_config.get_strategy(player_config.get('skill_level', 3))
+    
     def _run_game_headless(self, game, match=None):
         """Run a single game without human interaction"""
         max_turns = 1000  # Safety limit
@@ -192,8 +204,12 @@ class AIMatchRunner:
             valid_moves = game.get_valid_moves(current_player)
             
             if valid_moves:
-                # AI chooses move
-                chosen_move = game._choose_ai_move(current_player, valid_moves)
+                # AI chooses move with its own configured strategy
+                strategy = self._player_strategy(match, current_player)
+                if strategy:
+                    chosen_move = game._apply_strategy(current_player, valid_moves, strategy)
+                else:
+                    chosen_move = game._choose_ai_move(current_player, valid_moves)
                 domino = chosen_move['domino']
                 train_name = chosen_move['train']
                 
@@ -295,93 +311,39 @@ class AIMatchRunner:
         self,
         strategies: List[str],
         rounds_per_matchup: int = 5,
-        games_per_match: int = 13
+        games_per_match: int = 13,
+        tournament_format: str = "round_robin",
+        table_size: int = 2,
+        workers: Optional[int] = None,
+        seed: Optional[int] = None,
+        resume_id: Optional[str] = None
     ) -> Dict:
-        """Run a round-robin tournament between strategies"""
+        """Run a tournament between strategies on a process pool (see app.testing.tournament)"""
+        from app.testing.tournament import TournamentEngine
         
         if not self.current_session_id:
-            self.create_test_session("Round-robin tournament")
-        
-        tournament_results = {
-            "tournament_id": f"tournament_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            "strategies": strategies,
-            "rounds_per_matchup": rounds_per_matchup,
-            "games_per_match": games_per_match,
-            "matches": [],
-            "summary": {}
-        }
-        
-        # Generate all possible matchups
-        matchups = []
-        for i in range(len(strategies)):
-            for j in range(i + 1, len(strategies)):
-                matchups.append((strategies[i], strategies[j]))
-        
-        self.logger.info(f"Starting tournament: {len(matchups)} unique matchups, {rounds_per_matchup} rounds each")
-        self.logger.info(f"Total matches: {len(matchups) * rounds_per_matchup}")
-        
-        # Run all matchups
-        for matchup in matchups:
-            strategy1, strategy2 = matchup
-            self.logger.info(f"--- {strategy1} vs {strategy2} ---")
-            
-            matchup_results = []
-            for round_num in range(rounds_per_matchup):
-                self.logger.info(f"Round {round_num + 1}/{rounds_per_matchup}")
-                
-                ai_configs = [
-                    {"name": f"{strategy1}_AI", "strategy": strategy1},
-                    {"name": f"{strategy2}_AI", "strategy": strategy2}
-                ]
-                
-                match_result = self.run_single_match(
-                    ai_configs, 
-                    games_per_match,
-                    f"tournament_{strategy1}_vs_{strategy2}_r{round_num + 1}"
-                )
-                
-                matchup_results.append(match_result)
-                tournament_results["matches"].append(match_result)
-        
-        # Calculate tournament summary
-        strategy_stats = {strategy: {
-            "matches_played": 0,
-            "matches_won": 0,
-            "total_games_won": 0,
-            "total_games_played": 0,
-            "average_score": 0,
-            "scores": []
-        } for strategy in strategies}
-        
-        for match in tournament_results["matches"]:
-            for player_name, player_data in match["players"].items():
-                # Extract strategy from player name
-                strategy = player_data["strategy"]
-                if strategy in strategy_stats:
-                    stats = strategy_stats[strategy]
-                    stats["matches_played"] += 1
-                    if match["winner"] == player_name:
-                        stats["matches_won"] += 1
-                    stats["total_games_won"] += player_data["games_won"]
-                    stats["total_games_played"] += match["games_played"]
-                    stats["scores"].append(player_data["total_score"])
-        
-        # Calculate final statistics
-        for strategy, stats in strategy_stats.items():
-            if stats["scores"]:
-                stats["average_score"] = round(statistics.mean(stats["scores"]), 1)
-                stats["win_rate"] = round(stats["matches_won"] / stats["matches_played"] * 100, 1) if stats["matches_played"] > 0 else 0
-                stats["game_win_rate"] = round(stats["total_games_won"] / stats["total_games_played"] * 100, 1) if stats["total_games_played"] > 0 else 0
-        
-        tournament_results["summary"] = strategy_stats
-        
-        # Save tournament results
-        tournament_file = self.results_dir / f"tournament_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(tournament_file, 'w') as f:
-            json.dump(tournament_results, f, indent=2)
+            self.create_test_session(f"{tournament_format} tournament")
+        
+        if resume_id:
+            engine = TournamentEngine.resume(resume_id, str(self.results_dir), workers=workers)
+        else:
+            engine = TournamentEngine(
+                strategies,
+                tournament_format=tournament_format,
+                table_size=table_size,
+                rounds=rounds_per_matchup,
+                games_per_match=games_per_match,
+                seed=seed,
+                workers=workers,
+                results_dir=str(self.results_dir)
+            )
+        
+        tournament_results = engine.run()
         
         self.logger.info(f"=== TOURNAMENT RESULTS ===")
-        for strategy, stats in sorted(strategy_stats.items(), key=lambda x: x[1]["win_rate"], reverse=True):
+        summary = tournament_results["summary"]
+        for strategy in tournament_results["ranking"]:
+            stats = summary[strategy]
             self.logger.info(f"{strategy:20} | {stats['win_rate']:5.1f}% match wins | {stats['game_win_rate']:5.1f}% game wins | {stats['average_score']:5.1f} avg score")
         
         return tournament_results
@@ -0,0 +1,310 @@
+"""
+Parallel AI Tournament Engine
+Spreads tournament matches over a process pool with deterministic per-match seeds,
+journals results as they finish so a crashed tournament can resume, and keeps the
+standings up to date one result at a time
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+TOURNAMENT_FORMATS = ("round_robin", "swiss")
+
+
+def match_seed(tournament_seed: int, seed_key: str) -> int:
+    """Deterministic seed for one match, independent of scheduling order"""
+    digest = hashlib.sha256(f"{tournament_seed}:{seed_key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def play_tournament_match(spec: Dict) -> Dict:
+    """Worker entry point: play one seeded match and return its result"""
+    from app.testing.ai_match_runner import AIMatchRunner
+
+    runner = AIMatchRunner(spec["results_dir"])
+    result = runner.run_single_match(spec["ai_configs"], spec["games_per_match"], spec["match_key"], seed=spec["seed"])
+    result["match_key"] = spec["match_key"]
+    result["round"] = spec["round"]
+    return result
+
+
+class TournamentStandings:
+    """Per-strategy statistics, updated incrementally as each match result arrives"""
+
+    def __init__(self, strategies: List[str]):
+        self.stats = {strategy: {
+            "matches_played": 0,
+            "matches_won": 0,
+            "total_games_won": 0,
+            "total_games_played": 0,
+            "total_score": 0
+        } for strategy in strategies}
+
+    def add(self, result: Dict):
+        for player_name, player_data in result["players"].items():
+            stats = self.stats.get(player_data["strategy"])
+            if stats is None:
+                continue
+            stats["matches_played"] += 1
+            if result["winner"] == player_name:
+                stats["matches_won"] += 1
+            stats["total_games_won"] += player_data["games_won"]
+            stats["total_games_played"] += result["games_played"]
+            stats["total_score"] += player_data["total_score"]
+
+    def ranking(self) -> List[str]:
+        """Strategies best first: match wins, then game wins, then lowest average score"""
+        def sort_key(strategy):
+            stats = self.stats[strategy]
+            average = stats["total_score"] / stats["matches_played"] if stats["matches_played"] else 0
+            return (-stats["matches_won"], -stats["total_games_won"], average, strategy)
+        return sorted(self.stats, key=sort_key)
+
+    def summary(self) -> Dict[str, Dict]:
+        summary = {}
+        for strategy, stats in self.stats.items():
+            played = stats["matches_played"]
+            summary[strategy] = dict(
+                stats,
+                average_score=round(stats["total_score"] / played, 1) if played else 0,
+                win_rate=round(stats["matches_won"] / played * 100, 1) if played else 0,
+                game_win_rate=round(stats["total_games_won"] / stats["total_games_played"] * 100, 1)
+                if stats["total_games_played"] else 0
+            )
+        return summary
+
+
+class TournamentEngine:
+    """Runs a round-robin or Swiss tournament of AI strategies on a process pool.
+
+    Every match gets a seed derived from the tournament seed, its round and its
+    repetition, so results do not depend on which worker ran what or in which
+    order, and strategies are compared on identical deals.
+    Results are appended to ``<tournament_id>.jsonl`` as they finish; resume()
+    reloads that journal and only plays the matches that are missing.
+    """
+
+    def __init__(
+        self,
+        strategies: List[str],
+        tournament_format: str = "round_robin",
+        table_size: int = 2,
+        rounds: int = 5,
+        games_per_match: int = 13,
+        seed: Optional[int] = None,
+        workers: Optional[int] = None,
+        results_dir: str = "ai_test_results",
+        tournament_id: Optional[str] = None
+    ):
+        if tournament_format not in TOURNAMENT_FORMATS:
+            raise ValueError(f"Unknown tournament format '{tournament_format}'")
+        if not 2 <= table_size <= 8:
+            raise ValueError("Tables need 2-8 players")
+        if len(strategies) < table_size:
+            raise ValueError(f"Need at least {table_size} strategies for tables of {table_size}")
+
+        self.strategies = list(strategies)
+        self.tournament_format = tournament_format
+        self.table_size = table_size
+        self.rounds = rounds  # Repetitions per table (round robin) or number of rounds (Swiss)
+        self.games_per_match = games_per_match
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(2 ** 32)
+        self.workers = workers or os.cpu_count() or 1
+        self.results_dir = Path(results_dir)
+        self.results_dir.mkdir(exist_ok=True)
+        self.tournament_id = tournament_id or f"tournament_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.journal_path = self.results_dir / f"{self.tournament_id}.jsonl"
+        self.logger = logging.getLogger("TournamentEngine")
+
+        self.standings = TournamentStandings(self.strategies)
+        self.completed: Dict[str, Dict] = {}  # match_key -> short record of the finished match
+
+    @classmethod
+    def resume(cls, tournament_id: str, results_dir: str = "ai_test_results", workers: Optional[int] = None) -> 'TournamentEngine':
+        """Reload a tournament from its journal; run() then plays only the unfinished matches"""
+        journal_path = Path(results_dir) / f"{tournament_id}.jsonl"
+        with open(journal_path, "r") as f:
+            lines = f.read().splitlines()
+
+        header = json.loads(lines[0])
+        engine = cls(
+            header["strategies"],
+            tournament_format=header["format"],
+            table_size=header["table_size"],
+            rounds=header["rounds"],
+            games_per_match=header["games_per_match"],
+            seed=header["seed"],
+            workers=workers,
+            results_dir=results_dir,
+            tournament_id=tournament_id
+        )
+        for line in lines[1:]:
+            try:
+                engine._record(json.loads(line))
+            except json.JSONDecodeError:
+                engine.logger.warning(f"Skipping truncated journal line in {journal_path}")
+        engine.logger.info(f"Resuming {tournament_id}: {len(engine.completed)} matches already played")
+        return engine
+
+    # ========== SCHEDULING ==========
+
+    def _match_spec(self, round_number: int, table: Tuple[str, ...], repetition: int = 0) -> Dict:
+        match_key = f"r{round_number}_{'_vs_'.join(table)}"
+        if repetition:
+            match_key += f"_{repetition}"
+        return {
+            "match_key": match_key,
+            "round": round_number,
+            # Seeded by round and repetition only, so every table in a batch gets the same deals
+            # (common random numbers): differences between strategies are not luck of the draw
+            "seed": match_seed(self.seed, f"r{round_number}_{repetition}"),
+            "games_per_match": self.games_per_match,
+            "results_dir": str(self.results_dir),
+            "ai_configs": [
+                {"name": f"{strategy}_AI", "strategy": strategy}
+                for strategy in table
+            ]
+        }
+
+    def _round_robin_rounds(self) -> Iterator[List[Dict]]:
+        """Every combination of table_size strategies, repeated with rotating seats - one batch"""
+        specs = []
+        for table in itertools.combinations(self.strategies, self.table_size):
+            for repetition in range(self.rounds):
+                shift = repetition % len(table)
+                specs.append(self._match_spec(1, table[shift:] + table[:shift], repetition))
+        yield specs
+
+    def _swiss_rounds(self) -> Iterator[List[Dict]]:
+        """Each round seats strategies with similar standings together, avoiding repeated tables"""
+        for round_number in range(1, self.rounds + 1):
+            if round_number == 1:
+                order = list(self.strategies)
+                random.Random(self.seed).shuffle(order)
+            else:
+                # Only earlier rounds count, so a resumed tournament pairs exactly as the original run
+                order = self._standings_before(round_number).ranking()
+            tables_played = {
+                frozenset(record["strategies"]) for record in self.completed.values()
+                if record["round"] < round_number
+            }
+
+            tables = [order[i:i + self.table_size] for i in range(0, len(order), self.table_size)]
+            if len(tables) > 1 and len(tables[-1]) < 2:
+                # A lone leftover joins the previous table when it has room, otherwise sits out (bye)
+                leftover = tables.pop()
+                if len(tables[-1]) < 8:
+                    tables[-1].extend(leftover)
+
+            # Swap neighbours between adjacent tables when a table would repeat an earlier one
+            for i in range(len(tables) - 1):
+                if frozenset(tables[i]) in tables_played:
+                    tables[i][-1], tables[i + 1][0] = tables[i + 1][0], tables[i][-1]
+
+            yield [self._match_spec(round_number, tuple(table)) for table in tables]
+
+    def _rounds(self) -> Iterator[List[Dict]]:
+        if self.tournament_format == "swiss":
+            return self._swiss_rounds()
+        return self._round_robin_rounds()
+
+    # ========== EXECUTION ==========
+
+    def _write_journal_header(self):
+        if self.journal_path.exists():
+            return
+        with open(self.journal_path, "w") as f:
+            f.write(json.dumps({
+                "tournament_id": self.tournament_id,
+                "format": self.tournament_format,
+                "strategies": self.strategies,
+                "table_size": self.table_size,
+                "rounds": self.rounds,
+                "games_per_match": self.games_per_match,
+                "seed": self.seed,
+                "created_at": datetime.now().isoformat()
+            }) + "\n")
+
+    def _record(self, result: Dict):
+        """Fold one finished match into the standings"""
+        self.completed[result["match_key"]] = {
+            "round": result["round"],
+            "strategies": [player["strategy"] for player in result["players"].values()],
+            "standings_entry": {
+                "winner": result["winner"],
+                "games_played": result["games_played"],
+                "players": {
+                    name: {key: player[key] for key in ("strategy", "games_won", "total_score")}
+                    for name, player in result["players"].items()
+                }
+            }
+        }
+        self.standings.add(result)
+    
+    def _standings_before(self, round_number: int) -> TournamentStandings:
+        standings = TournamentStandings(self.strategies)
+        for record in self.completed.values():
+            if record["round"] < round_number:
+                standings.add(record["standings_entry"])
+        return standings
+
+    def iter_results(self) -> Iterator[Dict]:
+        """Play every unfinished match, yielding each result as soon as it is journaled"""
+        self._write_journal_header()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool, open(self.journal_path, "a") as journal:
+            for specs in self._rounds():
+                pending = {
+                    pool.submit(play_tournament_match, spec): spec
+                    for spec in specs if spec["match_key"] not in self.completed
+                }
+                for future in as_completed(pending):
+                    spec = pending[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Match {spec['match_key']} failed: {e}")
+                        continue
+                    journal.write(json.dumps(result) + "\n")
+                    journal.flush()
+                    self._record(result)
+                    yield result
+
+    def run(self, on_result: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Play the tournament to completion and save the final standings"""
+        self.logger.info(f"Starting {self.tournament_format} tournament {self.tournament_id} "
+                         f"on {self.workers} workers (seed {self.seed})")
+        for result in self.iter_results():
+            self.logger.info(f"{result['match_key']}: winner {result['winner']} "
+                             f"({len(self.completed)} matches played)")
+            if on_result:
+                on_result(result)
+
+        results = self.results()
+        tournament_file = self.results_dir / f"{self.tournament_id}.json"
+        with open(tournament_file, "w") as f:
+            json.dump(results, f, indent=2)
+        return results
+
+    def results(self) -> Dict:
+        """Current standings (complete once run() returns)"""
+        return {
+            "tournament_id": self.tournament_id,
+            "format": self.tournament_format,
+            "strategies": self.strategies,
+            "table_size": self.table_size,
+            "rounds": self.rounds,
+            "games_per_match": self.games_per_match,
+            "seed": self.seed,
+            "matches_played": len(self.completed),
+            "journal": str(self.journal_path),
+            "ranking": self.standings.ranking(),
+            "summary": self.standings.summary()
+        }
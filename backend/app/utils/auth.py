@@ -1,12 +1,69 @@
 """
 Authentication utilities for secure password handling and token generation
+bcrypt is deliberately slow, so the async handlers hash through password_hasher: a
+bounded thread pool (bcrypt releases the GIL, so hashes run in parallel across cores)
+that keeps the event loop free and turns requests away once too many are waiting.
 """
+import asyncio
 import hashlib
+import os
 import secrets
 import hmac
-from datetime import datetime, timedelta
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, TypeVar
 import bcrypt
+from jose import JWTError, jwt
+from app.core.config import settings
+
+T = TypeVar("T")
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing queue is full; the caller should retry shortly"""
+
+class PasswordHasher:
+    """Runs bcrypt calls on a capped worker pool with a bounded wait queue"""
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0  # Calls submitted and not yet finished (running + queued)
+        self.stats = {"completed": 0, "rejected": 0, "max_queue_depth": 0}
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls waiting for a free worker"""
+        return max(0, self._pending - self.workers)
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        if self.queue_depth >= self.queue_limit:
+            self.stats["rejected"] += 1
+            raise PasswordHashingBusy()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._pending += 1
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self.queue_depth)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+            self.stats["completed"] += 1
+
+    def get_stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "in_flight": min(self._pending, self.workers),
+            "queue_depth": self.queue_depth,
+            "queue_limit": self.queue_limit,
+            **self.stats
+        }
+
+    def shutdown(self):
+        """Stop the worker threads without waiting for hashes still queued"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
 
 class AuthUtils:
     @staticmethod
@@ -25,6 +82,34 @@ class AuthUtils:
         except Exception:
             return False
     
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        """hash_password on the password hasher pool (raises PasswordHashingBusy when saturated)"""
+        return await password_hasher.run(AuthUtils.hash_password, password)
+    
+    @staticmethod
+    async def verify_password_async(password: str, hashed_password: str) -> bool:
+        """verify_password on the password hasher pool (raises PasswordHashingBusy when saturated)"""
+        return await password_hasher.run(AuthUtils.verify_password, password, hashed_password)
+    
+    @staticmethod
+    def create_access_token(user_id: int, email: str) -> str:
+        """Signed JWT naming a signed-in account; clients pass it as ?token= on the game websocket"""
+        expires = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
+        claims = {"sub": str(user_id), "email": email, "exp": expires}
+        return jwt.encode(claims, settings.secret_key, algorithm=settings.algorithm)
+    
+    @staticmethod
+    def decode_access_token(token: Optional[str]) -> Optional[int]:
+        """Account id from a valid, unexpired access token; None when it is missing, forged or expired"""
+        if not token:
+            return None
+        try:
+            claims = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+            return int(claims["sub"])
+        except (JWTError, KeyError, ValueError):
+            return None
+    
     @staticmethod
     def generate_secure_token(length: int = 32) -> str:
         """Generate a cryptographically secure random token"""
@@ -97,5 +182,11 @@ class AuthUtils:
             "errors": errors
         }
 
+# Shared bcrypt pool; by default one worker per core, leaving one core for the event loop
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers or max(1, (os.cpu_count() or 2) - 1),
+    queue_limit=settings.password_hash_queue_limit
+)
+
 # Global auth utils instance
 auth_utils = AuthUtils()
\ No newline at end of file
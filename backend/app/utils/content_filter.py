@@ -1,19 +1,111 @@
 """
 Content filtering utilities for username validation
+All blocked words and patterns are compiled into one Aho-Corasick automaton, so a
+username is checked in a single pass however long the lists get. The word-list files
+are re-read when they change on disk (checked at most every RELOAD_CHECK_INTERVAL).
 """
 import re
 import json
+import logging
 import os
-from typing import List, Dict, Set
+import time
+from collections import deque
+from typing import List, Dict, Optional, Set, Tuple
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
+WORD_LISTS_DIR = Path(__file__).parent / "word_lists"
+WORD_LIST_FILES = ("english_blocked.json", "spanish_blocked.json", "patterns_blocked.json")
+
+# Seconds between checks of the word-list files for changes
+RELOAD_CHECK_INTERVAL = 2.0
+
+class SubstringMatcher:
+    """Aho-Corasick automaton that tells whether a text contains any of a set of strings"""
+    
+    def __init__(self, words):
+        # State 0 is the root; each state has its transitions, failure link and whether a word ends there
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.terminal: List[bool] = [False]
+        for word in words:
+            if word:
+                self._add(word)
+        self._link()
+    
+    def _add(self, word: str):
+        state = 0
+        for char in word:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.terminal.append(False)
+            state = next_state
+        self.terminal[state] = True
+    
+    def _link(self):
+        """Breadth-first failure links; a state is terminal if any suffix of it is a word"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.terminal[child] = self.terminal[child] or self.terminal[self.fail[child]]
+                queue.append(child)
+    
+    def search(self, text: str) -> bool:
+        goto, fail, terminal = self.goto, self.fail, self.terminal
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if terminal[state]:
+                return True
+        return False
+
 class ContentFilter:
     def __init__(self):
+        self.match_count = 0
+        self.match_time_ns = 0
+        self.max_match_time_ns = 0
+        self._next_reload_check = 0.0
         self._load_word_lists()
     
+    def _file_signature(self) -> Tuple[Optional[Tuple[int, int]], ...]:
+        """(mtime, size) of each word-list file, None for missing ones"""
+        signature = []
+        for name in WORD_LIST_FILES:
+            try:
+                stat = (WORD_LISTS_DIR / name).stat()
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+    
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if now < self._next_reload_check:
+            return
+        self._next_reload_check = now + RELOAD_CHECK_INTERVAL
+        if self._file_signature() != self.loaded_signature:
+            try:
+                self._load_word_lists()
+            except (OSError, ValueError) as e:
+                # Keep filtering with the previous lists until the file is fixed
+                logger.warning("Word lists not reloaded: %s", e)
+    
     def _load_word_lists(self):
         """Load inappropriate word lists from configuration files"""
-        config_dir = Path(__file__).parent / "word_lists"
+        config_dir = WORD_LISTS_DIR
+        signature = self._file_signature()
         
         # Load English inappropriate words
         english_file = config_dir / "english_blocked.json"
@@ -41,6 +133,12 @@ class ContentFilter:
                 self.inappropriate_patterns = set(pattern.lower() for pattern in data.get("patterns", []))
         else:
             self.inappropriate_patterns = self._get_default_patterns()
+        
+        started = time.perf_counter_ns()
+        self.matcher = SubstringMatcher(self.english_blocked | self.spanish_blocked | self.inappropriate_patterns)
+        self.build_time_ns = time.perf_counter_ns() - started
+        self.loaded_signature = signature
+        self.loaded_at = time.time()
     
     def _get_default_english_words(self) -> Set[str]:
         """Default English inappropriate words"""
@@ -86,32 +184,31 @@ class ContentFilter:
     
     def contains_inappropriate_content(self, username: str) -> bool:
         """Check if username contains inappropriate content"""
-        username_lower = username.lower()
+        self._reload_if_changed()
         
-        # Check against English blocked words
-        for word in self.english_blocked:
-            if word in username_lower:
-                return True
+        started = time.perf_counter_ns()
+        # Any English/Spanish word or pattern appearing anywhere in the name
+        found = self.matcher.search(username.lower())
+        elapsed = time.perf_counter_ns() - started
         
-        # Check against Spanish blocked words  
-        for word in self.spanish_blocked:
-            if word in username_lower:
-                return True
-        
-        # Check for inappropriate patterns
-        for pattern in self.inappropriate_patterns:
-            if pattern in username_lower:
-                return True
-        
-        return False
+        self.match_count += 1
+        self.match_time_ns += elapsed
+        self.max_match_time_ns = max(self.max_match_time_ns, elapsed)
+        return found
     
-    def get_word_lists_info(self) -> Dict[str, int]:
-        """Get information about loaded word lists"""
+    def get_word_lists_info(self) -> Dict:
+        """Get information about loaded word lists and match timing"""
         return {
             "english_words": len(self.english_blocked),
             "spanish_words": len(self.spanish_blocked),
             "patterns": len(self.inappropriate_patterns),
-            "total_blocked_items": len(self.english_blocked) + len(self.spanish_blocked) + len(self.inappropriate_patterns)
+            "total_blocked_items": len(self.english_blocked) + len(self.spanish_blocked) + len(self.inappropriate_patterns),
+            "automaton_states": len(self.matcher.goto),
+            "build_time_ms": round(self.build_time_ns / 1e6, 3),
+            "loaded_at": int(self.loaded_at),
+            "matches": self.match_count,
+            "avg_match_us": round(self.match_time_ns / self.match_count / 1e3, 2) if self.match_count else None,
+            "max_match_us": round(self.max_match_time_ns / 1e3, 2)
         }
 
 # Global instance
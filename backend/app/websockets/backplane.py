@@ -0,0 +1,294 @@
+"""
+Multi-node match hosting over a shared StateStore
+The node holding a match's lease owns it: it keeps the match in memory, saves the match
+to the store after every change and runs every command for it. Any other node that
+accepts a websocket for the match relays it to the owner over pub/sub, so clients can
+connect anywhere. If the owner stops renewing its lease, relayed clients are closed with
+1012; the first node they reconnect to claims the lease, loads the saved state and
+carries on.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from functools import partial
+from typing import TYPE_CHECKING, Dict, Optional, Set
+
+from fastapi import WebSocket
+
+from app.core.state_store import StateStore
+from app.game.mexican_train import MexicanTrainMatch
+from app.game.move_log import dump_match_snapshot, load_match_snapshot
+from app.websockets.fanout import encode
+
+if TYPE_CHECKING:
+    from app.websockets.game_manager import GameManager
+
+# A match whose owner has not renewed for this long can be claimed by another node
+LEASE_TTL_SECONDS = 10.0
+LEASE_RENEW_SECONDS = 3.0
+
+# Changed matches are saved at most this often (changes in between are saved together)
+STATE_SAVE_INTERVAL = 0.05
+
+# Close code for relayed clients whose match changed owner; reconnecting lands on the new owner
+OWNER_CHANGED_CLOSE_CODE = 1012
+
+
+def _inbox(match_id: str) -> str:
+    """Channel the owner reads relayed client traffic from"""
+    return f"match:{match_id}:in"
+
+
+def _outbox(conn_id: str) -> str:
+    """Channel a relaying node reads one client's outgoing frames from"""
+    return f"conn:{conn_id}"
+
+
+class RemoteWebSocket:
+    """Owner-side stand-in for a client socket held by another node.
+
+    GameManager treats it like any websocket; frames are published to the
+    relaying node as "t<text>" and a close as "c<code>".
+    """
+
+    def __init__(self, store: StateStore, conn_id: str):
+        self.store = store
+        self.conn_id = conn_id
+
+    async def accept(self):
+        pass  # The relaying node accepted the real socket
+
+    async def send_text(self, text: str):
+        await self.store.publish(_outbox(self.conn_id), "t" + text)
+
+    async def send_json(self, message: dict):
+        await self.send_text(encode(message))
+
+    async def close(self, code: int = 1000):
+        await self.store.publish(_outbox(self.conn_id), f"c{code}")
+
+
+class MatchBackplane:
+    """Match ownership, state saving and client relaying for one GameManager node"""
+
+    def __init__(self, manager: 'GameManager', store: StateStore):
+        self.manager = manager
+        self.store = store
+        self.logger = logging.getLogger("MatchBackplane")
+        self.owned: Set[str] = set()  # match IDs this node holds the lease for
+        self.remote_queues: Dict[str, asyncio.Queue] = {}  # conn_id -> relayed messages, in order
+        self.remote_matches: Dict[str, str] = {}  # conn_id -> match_id
+        self._dirty: Set[str] = set()  # owned matches changed since their last save
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks = []
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._renew_loop()), asyncio.create_task(self._save_loop())]
+
+    async def close(self):
+        """Save and hand back every owned match so another node can take over at once"""
+        for task in self._tasks:
+            task.cancel()
+        for match_id in list(self.owned):
+            match = self.manager.active_matches.get(match_id)
+            if match is not None:
+                await self.store.save_match(match_id, dump_match_snapshot(match))
+            await self.store.release_lease(match_id)
+        self.owned.clear()
+        await self.store.close()
+
+    # ========== OWNERSHIP ==========
+
+    async def claim_match(self, match_id: str) -> bool:
+        """Own the match (loading its saved state) unless another node holds its lease"""
+        if match_id in self.owned:
+            return True
+        if not await self.store.acquire_lease(match_id, LEASE_TTL_SECONDS):
+            return False
+        if match_id not in self.manager.active_matches:
+            data = await self.store.load_match(match_id)
+            match = load_match_snapshot(data)[0] if data is not None else None
+            if match is not None:
+                self.manager.active_matches[match_id] = match
+                self.manager.watch_match(match)
+                self.logger.info("Took over match %s", match_id)
+        await self._own(match_id)
+        return True
+
+    def adopt_match(self, match: MexicanTrainMatch):
+        """Claim a match this node just created"""
+        asyncio.create_task(self._adopt(match.match_id))
+
+    async def _adopt(self, match_id: str):
+        if not await self.store.acquire_lease(match_id, LEASE_TTL_SECONDS):
+            self.logger.error("Match %s was created here but another node holds its lease", match_id)
+            return
+        await self._own(match_id)
+        self.mark_dirty(match_id)
+
+    async def _own(self, match_id: str):
+        if match_id not in self.owned:
+            self.owned.add(match_id)
+            await self.store.subscribe(_inbox(match_id), partial(self._on_inbox, match_id))
+
+    async def drop_match(self, match_id: str):
+        """Forget a deleted match everywhere, so no node takes it over"""
+        if match_id in self.owned:
+            self.owned.discard(match_id)
+            self._dirty.discard(match_id)
+            await self.store.unsubscribe(_inbox(match_id))
+            await self.store.delete_match(match_id)
+            await self.store.release_lease(match_id)
+
+    async def _renew_loop(self):
+        while True:
+            await asyncio.sleep(LEASE_RENEW_SECONDS)
+            for match_id in list(self.owned):
+                try:
+                    renewed = await self.store.renew_lease(match_id, LEASE_TTL_SECONDS)
+                except Exception as e:
+                    self.logger.error("Lease renewal for %s failed: %s", match_id, e)
+                    continue  # Retry next round; the TTL leaves room for a few misses
+                if not renewed:
+                    await self._lose_match(match_id)
+
+    async def _lose_match(self, match_id: str):
+        """Another node owns the match now: drop our copy and send our clients there"""
+        self.logger.warning("Lost the lease for match %s", match_id)
+        self.owned.discard(match_id)
+        self._dirty.discard(match_id)
+        await self.store.unsubscribe(_inbox(match_id))
+        self.manager.active_matches.pop(match_id, None)
+        self.manager.scheduler.cancel_match(match_id)  # Its turn, AI and countdown timers run on the new owner
+        sockets = set(self.manager.game_connections.get(match_id, set()))
+        sockets |= self.manager.spectator_connections.get(match_id, set())
+        for websocket in sockets:
+            try:
+                await websocket.close(code=OWNER_CHANGED_CLOSE_CODE)
+            except Exception:
+                pass
+        # Relayed clients' disconnects now go to the new owner, so end their sessions here
+        for conn_id, conn_match_id in list(self.remote_matches.items()):
+            if conn_match_id == match_id:
+                self.remote_queues[conn_id].put_nowait({"op": "disconnect"})
+
+    # ========== STATE ==========
+
+    def mark_dirty(self, match_id: str):
+        """Save the match at the next save pass (call after it changes)"""
+        if match_id in self.owned:
+            self._dirty.add(match_id)
+            self._wakeup.set()
+
+    async def _save_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            dirty, self._dirty = self._dirty, set()
+            for match_id in dirty:
+                match = self.manager.active_matches.get(match_id)
+                if match is None or match_id not in self.owned:
+                    continue
+                try:
+                    # Serialized right before the write, on the loop, so never mid-command
+                    await self.store.save_match(match_id, dump_match_snapshot(match))
+                except Exception as e:
+                    self.logger.error("Saving match %s failed: %s", match_id, e)
+                    self._dirty.add(match_id)
+            await asyncio.sleep(STATE_SAVE_INTERVAL)
+
+    # ========== OWNER SIDE: CLIENTS RELAYED FROM OTHER NODES ==========
+
+    def _on_inbox(self, match_id: str, text: str):
+        message = json.loads(text)
+        conn_id = message["conn"]
+        queue = self.remote_queues.get(conn_id)
+        if queue is None:
+            if message["op"] != "connect":
+                return  # Connection we already dropped
+            queue = self.remote_queues[conn_id] = asyncio.Queue()
+            self.remote_matches[conn_id] = match_id
+            asyncio.create_task(self._serve_remote(match_id, conn_id, queue))
+        queue.put_nowait(message)
+
+    async def _serve_remote(self, match_id: str, conn_id: str, queue: asyncio.Queue):
+        """Run one relayed client's messages in order, exactly as for a local socket"""
+        websocket = RemoteWebSocket(self.store, conn_id)
+        try:
+            while True:
+                message = await queue.get()
+                op = message["op"]
+                if op == "connect":
+                    await self.manager.connect(websocket, match_id, message.get("user_id"), message.get("display_name"),
+                                               message.get("account_id"))
+                elif op == "message":
+                    await self.manager.handle_message(websocket, match_id, message["data"])
+                elif op == "disconnect":
+                    break
+        except Exception as e:
+            self.logger.error("Relayed connection %s for match %s failed: %s", conn_id, match_id, e)
+        finally:
+            self.remote_queues.pop(conn_id, None)
+            self.remote_matches.pop(conn_id, None)
+            await self.manager.disconnect(websocket, match_id)
+
+    # ========== RELAY SIDE: LOCAL CLIENTS OF MATCHES OWNED ELSEWHERE ==========
+
+    async def relay_websocket(self, websocket: WebSocket, match_id: str, user_id: str = None, display_name: str = None,
+                              account_id: Optional[int] = None):
+        """Pipe a client socket to the match owner until either side closes"""
+        await websocket.accept()
+        owner = await self.store.lease_owner(match_id)
+        if owner is None:
+            # Lease expired since the claim failed - reconnecting claims it
+            await websocket.close(code=OWNER_CHANGED_CLOSE_CODE)
+            return
+
+        conn_id = uuid.uuid4().hex
+        inbox = _inbox(match_id)
+        frames: asyncio.Queue = asyncio.Queue()
+        await self.store.subscribe(_outbox(conn_id), frames.put_nowait)
+        await self.store.publish(inbox, encode({
+            "op": "connect", "conn": conn_id, "user_id": user_id, "display_name": display_name,
+            "account_id": account_id  # Verified from the token on this node
+        }))
+
+        async def client_to_owner():
+            while True:
+                data = await websocket.receive_json()
+                await self.store.publish(inbox, encode({"op": "message", "conn": conn_id, "data": data}))
+
+        async def owner_to_client():
+            while True:
+                frame = await frames.get()
+                if frame[0] == "c":
+                    return int(frame[1:])
+                await websocket.send_text(frame[1:])
+
+        async def watch_owner():
+            while await self.store.lease_owner(match_id) == owner:
+                await asyncio.sleep(LEASE_RENEW_SECONDS)
+            return OWNER_CHANGED_CLOSE_CODE
+
+        close_code = 1000
+        tasks = [asyncio.create_task(client_to_owner()), asyncio.create_task(owner_to_client()),
+                 asyncio.create_task(watch_owner())]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if not task.exception() and task.result() is not None:  # Disconnects end the pipe; nothing to report
+                close_code = task.result()
+
+        await self.store.unsubscribe(_outbox(conn_id))
+        try:
+            await self.store.publish(inbox, encode({"op": "disconnect", "conn": conn_id}))
+        except Exception:
+            pass  # Owner gone; its lease expiry cleans up
+        try:
+            await websocket.close(code=close_code)
+        except Exception:
+            pass  # Client already gone
@@ -0,0 +1,154 @@
+"""
+Broadcast fan-out helpers for GameManager
+Messages are encoded once and pushed to per-connection bounded queues, each drained by its own task
+"""
+
+import asyncio
+import json
+from typing import Any, Callable, Optional
+
+from fastapi import WebSocket
+
+# Messages a connection may have waiting before it is treated as a slow consumer and dropped
+SEND_QUEUE_SIZE = 64
+
+# Longest a single send may take before the connection is dropped
+SEND_TIMEOUT_SECONDS = 10.0
+
+
+def encode(message: Any) -> str:
+    """Encode a message the same way WebSocket.send_json does"""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def splice(encoded_object: str, key: str, value: Any) -> str:
+    """Add one key to an already-encoded JSON object without re-encoding the rest"""
+    if encoded_object == "{}":
+        return "{" + encode(key) + ":" + encode(value) + "}"
+    return encoded_object[:-1] + "," + encode(key) + ":" + encode(value) + "}"
+
+
+class ConnectionSender:
+    """Bounded outgoing queue for one websocket.
+
+    push() never blocks the caller: a full queue or a failed/timed-out send
+    drops the connection through on_drop, so one slow client cannot delay
+    the rest of the game.
+    """
+
+    def __init__(self, websocket: WebSocket, on_drop: Callable[[WebSocket, str], None] = None,
+                 max_queue: int = SEND_QUEUE_SIZE):
+        self.websocket = websocket
+        self.on_drop = on_drop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+        self.task: Optional[asyncio.Task] = asyncio.create_task(self._run())
+
+    @property
+    def depth(self) -> int:
+        """Messages waiting to be sent"""
+        return self.queue.qsize()
+
+    def push(self, text: str) -> bool:
+        """Queue pre-encoded text for sending; returns False if the connection was dropped"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            self.drop("send queue full")
+            return False
+
+    async def _run(self):
+        while True:
+            text = await self.queue.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(text), timeout=SEND_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                self.drop("send timed out")
+                return
+            except Exception as e:
+                self.drop(f"send failed: {e}")
+                return
+            self.queue.task_done()
+
+    async def flush(self, timeout: float = SEND_TIMEOUT_SECONDS) -> bool:
+        """Wait until everything queued so far has been sent; False if dropped or still sending after timeout"""
+        if self.closed:
+            return False
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return not self.closed
+
+    def drop(self, reason: str):
+        """Stop sending and notify the owner; safe to call more than once"""
+        if self.closed:
+            return
+        self.closed = True
+        if self.task and self.task is not asyncio.current_task():
+            self.task.cancel()
+        if self.on_drop:
+            self.on_drop(self.websocket, reason)
+
+    async def close(self):
+        """Stop the sender task without notifying the owner (normal disconnect)"""
+        self.closed = True
+        if self.task and self.task is not asyncio.current_task():
+            self.task.cancel()
+            try:
+                await self.task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+class GameStateEncoder:
+    """Per-broadcast cache so the shared part of each game_state message is encoded only once.
+
+    Full snapshots reuse one encoding of the public state and splice in the
+    viewer's hand; patch messages reuse one encoding of the public patches per
+    starting sequence number and append the viewer's private patches.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self._public_text: Optional[str] = None
+        self._patch_parts = {}  # since_seq -> (encoded public patches, private patches) or None
+
+    @property
+    def state_seq(self) -> int:
+        return self.game.state_seq
+
+    def snapshot(self, requesting_player: str = None, spectator: bool = False) -> str:
+        """Encoded full game_state message for one viewer"""
+        if self._public_text is None:
+            self._public_text = encode(self.game.get_public_game_state())
+        if spectator:
+            data = splice(self._public_text, "is_spectator_view", True)
+        else:
+            data = splice(self._public_text, "player_hands", self.game.get_player_hands_state(requesting_player))
+        return '{"type":"game_state","data":' + data + '}'
+
+    def patch(self, since_seq: int, requesting_player: str = None) -> Optional[str]:
+        """Encoded game_state_patch message; None if a snapshot is needed, "" if nothing changed"""
+        if since_seq not in self._patch_parts:
+            parts = self.game.get_state_patch_parts(since_seq)
+            if parts is not None:
+                public_patches, private_patches = parts
+                parts = (",".join(encode(patch) for patch in public_patches), private_patches)
+            self._patch_parts[since_seq] = parts
+
+        parts = self._patch_parts[since_seq]
+        if parts is None:
+            return None
+
+        public_items, private_patches = parts
+        items = [public_items] if public_items else []
+        if requesting_player and private_patches.get(requesting_player):
+            items.extend(encode(patch) for patch in private_patches[requesting_player])
+        if not items:
+            return ""
+        return ('{"type":"game_state_patch","data":{"base_seq":%d,"state_seq":%d,"patches":[%s]}}'
+                % (since_seq, self.game.state_seq, ",".join(items)))
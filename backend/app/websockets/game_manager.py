@@ -1,9 +1,57 @@
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set, Tuple
 from fastapi import WebSocket
 import json
 import asyncio
+import logging
+import time
 from app.game.mexican_train import MexicanTrainGame, MexicanTrainMatch
 from app.core.config import settings
+from app.core.log import bind_match
+from app.core.metrics import Counter, Gauge, Histogram
+from app.core.results_writer import ResultsWriter
+from app.core.scheduler import TimerScheduler
+from app.core.sharding import is_sharded
+from app.core.state_store import create_state_store
+from app.game.move_log import MoveLog, dump_match_snapshot
+from app.websockets.backplane import MatchBackplane
+from app.websockets.fanout import ConnectionSender, GameStateEncoder, encode
+
+# Time an AI decision may take on the worker pool before the cheapest tactic is used instead
+AI_MOVE_DEADLINE_SECONDS = 3.0
+
+# Pause between consecutive AI moves, and before an AI moves after a draw passed the turn to it
+AI_MOVE_PACING_SECONDS = 1.5
+AI_MOVE_AFTER_DRAW_SECONDS = 0.5
+
+# Scheduler timer names (keyed per match); see app.core.scheduler
+AI_MOVE_TIMER = "ai_move"
+COUNTDOWN_TIMER = "countdown"
+TURN_TIMER = "turn"
+EVICT_TIMER = "evict"
+
+# Finished matches stay loaded this long (final scores, rematch chat) before they are evicted
+FINISHED_MATCH_GRACE_SECONDS = 300
+
+# Longest an eviction waits for each client's queued messages to be sent before closing it
+EVICT_FLUSH_SECONDS = 5.0
+
+# Message types handle_message dispatches; anything else is counted as "other"
+HANDLED_MESSAGE_TYPES = frozenset({
+    "make_move", "draw_domino", "chat_message", "join_game", "spectate_game", "start_game",
+    "get_valid_moves", "get_all_valid_moves", "get_suggested_run", "resync_state"
+})
+
+# Gameplay metrics served at /metrics (see app.core.metrics)
+MESSAGE_SECONDS = Histogram("mexican_train_message_seconds",
+                            "Time to handle one websocket message, by message type", ["type"])
+BROADCAST_SECONDS = Histogram("mexican_train_broadcast_seconds",
+                              "Time to encode and queue one broadcast_to_game, by message type", ["type"])
+BROADCAST_BYTES = Counter("mexican_train_broadcast_bytes_total",
+                          "Encoded message size queued by broadcast_to_game, by message type (characters; bytes for ASCII payloads)", ["type"])
+BROADCAST_SENDS = Counter("mexican_train_broadcast_sends_total",
+                          "Per-socket sends queued by broadcast_to_game, by message type", ["type"])
+DROPPED_CONNECTIONS = Counter("mexican_train_dropped_connections_total",
+                              "Websockets dropped as slow or broken consumers", ["reason"])
 
 class GameManager:
     def __init__(self):
@@ -17,26 +65,59 @@ class GameManager:
         self.spectator_connections: Dict[str, Set[WebSocket]] = {}  # game_id -> spectator websockets
         self.websocket_spectators: Dict[WebSocket, Tuple[str, str]] = {}  # websocket -> (game_id, spectator_name)
         self.websocket_players: Dict[WebSocket, str] = {}  # websocket -> player_name
-        # TODO: Add Redis connection when Docker is available
-        # self.redis = None
+        self.websocket_state_seq: Dict[WebSocket, int] = {}  # websocket -> last game state_seq it was sent
+        self.connection_senders: Dict[WebSocket, ConnectionSender] = {}  # websocket -> bounded outgoing queue
+        self.move_log: Optional[MoveLog] = None  # Write-ahead log of match commands, set up in initialize()
+        self.backplane: Optional[MatchBackplane] = None  # Shared state and relaying when several nodes serve matches
+        self.results: Optional[ResultsWriter] = None  # Database write-behind for finished games and matches
+        self.scheduler = TimerScheduler()  # Per-match deadlines: AI move pacing, lobby countdowns, turn clocks
+        self.lifecycle_stats = {"matches_evicted": 0, "games_compacted": 0, "evicted_bytes": 0}
+        self.logger = logging.getLogger("GameManager")
+        self.message_logger = logging.getLogger("GameManager.messages")  # Per-message trace, sampled (see log_sample_rates)
     
     async def initialize(self):
-        # TODO: Initialize Redis connection when Docker is available
-        # self.redis = redis.from_url(settings.redis_url)
-        pass
+        await self.scheduler.start()
+        if settings.persist_results:
+            self.results = ResultsWriter()
+            await self.results.start()
+        
+        # With a shared store, match state lives there and any node can take over a match
+        store = create_state_store()
+        if store:
+            self.backplane = MatchBackplane(self, store)
+            await self.backplane.start()
+            self.logger.info("Serving matches as node %s (%s state store)", store.node_id, settings.state_store)
+        
+        # Otherwise rebuild the matches that were live when the server stopped, then keep logging
+        elif settings.move_log_enabled:
+            log_dir = settings.move_log_dir
+            if is_sharded():
+                log_dir = f"{log_dir}/shard{settings.shard_index}"
+            self.move_log = MoveLog(log_dir)
+            recovered = await asyncio.to_thread(self.move_log.recover)
+            self.active_matches.update(recovered)
+            for match in recovered.values():
+                self.watch_match(match)
+            await self.move_log.start()
+            self.logger.info("Move log at %s: recovered %s matches", log_dir, len(recovered))
     
     async def cleanup(self):
-        # TODO: Close Redis connection when available
-        # if self.redis:
-        #     await self.redis.close()
-        pass
+        await self.scheduler.stop()
+        if self.results:
+            await self.results.close()
+        if self.move_log:
+            await self.move_log.close()
+        if self.backplane:
+            await self.backplane.close()
     
-    async def connect(self, websocket: WebSocket, game_id: str, user_id: str = None, display_name: str = None):
+    async def connect(self, websocket: WebSocket, game_id: str, user_id: str = None, display_name: str = None,
+                      account_id: Optional[int] = None):
+        """Join a client to a match; account_id is the account its access token was verified for, if any"""
         await websocket.accept()
         
         # Auto-create match if it doesn't exist (everything is a match now)
         if game_id not in self.active_matches:
-            print(f"Auto-creating match: {game_id}")
+            self.logger.info("Auto-creating match: %s", game_id)
             
             # Priority order for getting display name:
             # 1. display_name parameter passed directly to WebSocket
@@ -45,19 +126,19 @@ class GameManager:
             current_display_name = display_name
             
             if user_id:
-                print(f"Match connection for user_id: {user_id}, passed display_name: {display_name}")
+                self.logger.debug("Match connection for user_id: %s, passed display_name: %s", user_id, display_name)
                 
                 if not current_display_name:
                     # Check if user has a lobby connection with a display name
                     for ws, user_info in self.lobby_users.items():
                         if isinstance(user_info, dict) and user_info.get("user_id") == user_id:
                             current_display_name = user_info.get("display_name")
-                            print(f"Found lobby display name: {current_display_name}")
+                            self.logger.debug("Found lobby display name: %s", current_display_name)
                             break
             
             # Create a new single-game match with the connecting user as the first player
             player_name = current_display_name or user_id or "Player1"
-            print(f"Creating single-game match {game_id} with player: {player_name}")
+            self.logger.info("Creating single-game match %s with player: %s", game_id, player_name)
             players = [player_name]
             # Create a 1-game match as default
             config = {
@@ -89,13 +170,23 @@ class GameManager:
         player_name = display_name or user_id
         if player_name:
             self.websocket_players[websocket] = player_name
+            
+            # Results are credited only to the verified account, and only for the seat this socket plays
+            match = self.active_matches.get(game_id)
+            if match and account_id is not None:
+                match.link_account(player_name, account_id)
+            
+            # A returning player takes their seat back from auto-play, with the rest of their turn clock
+            if match and match.current_game and player_name in match.current_game.away_players:
+                match.current_game.set_player_away(player_name, False)
+                self._rearm_turn_timer(game_id)
         
         # Send current match state to new connection (everything is a match now)
         if game_id in self.active_matches:
             # Handle match connection
             match = self.active_matches[game_id]
             match_state = match.get_match_state(requesting_player=player_name)
-            await websocket.send_json({
+            await self.send_json(websocket, {
                 "type": "match_state",
                 "data": match_state
             })
@@ -103,20 +194,20 @@ class GameManager:
             # If there's a current game in the match, also send game state
             if match.current_game:
                 game_state = match.current_game.get_game_state(requesting_player=player_name)
-                await websocket.send_json({
+                self.websocket_state_seq[websocket] = game_state["state_seq"]
+                await self.send_json(websocket, {
                     "type": "game_state", 
                     "data": game_state
                 })
                 
                 # Check if it's an AI player's turn and trigger their move
                 if match.current_game.game_started and match.current_game.get_current_player() in match.current_game.ai_players:
-                    print(f"🔄 Reconnection detected - checking for stuck AI turn")
-                    import asyncio
-                    asyncio.create_task(self.trigger_ai_moves(game_id))
+                    self.logger.info("Reconnection detected - checking for stuck AI turn")
+                    self.schedule_ai_moves(game_id)
         else:
             # This should never happen since we auto-create matches above
-            print(f"Warning: No match found for {game_id} after auto-creation attempt")
-            await websocket.send_json({
+            self.logger.warning("No match found for %s after auto-creation attempt", game_id)
+            await self.send_json(websocket, {
                 "type": "error",
                 "message": "Failed to create or find match",
                 "game_id": game_id
@@ -138,7 +229,7 @@ class GameManager:
                     del self.spectator_connections[spectator_game_id]
             
             # Remove spectator from game
-            game = self.active_games.get(spectator_game_id)
+            game = self.get_game(spectator_game_id)
             if game:
                 game.remove_spectator(spectator_name)
                 # Notify players that spectator left
@@ -160,6 +251,12 @@ class GameManager:
         # Clean up player name mapping
         if websocket in self.websocket_players:
             del self.websocket_players[websocket]
+        self.websocket_state_seq.pop(websocket, None)
+        
+        # Stop the outgoing queue
+        sender = self.connection_senders.pop(websocket, None)
+        if sender:
+            await sender.close()
         
         # Clean up user connections
         if websocket in self.websocket_users:
@@ -172,10 +269,17 @@ class GameManager:
     
     async def handle_message(self, websocket: WebSocket, game_id: str, data: dict):
         message_type = data.get("type")
-        print(f"\n📨 WebSocket message received: {message_type}")
-        print(f"   Game ID: {game_id}")
-        print(f"   Data keys: {list(data.keys())}")
+        self.message_logger.debug("WebSocket message %s for %s, keys: %s", message_type, game_id, list(data))
         
+        started = time.perf_counter()
+        try:
+            with bind_match(game_id):
+                await self._dispatch_message(websocket, game_id, message_type, data)
+        finally:
+            label = message_type if message_type in HANDLED_MESSAGE_TYPES else "other"
+            MESSAGE_SECONDS.labels(label).observe(time.perf_counter() - started)
+    
+    async def _dispatch_message(self, websocket: WebSocket, game_id: str, message_type: str, data: dict):
         if message_type == "make_move":
             await self.handle_move(game_id, data)
         elif message_type == "draw_domino":
@@ -192,9 +296,13 @@ class GameManager:
             await self.handle_get_valid_moves(websocket, game_id, data)
         elif message_type == "get_all_valid_moves":
             await self.handle_get_all_valid_moves(websocket, game_id, data)
+        elif message_type == "get_suggested_run":
+            await self.handle_get_suggested_run(websocket, game_id)
+        elif message_type == "resync_state":
+            await self.handle_resync_state(websocket, game_id)
     
     async def handle_move(self, game_id: str, data: dict):
-        game = self.active_games.get(game_id)
+        game = self.get_game(game_id)
         if not game:
             return
         
@@ -203,7 +311,7 @@ class GameManager:
         train_type = data.get("train_type")
         train_owner = data.get("train_owner")
         
-        print(f"Move request: Player {player_id} playing {domino_data} on {train_type} train (owner: {train_owner})")
+        self.logger.debug("Move request: Player %s playing %s on %s train (owner: %s)", player_id, domino_data, train_type, train_owner)
         
         # Reconstruct domino object
         from app.game.mexican_train import Domino
@@ -212,7 +320,7 @@ class GameManager:
         # Make the move
         result = game.make_move(player_id, domino, train_type, train_owner)
         
-        print(f"Move result: {result}")
+        self.logger.debug("Move result: %s", result)
         
         # Broadcast result to all connected players
         await self.broadcast_to_game(game_id, {
@@ -229,47 +337,53 @@ class GameManager:
             
             # Check if game ended
             if result.get("game_ended"):
-                print(f"🎉 Game {game_id} ended! Winner: {result.get('winner')}")
-                await self.broadcast_to_game(game_id, {
-                    "type": "game_ended",
-                    "data": {
-                        "winner": result.get("winner"),
-                        "final_scores": result.get("final_scores"),
-                        "is_match_game": result.get("is_match_game", False),
-                        "match_id": result.get("match_id"),
-                        "game_number": result.get("game_number", 1)
-                    }
-                })
-                
-                # Check if this was part of a match and handle match progression
-                if result.get("is_match_game") and result.get("match_id"):
-                    match_id = result.get("match_id")
-                    match = self.active_matches.get(match_id)
-                    if match and match.current_game:
-                        # Complete the current game in the match
-                        match_result = match.complete_current_game(result.get("final_scores", {}))
-                        
-                        if match_result.get("match_completed"):
-                            print(f"🏆 Match {match_id} completed! Winner: {match_result.get('winner')}")
-                            await self.broadcast_to_game(game_id, {
-                                "type": "match_ended",
-                                "data": {
-                                    "winner": match_result.get("winner"),
-                                    "final_scores": match_result.get("final_scores"),
-                                    "game_history": match_result.get("game_history"),
-                                    "total_games": len(match_result.get("game_history", []))
-                                }
-                            })
+                self.logger.info("Game %s ended! Winner: %s", game_id, result.get('winner'))
+                await self._finish_game(game_id, result)
             
             # Check if we should trigger AI moves
             elif result.get("should_trigger_ai"):
                 # Add a small delay for visual effect
-                import asyncio
-                await asyncio.sleep(1.5)
-                await self.trigger_ai_moves(game_id)
+                self.schedule_ai_moves(game_id, AI_MOVE_PACING_SECONDS)
+    
+    async def _finish_game(self, game_id: str, result: dict):
+        """Announce a finished game and move its match on to the next game (or end the match)"""
+        await self.broadcast_to_game(game_id, {
+            "type": "game_ended",
+            "data": {
+                "winner": result.get("winner"),
+                "final_scores": result.get("final_scores"),
+                "is_match_game": result.get("is_match_game", False),
+                "match_id": result.get("match_id"),
+                "game_number": result.get("game_number", 1)
+            }
+        })
+        
+        # Check if this was part of a match and handle match progression
+        if result.get("is_match_game") and result.get("match_id"):
+            match_id = result.get("match_id")
+            match = self.active_matches.get(match_id)
+            if match and match.current_game:
+                # Complete the current game in the match
+                match_result = match.complete_current_game(result.get("final_scores", {}))
+                if self.results:
+                    await self.results.record_game(match, match.game_history[-1])
+                    if match.match_completed:
+                        await self.results.record_match(match)
+                
+                if match_result.get("match_completed"):
+                    self.logger.info("Match %s completed! Winner: %s", match_id, match_result.get('winner'))
+                    await self.broadcast_to_game(game_id, {
+                        "type": "match_ended",
+                        "data": {
+                            "winner": match_result.get("winner"),
+                            "final_scores": match_result.get("final_scores"),
+                            "game_history": match_result.get("game_history"),
+                            "total_games": len(match_result.get("game_history", []))
+                        }
+                    })
     
     async def handle_draw(self, game_id: str, data: dict):
-        game = self.active_games.get(game_id)
+        game = self.get_game(game_id)
         if not game:
             return
         
@@ -304,9 +418,10 @@ class GameManager:
             if result.get("turn_passed") and result.get("next_player"):
                 next_player = result.get("next_player")
                 if next_player in game.ai_players:
-                    print(f"🤖 Triggering AI move for {next_player} after draw turn pass")
+                    self.logger.debug("Triggering AI move for %s after draw turn pass", next_player)
                     # Delay AI move slightly to ensure state is propagated
-                    asyncio.create_task(self._delayed_ai_move(game_id, next_player))
+                    self.scheduler.call_later(AI_MOVE_AFTER_DRAW_SECONDS, (game_id, AI_MOVE_TIMER),
+                                              self._delayed_ai_move, game_id, next_player)
     
     async def handle_chat(self, game_id: str, data: dict):
         # Broadcast chat message to all players in the game
@@ -326,10 +441,10 @@ class GameManager:
             pass  # Handle match joining logic
         else:
             # Check for standalone games (backward compatibility)
-            game = self.active_games.get(game_id)
+            game = self.get_game(game_id)
         
         if not game and not match:
-            await websocket.send_json({
+            await self.send_json(websocket, {
                 "type": "join_result",
                 "success": False,
                 "error": "Game not found"
@@ -338,7 +453,7 @@ class GameManager:
         
         player_name = data.get("player_name")
         if not player_name:
-            await websocket.send_json({
+            await self.send_json(websocket, {
                 "type": "join_result",
                 "success": False,
                 "error": "Player name is required"
@@ -348,7 +463,7 @@ class GameManager:
         # Check if player is already in the game
         if player_name in game.players:
             # Player is already in the game (e.g., host reconnecting)
-            await websocket.send_json({
+            await self.send_json(websocket, {
                 "type": "join_result",
                 "success": True,
                 "message": f"Reconnected to game as {player_name}",
@@ -357,7 +472,8 @@ class GameManager:
             
             # Send current game state to the reconnecting player
             game_state = game.get_game_state(requesting_player=player_name)
-            await websocket.send_json({
+            self.websocket_state_seq[websocket] = game_state["state_seq"]
+            await self.send_json(websocket, {
                 "type": "game_state",
                 "data": game_state
             })
@@ -395,7 +511,7 @@ class GameManager:
             })
         
         # Send result back to the joining player
-        await websocket.send_json({
+        await self.send_json(websocket, {
             "type": "join_result",
             "success": result["success"],
             "message": result.get("message"),
@@ -405,9 +521,9 @@ class GameManager:
     
     async def handle_get_valid_moves(self, websocket: WebSocket, game_id: str, data: dict):
         """Get valid moves for a specific domino"""
-        game = self.active_games.get(game_id)
+        game = self.get_game(game_id)
         if not game:
-            await websocket.send_json({
+            await self.send_json(websocket, {
                 "type": "valid_moves",
                 "moves": []
             })
@@ -415,7 +531,7 @@ class GameManager:
         
         player_name = self.websocket_players.get(websocket)
         if not player_name:
-            await websocket.send_json({
+            await self.send_json(websocket, {
                 "type": "valid_moves",
                 "moves": []
             })
@@ -447,16 +563,16 @@ class GameManager:
             }
             serialized_moves.append(serialized_move)
         
-        await websocket.send_json({
+        await self.send_json(websocket, {
             "type": "valid_moves",
             "moves": serialized_moves
         })
     
     async def handle_get_all_valid_moves(self, websocket: WebSocket, game_id: str, data: dict):
         """Get all valid moves for a player (checking all their dominos)"""
-        game = self.active_games.get(game_id)
+        game = self.get_game(game_id)
         if not game:
-            await websocket.send_json({
+            await self.send_json(websocket, {
                 "type": "all_valid_moves",
                 "moves": [],
                 "can_play": False,
@@ -466,7 +582,7 @@ class GameManager:
         
         player_id = data.get('player_id')
         if not player_id:
-            await websocket.send_json({
+            await self.send_json(websocket, {
                 "type": "all_valid_moves",
                 "moves": [],
                 "can_play": False,
@@ -495,7 +611,7 @@ class GameManager:
         can_play = len(serialized_moves) > 0
         must_draw = not can_play and game.get_current_player() == player_id
         
-        await websocket.send_json({
+        await self.send_json(websocket, {
             "type": "all_valid_moves",
             "moves": serialized_moves,
             "can_play": can_play,
@@ -504,10 +620,10 @@ class GameManager:
         })
     
     async def handle_start_game(self, websocket: WebSocket, game_id: str, data: dict):
-        """Handle host starting the game manually"""
-        game = self.active_games.get(game_id)
-        if not game:
-            await websocket.send_json({
+        """Handle host starting the match manually (its first game has not been created yet)"""
+        match = self.get_match(game_id)
+        if not match:
+            await self.send_json(websocket, {
                 "type": "start_game_result",
                 "success": False,
                 "error": "Game not found"
@@ -518,23 +634,33 @@ class GameManager:
         force_start = data.get("force", False)
         
         # Verify the requester is the host
-        if player_name != game.host:
-            await websocket.send_json({
+        if player_name != match.host:
+            await self.send_json(websocket, {
                 "type": "start_game_result",
                 "success": False,
                 "error": "Only the host can start the game"
             })
             return
         
-        # Start the game
-        result = game.start_game(force_start=force_start)
+        # Without force, a match that cannot fill its seats with AI needs its minimum players
+        if not force_start and not (match.ai_enabled and match.ai_fill_to_max) and len(match.players) < match.min_players:
+            await self.send_json(websocket, {
+                "type": "start_game_result",
+                "success": False,
+                "error": f"Need at least {match.min_players} players to start"
+            })
+            return
+        
+        # Start the match (creates its first game)
+        result = match.start_match()
         
         if result["success"]:
             # Broadcast to all players that the game has started
             await self.broadcast_to_game(game_id, {
                 "type": "game_started",
                 "data": {
-                    "message": "Host has started the game!"
+                    "message": "Host has started the game!",
+                    "match_state": match.get_match_state()
                 }
             })
             
@@ -545,13 +671,12 @@ class GameManager:
             })
             
             # Check if first player is AI and trigger their move
-            if game.get_current_player() in game.ai_players:
-                import asyncio
-                await asyncio.sleep(1.5)
-                await self.trigger_ai_moves(game_id)
+            game = match.current_game
+            if game and game.get_current_player() in game.ai_players:
+                self.schedule_ai_moves(game_id, AI_MOVE_PACING_SECONDS)
         
         # Send result back to the host
-        await websocket.send_json({
+        await self.send_json(websocket, {
             "type": "start_game_result",
             "success": result["success"],
             "message": result.get("message"),
@@ -560,9 +685,9 @@ class GameManager:
     
     async def handle_spectate_game(self, websocket: WebSocket, game_id: str, data: dict):
         """Handle a spectator joining a game"""
-        game = self.active_games.get(game_id)
+        game = self.get_game(game_id)
         if not game:
-            await websocket.send_json({
+            await self.send_json(websocket, {
                 "type": "spectate_result",
                 "success": False,
                 "error": "Game not found"
@@ -571,7 +696,7 @@ class GameManager:
         
         spectator_name = data.get("spectator_name")
         if not spectator_name:
-            await websocket.send_json({
+            await self.send_json(websocket, {
                 "type": "spectate_result", 
                 "success": False,
                 "error": "Spectator name is required"
@@ -600,13 +725,14 @@ class GameManager:
             
             # Send spectator-safe game state to the new spectator
             spectator_game_state = game.get_spectator_game_state()
-            await websocket.send_json({
+            self.websocket_state_seq[websocket] = spectator_game_state["state_seq"]
+            await self.send_json(websocket, {
                 "type": "game_state",
                 "data": spectator_game_state
             })
         
         # Send result back to the spectator
-        await websocket.send_json({
+        await self.send_json(websocket, {
             "type": "spectate_result",
             "success": result["success"],
             "message": result.get("message"),
@@ -614,62 +740,239 @@ class GameManager:
             "is_spectator": True
         })
     
+    async def handle_get_suggested_run(self, websocket: WebSocket, game_id: str):
+        """Send the player the longest run they could lay on their own train"""
+        game = self.get_game(game_id)
+        player_name = self.websocket_players.get(websocket)
+        if not game or not player_name:
+            return
+        
+        await self.send_json(websocket, {
+            "type": "suggested_run",
+            "data": game.get_suggested_run(player_name)
+        })
+    
+    async def handle_resync_state(self, websocket: WebSocket, game_id: str):
+        """Send a full snapshot to a client that missed a patch or lost its state"""
+        game = self.get_game(game_id)
+        if not game:
+            return
+        
+        self.websocket_state_seq.pop(websocket, None)
+        spectator = websocket in self.websocket_spectators
+        player_name = None if spectator else self.websocket_players.get(websocket)
+        self._sender_for(websocket).push(self._game_state_text(websocket, GameStateEncoder(game), player_name, spectator))
+    
+    def _game_state_text(self, websocket: WebSocket, encoder: GameStateEncoder, player_name: str = None,
+                         spectator: bool = False) -> str:
+        """Patch message when the socket is in sync, full snapshot otherwise, "" if nothing changed"""
+        since_seq = self.websocket_state_seq.get(websocket)
+        text = encoder.patch(since_seq, player_name) if since_seq is not None else None
+        if text is None:
+            text = encoder.snapshot(player_name, spectator)
+        self.websocket_state_seq[websocket] = encoder.state_seq
+        return text
+    
+    def _sender_for(self, websocket: WebSocket) -> ConnectionSender:
+        sender = self.connection_senders.get(websocket)
+        if sender is None:
+            sender = ConnectionSender(websocket, on_drop=self._drop_connection)
+            self.connection_senders[websocket] = sender
+        return sender
+    
+    async def send_json(self, websocket: WebSocket, message: dict):
+        """Queue a message for one game socket, in order with its broadcasts"""
+        self._sender_for(websocket).push(encode(message))
+    
+    def _drop_connection(self, websocket: WebSocket, reason: str):
+        """Stop broadcasting to a slow or broken consumer so it cannot hold up the rest of the game"""
+        self.logger.warning("Dropping websocket connection: %s", reason)
+        DROPPED_CONNECTIONS.labels(reason.split(":")[0]).inc()
+        self.connection_senders.pop(websocket, None)
+        self.websocket_state_seq.pop(websocket, None)
+        for connections in (self.game_connections, self.spectator_connections):
+            for sockets in connections.values():
+                sockets.discard(websocket)
+        asyncio.create_task(self._close_websocket(websocket))
+    
+    async def _close_websocket(self, websocket: WebSocket, code: int = 1013):
+        try:
+            await websocket.close(code=code)  # 1013: try again later - the client reconnects and gets a snapshot
+        except Exception:
+            pass
+    
     async def broadcast_to_game(self, game_id: str, message: dict):
-        # Send to players
-        if game_id in self.game_connections:
-            disconnected = set()
-            for websocket in self.game_connections[game_id]:
-                try:
-                    # For game_state messages, personalize the content
-                    if message.get("type") == "game_state":
-                        game = self.active_games.get(game_id)
-                        player_name = self.websocket_players.get(websocket)
-                        if game and player_name:
-                            personalized_message = {
-                                "type": "game_state", 
-                                "data": game.get_game_state(requesting_player=player_name)
-                            }
-                            await websocket.send_json(personalized_message)
-                        else:
-                            await websocket.send_json(message)
-                    else:
-                        await websocket.send_json(message)
-                except Exception:
-                    disconnected.add(websocket)
-            
-            # Remove disconnected websockets
-            for websocket in disconnected:
-                self.game_connections[game_id].discard(websocket)
-        
-        # Send to spectators (with spectator-safe game state if it's a game_state message)
-        if game_id in self.spectator_connections:
-            spectator_message = message
-            if message.get("type") == "game_state":
-                game = self.active_games.get(game_id)
-                if game:
-                    # Replace with spectator-safe game state
-                    spectator_message = {
-                        "type": "game_state",
-                        "data": game.get_spectator_game_state()
-                    }
-            
-            disconnected_spectators = set()
-            for websocket in self.spectator_connections[game_id]:
-                try:
-                    await websocket.send_json(spectator_message)
-                except Exception:
-                    disconnected_spectators.add(websocket)
-            
-            # Remove disconnected spectator websockets
-            for websocket in disconnected_spectators:
-                self.spectator_connections[game_id].discard(websocket)
+        """Encode once, then queue for every player and spectator socket without waiting on any of them"""
+        player_sockets = self.game_connections.get(game_id, set())
+        targets = list(player_sockets)
+        targets.extend(ws for ws in self.spectator_connections.get(game_id, set()) if ws not in player_sockets)
+        if not targets:
+            return
+        
+        started = time.perf_counter()
+        message_type = message.get("type", "unknown")
+        sent = 0
+        sent_chars = 0
+        
+        # game_state messages are personalized per socket as patches (or snapshots when out of sync)
+        game = self.get_game(game_id) if message_type == "game_state" else None
+        if not game:
+            text = encode(message)
+            for websocket in targets:
+                self._sender_for(websocket).push(text)
+            sent = len(targets)
+            sent_chars = len(text) * sent
+        else:
+            encoder = GameStateEncoder(game)
+            for websocket in targets:
+                spectator = websocket in self.websocket_spectators
+                player_name = None if spectator else self.websocket_players.get(websocket)
+                text = self._game_state_text(websocket, encoder, player_name, spectator)
+                if text:
+                    self._sender_for(websocket).push(text)
+                    sent += 1
+                    sent_chars += len(text)
+        
+        BROADCAST_SECONDS.labels(message_type).observe(time.perf_counter() - started)
+        BROADCAST_SENDS.labels(message_type).inc(sent)
+        BROADCAST_BYTES.labels(message_type).inc(sent_chars)
     
     def create_match_with_config(self, match_id: str, players: List[str], config: dict) -> MexicanTrainMatch:
         """Create a match with specific configuration options"""
         match = MexicanTrainMatch(match_id, players, config=config)
         self.active_matches[match_id] = match
+        if self.move_log:
+            self.move_log.open_match(match)
+        self.watch_match(match)
+        if self.backplane:
+            self.backplane.adopt_match(match)
         return match
     
+    def watch_match(self, match: MexicanTrainMatch):
+        """Route a match's command events to the move log and the shared state store"""
+        match_id = match.match_id
+        
+        def on_event(event: dict):
+            if event["op"] == "start_match":
+                self.scheduler.cancel((match_id, COUNTDOWN_TIMER))
+            elif event["op"] == "complete_game":
+                self.lifecycle_stats["games_compacted"] += 1
+                if match.match_completed:
+                    self.scheduler.call_later(FINISHED_MATCH_GRACE_SECONDS, (match_id, EVICT_TIMER),
+                                              self._evict_match, match_id)
+            if self.move_log:
+                self.move_log.record(match, event)
+            if self.backplane:
+                self.backplane.mark_dirty(match_id)
+            self._rearm_turn_timer(match_id)
+        match.set_event_sink(on_event)
+        self._rearm_turn_timer(match_id)
+    
+    # ========== TURN CLOCK ==========
+    
+    def _rearm_turn_timer(self, match_id: str):
+        """Re-check the turn deadline once the command in progress has finished"""
+        self.scheduler.call_later(0, (match_id, TURN_TIMER), self._arm_turn_timer, match_id)
+    
+    async def _arm_turn_timer(self, match_id: str):
+        game = self.get_game(match_id)
+        deadline = game.get_turn_deadline() if game else None
+        if deadline is None:
+            return
+        player = game.get_current_player()
+        delay = deadline - time.time()
+        if player in game.away_players:
+            delay = min(delay, AI_MOVE_PACING_SECONDS)  # Absent players are played at AI pace
+        self.scheduler.call_later(delay, (match_id, TURN_TIMER), self._turn_timeout,
+                                  match_id, player, game.turn_started_at)
+    
+    def _is_player_connected(self, game_id: str, player_name: str) -> bool:
+        return any(self.websocket_players.get(websocket) == player_name
+                   for websocket in self.game_connections.get(game_id, ()))
+    
+    async def _turn_timeout(self, game_id: str, player: str, turn_started_at: float):
+        """The player's turn clock ran out: their seat's strategy plays (or draws) for them"""
+        game = self.get_game(game_id)
+        if not game or game.get_current_player() != player or game.turn_started_at != turn_started_at:
+            return  # The turn moved on in the meantime
+        
+        # Nobody can move any more - score the hands instead of passing forever
+        if game.is_game_over():
+            self.logger.info("Game %s is blocked - ending it", game_id)
+            await self._finish_game(game_id, game.end_blocked_game())
+            return
+        
+        if player not in game.ai_players and not self._is_player_connected(game_id, player):
+            game.set_player_away(player, True)
+        self.logger.info("%s's turn clock ran out in game %s - auto-playing", player, game_id)
+        try:
+            result = await game.make_ai_move(player, deadline=AI_MOVE_DEADLINE_SECONDS)
+        except Exception as e:
+            result = {"success": False, "error": f"Auto-play failed: {e}"}
+        # A successful play keeps the turn when it was a double (it must be covered next), so only failures pass
+        if not result.get("success") and game.get_current_player() == player and game.turn_started_at == turn_started_at:
+            game.next_turn()  # Auto-play could not move; pass so the match never stalls
+        
+        await self.broadcast_to_game(game_id, {
+            "type": "turn_timeout",
+            "data": {
+                "player": player,
+                "away": player in game.away_players,
+                "result": result
+            }
+        })
+        await self.broadcast_to_game(game_id, {
+            "type": "game_state",
+            "data": {}  # Will be personalized in broadcast_to_game
+        })
+        
+        if result.get("game_ended"):
+            self.logger.info("Game %s ended on an auto-played move! Winner: %s", game_id, result.get('winner'))
+            await self._finish_game(game_id, result)
+            return
+        if game.get_current_player() in game.ai_players:
+            self.schedule_ai_moves(game_id, AI_MOVE_PACING_SECONDS)
+    
+    async def remove_match(self, match_id: str):
+        """Drop a match with its connections, pending timers and persisted state"""
+        self.scheduler.cancel_match(match_id)
+        self.active_matches.pop(match_id, None)
+        self.game_connections.pop(match_id, None)
+        self.spectator_connections.pop(match_id, None)
+        if self.move_log:
+            self.move_log.retire_match(match_id)
+        if self.backplane:
+            await self.backplane.drop_match(match_id)
+    
+    async def _evict_match(self, match_id: str):
+        """Unload a finished match once its grace period is over"""
+        match = self.active_matches.get(match_id)
+        if match is None:
+            return
+        # Snapshot size approximates the memory the match held
+        self.lifecycle_stats["evicted_bytes"] += len(dump_match_snapshot(match))
+        self.lifecycle_stats["matches_evicted"] += 1
+        
+        sockets = set(self.game_connections.get(match_id, set())) | self.spectator_connections.get(match_id, set())
+        await self.remove_match(match_id)
+        # Let queued messages (the final game_ended / match_ended state) reach each client before closing
+        senders = [self.connection_senders[websocket] for websocket in sockets if websocket in self.connection_senders]
+        await asyncio.gather(*(sender.flush(EVICT_FLUSH_SECONDS) for sender in senders))
+        for websocket in sockets:
+            await self._close_websocket(websocket, code=1000)
+        self.logger.info("Evicted finished match %s (%s matches loaded)", match_id, len(self.active_matches))
+    
+    async def claim_match(self, match_id: str) -> bool:
+        """Whether this node serves the match; False means another node owns it (see relay_websocket)"""
+        if not self.backplane:
+            return True
+        return await self.backplane.claim_match(match_id)
+    
+    async def relay_websocket(self, websocket: WebSocket, match_id: str, user_id: str = None, display_name: str = None,
+                              account_id: Optional[int] = None):
+        """Serve a client of a match owned by another node"""
+        await self.backplane.relay_websocket(websocket, match_id, user_id, display_name, account_id)
+    
     def get_match(self, match_id: str) -> MexicanTrainMatch:
         return self.active_matches.get(match_id)
     
@@ -758,18 +1061,21 @@ class GameManager:
             await self.handle_display_name_update(websocket, data)
         # Add more lobby message types as needed
     
-    async def _delayed_ai_move(self, game_id: str, ai_player: str, delay: float = 0.5):
-        """Trigger an AI move after a short delay"""
-        await asyncio.sleep(delay)
-        game = self.active_games.get(game_id)
+    def schedule_ai_moves(self, game_id: str, delay: float = 0.0, attempts: int = 0):
+        """Run trigger_ai_moves after delay, replacing any AI move already pending for the game"""
+        self.scheduler.call_later(delay, (game_id, AI_MOVE_TIMER), self.trigger_ai_moves, game_id, attempts)
+    
+    async def _delayed_ai_move(self, game_id: str, ai_player: str):
+        """AI move scheduled shortly after a draw passed the turn to this AI"""
+        game = self.get_game(game_id)
         if not game:
             return
             
         # Check if it's still this AI's turn
         if game.get_current_player() == ai_player:
-            print(f"🤖 Executing delayed AI move for {ai_player}")
+            self.logger.debug("Executing delayed AI move for %s", ai_player)
             try:
-                ai_result = await game.make_ai_move(ai_player)
+                ai_result = await game.make_ai_move(ai_player, deadline=AI_MOVE_DEADLINE_SECONDS)
                 
                 # Broadcast the AI move result
                 await self.broadcast_to_game(game_id, {
@@ -783,137 +1089,110 @@ class GameManager:
                     "data": {}
                 })
                 
-                # Continue triggering AI moves if needed
-                if ai_result.get("success") and ai_result.get("should_trigger_ai"):
-                    await self.trigger_ai_moves(game_id)
+                if ai_result.get("game_ended"):
+                    self.logger.info("Game %s ended after AI move! Winner: %s", game_id, ai_result.get('winner'))
+                    await self._finish_game(game_id, ai_result)
+                # Later AI moves go through the paced timer, so only one AI chain runs per game
+                elif game.get_current_player() in game.ai_players:
+                    self.schedule_ai_moves(game_id, AI_MOVE_PACING_SECONDS)
                     
             except Exception as e:
-                print(f"❌ Error in delayed AI move for {ai_player}: {e}")
+                self.logger.error("Error in delayed AI move for %s: %s", ai_player, e)
     
-    async def trigger_ai_moves(self, game_id: str):
-        """Trigger AI players to make their moves"""
-        game = self.active_games.get(game_id)
+    async def trigger_ai_moves(self, game_id: str, attempts: int = 0):
+        """Make the current AI player's move; the next AI's move is scheduled AI_MOVE_PACING_SECONDS later"""
+        game = self.get_game(game_id)
         if not game:
             return
         
         max_attempts = 10  # Prevent infinite loops
-        attempts = 0
         
-        # Keep making AI moves while it's an AI player's turn
-        while game.get_current_player() in game.ai_players and attempts < max_attempts:
-            current_ai = game.get_current_player()
-            print(f"\n🤖 Triggering AI move for {current_ai} (attempt {attempts + 1})")
-            
-            try:
-                # Make the AI move with timeout
-                import asyncio
-                ai_result = await asyncio.wait_for(
-                    game.make_ai_move(current_ai),
-                    timeout=5.0  # 5 second timeout for AI moves
-                )
-                
-                # Broadcast AI move result
-                await self.broadcast_to_game(game_id, {
-                    "type": "ai_move",
-                    "data": {
-                        "player": current_ai,
-                        "result": ai_result
-                    }
-                })
-                
-                # Broadcast updated game state
-                await self.broadcast_to_game(game_id, {
-                    "type": "game_state",
-                    "data": {}  # Will be personalized in broadcast_to_game
-                })
-                
-                # Add a delay between AI moves for visual effect
-                await asyncio.sleep(1.5)
-                
-                # Check if the game ended
-                if ai_result.get("game_ended"):
-                    print(f"🎉 Game {game_id} ended after AI move! Winner: {ai_result.get('winner')}")
-                    await self.broadcast_to_game(game_id, {
-                        "type": "game_ended",
-                        "data": {
-                            "winner": ai_result.get("winner"),
-                            "final_scores": ai_result.get("final_scores"),
-                            "is_match_game": ai_result.get("is_match_game", False),
-                            "match_id": ai_result.get("match_id"),
-                            "game_number": ai_result.get("game_number", 1)
-                        }
-                    })
-                    
-                    # Check if this was part of a match and handle match progression
-                    if ai_result.get("is_match_game") and ai_result.get("match_id"):
-                        match_id = ai_result.get("match_id")
-                        match = self.active_matches.get(match_id)
-                        if match and match.current_game:
-                            # Complete the current game in the match
-                            match_result = match.complete_current_game(ai_result.get("final_scores", {}))
-                            
-                            if match_result.get("match_completed"):
-                                print(f"🏆 Match {match_id} completed! Winner: {match_result.get('winner')}")
-                                await self.broadcast_to_game(game_id, {
-                                    "type": "match_ended",
-                                    "data": {
-                                        "winner": match_result.get("winner"),
-                                        "final_scores": match_result.get("final_scores"),
-                                        "game_history": match_result.get("game_history"),
-                                        "total_games": len(match_result.get("game_history", []))
-                                    }
-                                })
-                    
-                    break
-                    
-            except asyncio.TimeoutError:
-                print(f"❌ AI move timeout for {current_ai}")
-                # Force pass turn if AI times out
-                game.next_turn()
-                await self.broadcast_to_game(game_id, {
-                    "type": "ai_error",
-                    "data": {
-                        "player": current_ai,
-                        "error": "AI move timed out, passing turn"
-                    }
-                })
-                
-                # Broadcast updated game state so players see the turn change
-                await self.broadcast_to_game(game_id, {
-                    "type": "game_state",
-                    "data": {}  # Will be personalized in broadcast_to_game
-                })
-                break
-                
-            except Exception as e:
-                print(f"❌ AI move error for {current_ai}: {e}")
-                # Force pass turn if AI has an error
-                game.next_turn()
-                await self.broadcast_to_game(game_id, {
-                    "type": "ai_error",
-                    "data": {
-                        "player": current_ai,
-                        "error": f"AI error: {str(e)}"
-                    }
-                })
-                
-                # Broadcast updated game state so players see the turn change
-                await self.broadcast_to_game(game_id, {
-                    "type": "game_state",
-                    "data": {}  # Will be personalized in broadcast_to_game
-                })
-                break
-            
-            attempts += 1
+        # Only while it's an AI player's turn; each move schedules the next
+        current_ai = game.get_current_player()
+        if current_ai not in game.ai_players:
+            return
         
         if attempts >= max_attempts:
-            print(f"❌ Max AI attempts reached for game {game_id}")
+            self.logger.warning("Max AI attempts reached for game %s", game_id)
             await self.broadcast_to_game(game_id, {
                 "type": "game_error",
                 "data": {
                     "error": "AI players stuck in loop, game may need manual intervention"
                 }
             })
+            return
+        
+        self.logger.debug("Triggering AI move for %s (attempt %s)", current_ai, attempts + 1)
+        
+        try:
+            # Decision runs on the AI worker pool; the outer timeout is only a safety net
+            ai_result = await asyncio.wait_for(
+                game.make_ai_move(current_ai, deadline=AI_MOVE_DEADLINE_SECONDS),
+                timeout=5.0  # 5 second timeout for AI moves
+            )
+            
+            # Broadcast AI move result
+            await self.broadcast_to_game(game_id, {
+                "type": "ai_move",
+                "data": {
+                    "player": current_ai,
+                    "result": ai_result
+                }
+            })
+            
+            # Broadcast updated game state
+            await self.broadcast_to_game(game_id, {
+                "type": "game_state",
+                "data": {}  # Will be personalized in broadcast_to_game
+            })
+            
+            # Check if the game ended
+            if ai_result.get("game_ended"):
+                self.logger.info("Game %s ended after AI move! Winner: %s", game_id, ai_result.get('winner'))
+                await self._finish_game(game_id, ai_result)
+                return
+                
+        except asyncio.TimeoutError:
+            self.logger.warning("AI move timeout for %s", current_ai)
+            # Force pass turn if AI times out
+            game.next_turn()
+            await self.broadcast_to_game(game_id, {
+                "type": "ai_error",
+                "data": {
+                    "player": current_ai,
+                    "error": "AI move timed out, passing turn"
+                }
+            })
+            
+            # Broadcast updated game state so players see the turn change
+            await self.broadcast_to_game(game_id, {
+                "type": "game_state",
+                "data": {}  # Will be personalized in broadcast_to_game
+            })
+            return
+            
+        except Exception as e:
+            self.logger.error("AI move error for %s: %s", current_ai, e)
+            # Force pass turn if AI has an error
+            game.next_turn()
+            await self.broadcast_to_game(game_id, {
+                "type": "ai_error",
+                "data": {
+                    "player": current_ai,
+                    "error": f"AI error: {str(e)}"
+                }
+            })
+            
+            # Broadcast updated game state so players see the turn change
+            await self.broadcast_to_game(game_id, {
+                "type": "game_state",
+                "data": {}  # Will be personalized in broadcast_to_game
+            })
+            return
+        
+        # Add a delay between AI moves for visual effect
+        if game.get_current_player() in game.ai_players:
+            self.schedule_ai_moves(game_id, AI_MOVE_PACING_SECONDS, attempts + 1)
     
     async def handle_display_name_update(self, websocket: WebSocket, data: dict):
         """Handle display name updates from lobby"""
@@ -923,7 +1202,7 @@ class GameManager:
         if not user_id or not new_display_name:
             return
         
-        print(f"Updating display name for {user_id} to {new_display_name}")
+        self.logger.info("Updating display name for %s to %s", user_id, new_display_name)
         
         # Update the lobby users mapping for this websocket
         if websocket in self.lobby_users:
@@ -933,7 +1212,10 @@ class GameManager:
             }
         
         # Update any active games where this user is playing
-        for game_id, game in self.active_games.items():
+        for game_id, match in self.active_matches.items():
+            game = match.current_game
+            if not game:
+                continue
             try:
                 game_state = game.get_game_state()
                 players = game_state.get("players", [])
@@ -944,10 +1226,10 @@ class GameManager:
                     # Update the player name in the game
                     # This is a simplified approach - in a full implementation,
                     # you'd want to update the actual game state
-                    print(f"User {user_id} ({new_display_name}) is in game {game_id}")
+                    self.logger.debug("User %s (%s) is in game %s", user_id, new_display_name, game_id)
                     
             except Exception as e:
-                print(f"Error updating game {game_id}: {e}")
+                self.logger.error("Error updating game %s: %s", game_id, e)
         
         # Send confirmation back to the client
         await websocket.send_json({
@@ -957,4 +1239,41 @@ class GameManager:
         })
 
 # Global game manager instance
-game_manager = GameManager()
\ No newline at end of file
+game_manager = GameManager()
+
+# ========== SCRAPE-TIME GAUGES ==========
+
+def _shard_label() -> str:
+    return str(settings.shard_index) if is_sharded() else "0"
+
+def _count_players() -> Dict[Tuple[str, ...], float]:
+    humans = ai = 0
+    for match in game_manager.active_matches.values():
+        ai += len(match.ai_players)
+        humans += len(match.players) - len(match.ai_players)
+    return {(_shard_label(), "human"): humans, (_shard_label(), "ai"): ai}
+
+def _send_queue_depths() -> Dict[Tuple[str, ...], float]:
+    depths = [sender.depth for sender in game_manager.connection_senders.values()]
+    return {("total",): sum(depths), ("max",): max(depths, default=0)}
+
+Gauge("mexican_train_active_matches", "Matches loaded on this shard, by whether they have started", ["shard", "state"],
+      collect=lambda: {
+          (_shard_label(), "started"): sum(1 for m in game_manager.active_matches.values() if m.match_started),
+          (_shard_label(), "waiting"): sum(1 for m in game_manager.active_matches.values() if not m.match_started)
+      })
+Gauge("mexican_train_players", "Seated players in loaded matches on this shard", ["shard", "kind"],
+      collect=_count_players)
+Gauge("mexican_train_spectators", "Spectators in loaded matches on this shard", ["shard"],
+      collect=lambda: {(_shard_label(),): sum(len(m.spectators) for m in game_manager.active_matches.values())})
+Gauge("mexican_train_websockets", "Open websockets on this shard", ["shard", "kind"],
+      collect=lambda: {
+          (_shard_label(), "game"): sum(len(c) for c in game_manager.game_connections.values()),
+          (_shard_label(), "lobby"): len(game_manager.lobby_connections)
+      })
+Gauge("mexican_train_send_queue_messages", "Messages waiting in websocket send queues (total, and the deepest queue)",
+      ["stat"], collect=_send_queue_depths)
+Gauge("mexican_train_scheduled_timers", "Pending scheduler timers (AI pacing, countdowns, turn clocks, evictions)",
+      collect=lambda: {(): len(game_manager.scheduler)})
+Gauge("mexican_train_results_queue", "Finished games/matches waiting to be written to the database",
+      collect=lambda: {(): game_manager.results.queue.qsize() if game_manager.results else None})
\ No newline at end of file
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Login Storm Benchmark
+Measures event-loop lag while many concurrent logins look up their user, comparing the
+old pattern (blocking Session queries inside async handlers) with the async session
+that the auth routes now use. Password hashing is left out: it is CPU work that blocks
+either way, so it would only hide the difference in database access.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "app"))
+
+TICK_SECONDS = 0.005  # How often the lag probe expects to run
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Event-loop lag under a login storm: sync vs async database sessions")
+    parser.add_argument('--database-url', default='sqlite:///login_storm.db',
+                        help='Database to benchmark (default: a local SQLite file). Use a scratch database - users named storm_* are created and removed')
+    parser.add_argument('--users', type=int, default=1000, help='Users seeded for the storm (default: 1000)')
+    parser.add_argument('--logins', type=int, default=5000, help='Total logins per mode (default: 5000)')
+    parser.add_argument('--concurrency', type=int, default=200, help='Logins in flight at once (default: 200)')
+    parser.add_argument('--mode', choices=['sync', 'async', 'both'], default='both', help='Which session mode to run (default: both)')
+    return parser.parse_args()
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+async def probe_lag(samples: list, stop: asyncio.Event):
+    """Sleep TICK_SECONDS at a time and record how late each wakeup was"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        samples.append(max(0.0, loop.time() - expected))
+
+async def run_storm(mode: str, emails: list, logins: int, concurrency: int) -> dict:
+    from datetime import datetime, timezone
+    from sqlalchemy import select
+    from app.core.database import SessionLocal, AsyncSessionLocal
+    from app.models.user import User
+
+    async def login_sync(email: str):
+        # What the auth routes did before: blocking queries on the event loop
+        db = SessionLocal()
+        try:
+            user = db.query(User).filter(User.email == email).first()
+            user.last_seen = datetime.now(timezone.utc)
+            db.commit()
+        finally:
+            db.close()
+
+    async def login_async(email: str):
+        async with AsyncSessionLocal() as db:
+            user = await db.scalar(select(User).where(User.email == email).limit(1))
+            user.last_seen = datetime.now(timezone.utc)
+            await db.commit()
+
+    login = login_sync if mode == 'sync' else login_async
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(index: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await login(emails[index % len(emails)])
+            latencies.append(time.perf_counter() - started)
+
+    lag = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_lag(lag, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    return {
+        "mode": mode,
+        "logins_per_second": logins / elapsed,
+        "login_p50_ms": percentile(latencies, 0.5) * 1000,
+        "login_p99_ms": percentile(latencies, 0.99) * 1000,
+        "lag_p50_ms": percentile(lag, 0.5) * 1000,
+        "lag_p99_ms": percentile(lag, 0.99) * 1000,
+        "lag_max_ms": max(lag, default=0.0) * 1000,
+        "lag_mean_ms": statistics.mean(lag) * 1000 if lag else 0.0
+    }
+
+async def main():
+    args = parse_args()
+    # Settings are read at import time, so point them at the benchmark database first
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from sqlalchemy import delete
+    from app.core.database import Base, engine, SessionLocal, async_engine
+    from app.models import user, game, game_history
+    from app.models.user import User
+
+    Base.metadata.create_all(bind=engine)
+    emails = [f"storm_{i}@example.com" for i in range(args.users)]
+    with SessionLocal() as db:
+        db.execute(delete(User).where(User.username.like("storm_%")))
+        db.add_all(User(username=f"storm_{i}", email=email, hashed_password="x", is_email_verified=True)
+                   for i, email in enumerate(emails))
+        db.commit()
+
+    modes = ['sync', 'async'] if args.mode == 'both' else [args.mode]
+    print(f"🌩️  {args.logins} logins, {args.concurrency} in flight, {args.users} users on {engine.url.get_backend_name()}")
+    print(f"{'mode':<6} {'logins/s':>9} {'login p50':>10} {'login p99':>10} {'lag p50':>8} {'lag p99':>8} {'lag max':>8}")
+    try:
+        for mode in modes:
+            result = await run_storm(mode, emails, args.logins, args.concurrency)
+            print(f"{result['mode']:<6} {result['logins_per_second']:>9.0f} {result['login_p50_ms']:>8.1f}ms "
+                  f"{result['login_p99_ms']:>8.1f}ms {result['lag_p50_ms']:>6.1f}ms {result['lag_p99_ms']:>6.1f}ms "
+                  f"{result['lag_max_ms']:>6.1f}ms")
+    finally:
+        with SessionLocal() as db:
+            db.execute(delete(User).where(User.username.like("storm_%")))
+            db.commit()
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,29 @@
+"""
+Shared test setup
+Points the app at a throwaway SQLite database before any test imports app.core.database.
+Also holds helpers shared by the test modules (imported with `from conftest import ...`).
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault(
+    "DATABASE_URL",
+    "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="mexican_train_tests_"), "test.db")
+)
+
+
+def play_random_step(game, rng) -> bool:
+    """Make one random legal action (play, else draw, else pass); False once the game is over"""
+    if game.is_game_over():
+        return False
+    player = game.get_current_player()
+    moves = game.get_valid_moves(player)
+    if moves:
+        move = rng.choice(moves)
+        assert game.make_move(player, move["domino"], move["train"], move["train_owner"])["success"]
+    elif game.boneyard_mask:
+        game.draw_from_boneyard(player)
+    else:
+        game.next_turn()
+    return not game.is_game_over()
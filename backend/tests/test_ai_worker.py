@@ -0,0 +1,83 @@
+"""
+AI worker offload: snapshots carry only what the AI may see, and decisions scored
+from them (in a worker process or not) match in-process decisions
+"""
+
+import asyncio
+import pickle
+import random
+
+import pytest
+
+from app.core.ai_config import ai_config
+from app.game import ai_worker
+from app.game.ai_worker import choose_move_from_snapshot, shutdown_ai_executor
+from app.game.mexican_train import MexicanTrainGame
+from conftest import play_random_step
+
+
+def test_snapshot_holds_only_the_ai_players_own_tiles():
+    game = MexicanTrainGame("g", ["a", "b", "c"], config={"seed": 1})
+    game.setup_round()
+    moves = game.get_valid_moves("a") or [{"domino": game.tile_set.tiles[0], "train": "mexican", "train_owner": None}]
+    snapshot = game.get_ai_snapshot("a", moves, ai_config.get_strategy(5))
+    assert "hand_masks" not in snapshot and "boneyard_mask" not in snapshot
+    assert snapshot["hand_mask"] == game.hand_masks["a"]
+    assert snapshot["hand_counts"] == {player: mask.bit_count() for player, mask in game.hand_masks.items()}
+    assert snapshot["boneyard_count"] == game.boneyard_mask.bit_count()
+
+    rebuilt, _ = MexicanTrainGame.from_ai_snapshot(pickle.loads(pickle.dumps(snapshot)))
+    assert set(rebuilt.hand_masks) == {"a"}
+    for player in game.players:
+        assert rebuilt.hand_count(player) == game.hand_count(player)
+        for number in range(game.max_domino + 1):
+            assert rebuilt.unseen_pip_count("a", number) == game.unseen_pip_count("a", number)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_snapshot_decisions_match_in_process_ones(seed):
+    game = MexicanTrainGame("g", ["a", "b", "c", "d"], config={"seed": seed})
+    game.setup_round()
+    rng = random.Random(seed)
+    strategies = [ai_config.get_strategy_by_name(name) for name in ai_config.strategies]
+    checked = 0
+    while True:
+        player = game.get_current_player()
+        moves = game.get_valid_moves(player)
+        for strategy in strategies if moves else []:
+            snapshot = pickle.loads(pickle.dumps(game.get_ai_snapshot(player, moves, strategy)))
+            index, reason, rng_state = choose_move_from_snapshot(snapshot)
+            chosen = game._apply_strategy(player, moves, strategy)
+            assert moves[index] is chosen and reason == chosen["reason"]
+            assert rng_state == game.rng.getstate()
+            checked += 1
+        if not play_random_step(game, rng):
+            break
+    assert checked
+
+
+def test_worker_pool_decisions_match_in_process_ones():
+    offloaded = MexicanTrainGame("g", ["a", "b", "c"], config={"seed": 42})
+    in_process = MexicanTrainGame("g", ["a", "b", "c"], config={"seed": 42})
+
+    async def scenario():
+        for game, deadline in ((offloaded, 30.0), (in_process, None)):
+            game.setup_round()
+            game.ai_skill_level = 5
+            for _ in range(30):
+                await game.make_ai_move(game.get_current_player(), deadline=deadline)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        shutdown_ai_executor()
+    assert offloaded.hand_masks == in_process.hand_masks
+    assert offloaded.rng.getstate() == in_process.rng.getstate()
+
+
+def test_worker_pool_does_not_fork_the_server():
+    try:
+        executor = ai_worker.get_ai_executor()
+        assert executor._mp_context.get_start_method() in ("forkserver", "spawn")
+    finally:
+        shutdown_ai_executor()
@@ -0,0 +1,31 @@
+"""
+Access tokens: the game websocket trusts an account id only from a signed, unexpired token
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from jose import jwt
+
+from app.core.config import settings
+from app.utils.auth import AuthUtils
+
+
+def test_access_token_names_its_account():
+    token = AuthUtils.create_access_token(42, "alice@example.com")
+    assert AuthUtils.decode_access_token(token) == 42
+
+
+def test_missing_forged_and_expired_tokens_are_rejected():
+    claims = {"sub": "42", "exp": datetime.now(timezone.utc) + timedelta(minutes=5)}
+    forged = jwt.encode(claims, settings.secret_key + "-guess", algorithm=settings.algorithm)
+    expired = jwt.encode(dict(claims, exp=datetime.now(timezone.utc) - timedelta(minutes=1)),
+                         settings.secret_key, algorithm=settings.algorithm)
+    token = AuthUtils.create_access_token(42, "alice@example.com")
+    tampered = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+
+    assert AuthUtils.decode_access_token(None) is None
+    assert AuthUtils.decode_access_token("") is None
+    assert AuthUtils.decode_access_token("not-a-token") is None
+    assert AuthUtils.decode_access_token(forged) is None
+    assert AuthUtils.decode_access_token(expired) is None
+    assert AuthUtils.decode_access_token(tampered) is None
@@ -0,0 +1,155 @@
+"""
+Tile bitmasks: TileSet tables, the memoized chain solver against a plain list search,
+and the game invariants that depend on them (tile conservation, valid moves)
+"""
+
+import random
+from itertools import combinations
+from typing import List
+
+import pytest
+
+from app.game.bitboard import TileMaskView, best_chain, get_tile_set, iter_bits, longest_chain
+from app.game.mexican_train import Domino, MexicanTrainGame
+from conftest import play_random_step
+
+
+def list_chain_length(hand: List[Domino], start: int) -> int:
+    """The list-based search the bitmask solver replaced: try every connecting tile, recurse"""
+    best = 0
+    for i, domino in enumerate(hand):
+        if domino.left == start or domino.right == start:
+            next_number = domino.right if domino.left == start else domino.left
+            best = max(best, 1 + list_chain_length(hand[:i] + hand[i + 1:], next_number))
+    return best
+
+
+def random_masks(tile_set, count: int, max_tiles: int, seed: int):
+    rng = random.Random(seed)
+    for _ in range(count):
+        indices = rng.sample(range(tile_set.size), rng.randint(0, max_tiles))
+        yield sum(1 << index for index in indices)
+
+
+def test_iter_bits_yields_set_bits_lowest_first():
+    assert list(iter_bits(0)) == []
+    assert list(iter_bits(0b101001)) == [0, 3, 5]
+    assert list(iter_bits(1 << 90)) == [90]
+
+
+@pytest.mark.parametrize("max_domino", [6, 9, 12])
+def test_tile_set_tables(max_domino):
+    tile_set = get_tile_set(max_domino)
+    assert tile_set is get_tile_set(max_domino)
+    assert tile_set.size == (max_domino + 1) * (max_domino + 2) // 2
+    assert tile_set.full_mask == (1 << tile_set.size) - 1
+    assert tile_set.double_mask.bit_count() == max_domino + 1
+
+    for index, domino in enumerate(tile_set.tiles):
+        assert tile_set.index_by_id[domino.id] == index
+        assert tile_set.index_of(Domino(domino.right, domino.left)) == index
+        assert tile_set.values[index] == domino.left + domino.right
+    for number, pip_mask in enumerate(tile_set.pip_masks):
+        assert {tile_set.tiles[index].id for index in iter_bits(pip_mask)} == {
+            domino.id for domino in tile_set.tiles if number in (domino.left, domino.right)
+        }
+        assert tile_set.double_index[number] == tile_set.index_by_pips[(number, number)]
+
+    mask = sum(1 << index for index in range(0, tile_set.size, 3))
+    dominoes = tile_set.dominoes(mask)
+    assert tile_set.mask_value(mask) == sum(domino.value() for domino in dominoes)
+    assert [tile["id"] for tile in tile_set.serialize(mask)] == [domino.id for domino in dominoes]
+
+
+def test_tile_mask_view_reads_like_a_list():
+    tile_set = get_tile_set(6)
+    mask = (1 << 2) | (1 << 10)
+    view = TileMaskView(tile_set, mask)
+    assert len(view) == 2 and bool(view) and not TileMaskView(tile_set, 0)
+    assert list(view) == [tile_set.tiles[2], tile_set.tiles[10]]
+    assert view[1] is tile_set.tiles[10]
+    assert tile_set.tiles[2] in view and tile_set.tiles[3] not in view
+
+
+@pytest.mark.parametrize("max_domino,max_tiles", [(6, 10), (12, 9)])
+def test_longest_chain_matches_list_search(max_domino, max_tiles):
+    tile_set = get_tile_set(max_domino)
+    for mask in random_masks(tile_set, 150, max_tiles, seed=max_domino):
+        hand = tile_set.dominoes(mask)
+        for start in range(max_domino + 1):
+            assert longest_chain(tile_set, mask, start) == list_chain_length(hand, start), (mask, start)
+
+
+def test_longest_chain_on_every_small_hand():
+    tile_set = get_tile_set(3)
+    for size in range(tile_set.size + 1):
+        for indices in combinations(range(tile_set.size), size):
+            mask = sum(1 << index for index in indices)
+            hand = tile_set.dominoes(mask)
+            for start in range(4):
+                assert longest_chain(tile_set, mask, start) == list_chain_length(hand, start)
+
+
+@pytest.mark.parametrize("max_domino,max_tiles", [(6, 12), (12, 12)])
+def test_best_chain_is_a_playable_longest_chain(max_domino, max_tiles):
+    tile_set = get_tile_set(max_domino)
+    for mask in random_masks(tile_set, 150, max_tiles, seed=100 + max_domino):
+        for start in range(max_domino + 1):
+            chain = best_chain(tile_set, mask, start)
+            assert len(chain) == longest_chain(tile_set, mask, start)
+            end = start
+            used = 0
+            for index, matched, exposed in chain:
+                assert mask >> index & 1 and not used >> index & 1
+                assert matched == end and sorted(tile_set.pips[index]) == sorted((matched, exposed))
+                used |= 1 << index
+                end = exposed
+
+
+def brute_force_moves(game: MexicanTrainGame, player: str):
+    """Every (tile, train, owner) the player can play, checking each hand tile against each train end"""
+    moves = set()
+    for domino in game.player_hands[player]:
+        for train_type, train_owner, train in game._playable_trains(player):
+            required = train.get_end_value() if train.dominoes else game.current_round
+            if domino.matches(required):
+                moves.add((domino.id, train_type, train_owner))
+    return moves
+
+
+def table_mask(game: MexicanTrainGame) -> int:
+    tile_set = game.tile_set
+    mask = 1 << tile_set.index_of(game.engine_domino)
+    trains = list(game.trains.values()) + ([game.mexican_train] if game.mexican_train else [])
+    for train in trains:
+        for domino in train.dominoes:
+            index = tile_set.index_of(domino)
+            assert not mask >> index & 1, f"{domino.id} is on the table twice"
+            mask |= 1 << index
+    return mask
+
+
+def assert_tiles_conserved(game: MexicanTrainGame):
+    """Every tile is in exactly one hand, the boneyard or on the table"""
+    places = list(game.hand_masks.values()) + [game.boneyard_mask, table_mask(game)]
+    seen = 0
+    for mask in places:
+        assert not seen & mask, "a tile is in two places"
+        seen |= mask
+    assert seen == game.tile_set.full_mask
+    assert sorted(game.draw_pile) == list(iter_bits(game.boneyard_mask))
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_played_game_keeps_tiles_and_valid_moves_consistent(seed):
+    game = MexicanTrainGame("g", ["a", "b", "c"], config={"seed": seed})
+    game.setup_round()
+    rng = random.Random(seed)
+    for _ in range(400):
+        assert_tiles_conserved(game)
+        player = game.get_current_player()
+        moves = game.get_valid_moves(player)
+        assert {(move["domino"].id, move["train"], move["train_owner"]) for move in moves} == brute_force_moves(game, player)
+        if not play_random_step(game, rng):
+            break
+    assert_tiles_conserved(game)
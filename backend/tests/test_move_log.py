@@ -0,0 +1,146 @@
+"""
+MoveLog: events written through the group-commit path replay to the same match state,
+with or without snapshots, and finished or deleted matches are not recovered
+"""
+
+import asyncio
+import random
+
+import pytest
+
+import app.game.move_log as move_log
+from app.game.mexican_train import MexicanTrainMatch
+from app.game.move_log import MoveLog
+from conftest import play_random_step
+
+
+def match_state(match: MexicanTrainMatch):
+    game = match.current_game
+    game_state = None
+    if game is not None:
+        game_state = (
+            game.hand_masks, game.boneyard_mask, game.draw_pile, game.current_player_index,
+            {owner: ([d.id for d in train.dominoes], train.is_open) for owner, train in game.trains.items()},
+            game.mexican_train and [d.id for d in game.mexican_train.dominoes],
+            game.unsatisfied_doubles, game.player_has_played_double, game.players,
+        )
+    return (match.record_id, match.player_accounts, match.match_scores, match.current_game_number,
+            match.games_played, match.match_completed, game_state)
+
+
+def new_logged_match(log: MoveLog, match_id: str, seed: int, games: int = 2) -> MexicanTrainMatch:
+    match = MexicanTrainMatch(match_id, ["A", "B"], {"seed": seed, "games_to_play": games, "max_players": 3})
+    log.open_match(match)
+    match.set_event_sink(lambda event: log.record(match, event))
+    match.link_account("A", 1)
+    match.start_match()
+    return match
+
+
+def play(match: MexicanTrainMatch, steps: int, rng: random.Random):
+    """Random legal actions, finishing games (and the match) as they end"""
+    for _ in range(steps):
+        game = match.current_game
+        if match.match_completed or game is None:
+            return
+        if not play_random_step(game, rng):
+            match.complete_current_game({p: game.tile_set.mask_value(mask) for p, mask in game.hand_masks.items()})
+
+
+def flush(log: MoveLog):
+    """Write whatever the flusher would write next, without waiting for it"""
+    log._write_batch(*log._take_batch())
+
+
+def recover(log_dir) -> dict:
+    return MoveLog(str(log_dir)).recover()
+
+
+@pytest.mark.parametrize("snapshot_every", [100000, 16])
+def test_recovery_replays_to_the_same_state(tmp_path, monkeypatch, snapshot_every):
+    monkeypatch.setattr(move_log, "MOVE_LOG_SNAPSHOT_EVERY", snapshot_every)
+    log = MoveLog(str(tmp_path))
+    rng = random.Random(snapshot_every)
+    matches = [new_logged_match(log, f"m{i}", seed=100 + i, games=3) for i in range(3)]
+    for step in range(60):
+        for match in matches:
+            play(match, 1, rng)
+        if step % 10 == 0:
+            flush(log)
+    flush(log)
+
+    recovered = recover(tmp_path)
+    assert set(recovered) == {match.match_id for match in matches}
+    for match in matches:
+        assert match_state(recovered[match.match_id]) == match_state(match)
+    if snapshot_every < 100000:
+        assert list(tmp_path.glob("*.snapshot"))
+
+
+def test_recovered_matches_keep_logging(tmp_path, monkeypatch):
+    monkeypatch.setattr(move_log, "MOVE_LOG_SNAPSHOT_EVERY", 32)
+    rng = random.Random(7)
+
+    async def scenario():
+        log = MoveLog(str(tmp_path))
+        await log.start()
+        match = new_logged_match(log, "m1", seed=7, games=3)
+        play(match, 40, rng)
+        await log.close()
+
+        log = MoveLog(str(tmp_path))
+        recovered = log.recover()["m1"]
+        assert match_state(recovered) == match_state(match)
+        recovered.set_event_sink(lambda event: log.record(recovered, event))
+        await log.start()
+        play(recovered, 40, rng)
+        await log.close()
+        return recovered
+
+    recovered = asyncio.run(scenario())
+    assert match_state(recover(tmp_path)["m1"]) == match_state(recovered)
+
+
+def test_torn_final_write_is_ignored(tmp_path):
+    log = MoveLog(str(tmp_path))
+    match = new_logged_match(log, "m1", seed=3)
+    play(match, 20, random.Random(3))
+    flush(log)
+    with open(tmp_path / "m1.log", "a", encoding="utf-8") as f:
+        f.write('{"op":"play","player":"A"')
+    assert match_state(recover(tmp_path)["m1"]) == match_state(match)
+
+
+def test_completed_match_log_is_retired(tmp_path):
+    log = MoveLog(str(tmp_path))
+    match = new_logged_match(log, "m1", seed=4, games=1)
+    play(match, 1000, random.Random(4))
+    assert match.match_completed
+    flush(log)
+    assert not (tmp_path / "m1.log").exists()
+    assert (tmp_path / "m1.log.completed").exists()
+    assert recover(tmp_path) == {}
+
+
+def test_completed_log_left_by_a_crash_is_retired_on_recovery(tmp_path):
+    log = MoveLog(str(tmp_path))
+    match = new_logged_match(log, "m1", seed=5, games=1)
+    play(match, 1000, random.Random(5))
+    assert match.match_completed
+    pending, snapshots, _ = log._take_batch()
+    log._write_batch(pending, snapshots, [])  # Crash after the last write, before retiring
+
+    assert recover(tmp_path) == {}
+    assert not (tmp_path / "m1.log").exists()
+    assert (tmp_path / "m1.log.completed").exists()
+
+
+def test_deleted_match_is_not_recovered(tmp_path):
+    log = MoveLog(str(tmp_path))
+    kept = new_logged_match(log, "m1", seed=6)
+    deleted = new_logged_match(log, "m2", seed=6)
+    play(kept, 10, random.Random(6))
+    play(deleted, 10, random.Random(6))
+    log.retire_match("m2")
+    flush(log)
+    assert set(recover(tmp_path)) == {"m1"}
@@ -0,0 +1,165 @@
+"""
+ResultsWriter: batching, retry after database errors, unique ids for reused match ids
+and account linking through verified access tokens
+"""
+
+import asyncio
+
+import pytest
+
+import app.core.results_writer as results_writer
+from app.core.database import Base, SessionLocal, engine
+from app.core.results_writer import ResultsWriter
+from app.game.mexican_train import MexicanTrainMatch
+from app.models import Game, GameHistory, GamePlayer, User
+
+
+@pytest.fixture(autouse=True)
+def fast_writer(monkeypatch):
+    monkeypatch.setattr(results_writer, "RESULTS_FLUSH_INTERVAL", 0.1)
+    monkeypatch.setattr(results_writer, "RESULTS_RETRY_DELAYS", [0.05])
+
+
+@pytest.fixture
+def database():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+def finished_match(match_id: str, seed: int = 1) -> MexicanTrainMatch:
+    match = MexicanTrainMatch(match_id, ["alice", "bob"], {"seed": seed, "games_to_play": 1, "ai_enabled": False})
+    match.start_match()
+    match.complete_current_game({"alice": 5, "bob": 12})
+    assert match.match_completed
+    return match
+
+
+async def record(writer: ResultsWriter, match: MexicanTrainMatch):
+    await writer.record_game(match, match.game_history[-1])
+    await writer.record_match(match)
+
+
+async def wait_for_written(writer: ResultsWriter, count: int):
+    for _ in range(200):
+        if writer.stats["written"] >= count:
+            return
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"only {writer.stats['written']} of {count} results written: {writer.stats}")
+
+
+def test_results_arriving_together_are_written_in_one_batch(database):
+    async def scenario():
+        writer = ResultsWriter()
+        await writer.start()
+        for index in range(3):
+            await record(writer, finished_match(f"m{index}", seed=index))
+        await wait_for_written(writer, 6)
+        await writer.close()
+        return writer.stats
+
+    stats = asyncio.run(scenario())
+    assert stats["batches"] == 1
+    assert stats["retries"] == 0
+    with SessionLocal() as session:
+        assert session.query(Game).count() == 3
+        assert session.query(GameHistory).count() == 3
+        assert session.query(GamePlayer).count() == 6
+
+
+def test_failed_batch_is_retried_until_the_database_accepts_it():
+    Base.metadata.drop_all(bind=engine)
+
+    async def scenario():
+        writer = ResultsWriter()
+        await writer.start()
+        await record(writer, finished_match("m1"))
+        for _ in range(200):
+            if writer.stats["retries"]:
+                break
+            await asyncio.sleep(0.02)
+        assert writer.stats["retries"], "writing without tables should have failed"
+        Base.metadata.create_all(bind=engine)
+        await wait_for_written(writer, 2)
+        await writer.close()
+        return writer.stats
+
+    try:
+        stats = asyncio.run(scenario())
+        assert stats["batches"] == 1
+        with SessionLocal() as session:
+            game = session.query(Game).one()
+            assert game.game_state["match_scores"] == {"alice": 5, "bob": 12}
+            assert session.query(GamePlayer).count() == 2
+    finally:
+        Base.metadata.drop_all(bind=engine)
+
+
+def test_reused_match_id_gets_its_own_rows(database):
+    first = finished_match("123456", seed=1)
+    second = finished_match("123456", seed=2)
+    assert first.record_id != second.record_id
+
+    async def scenario():
+        writer = ResultsWriter()
+        await writer.start()
+        await record(writer, first)
+        await wait_for_written(writer, 2)
+        await record(writer, second)
+        await wait_for_written(writer, 4)
+        await writer.close()
+
+    asyncio.run(scenario())
+    with SessionLocal() as session:
+        games = session.query(Game).all()
+        assert {game.id for game in games} == {first.record_id, second.record_id}
+        assert all(game.game_state["match_id"] == "123456" for game in games)
+        for match in (first, second):
+            assert session.query(GamePlayer).filter_by(game_id=match.record_id).count() == 2
+            assert session.query(GameHistory).filter_by(game_id=match.record_id).count() == 1
+
+
+def test_a_seat_is_claimed_by_one_account_and_an_account_holds_one_seat():
+    match = MexicanTrainMatch("m1", ["alice", "bob"], {"seed": 1, "games_to_play": 1, "ai_enabled": False})
+    assert match.link_account("alice", 1)
+    assert match.link_account("alice", 1)  # Reconnecting with the same account
+    assert not match.link_account("alice", 2)
+    assert not match.link_account("bob", 1)
+    assert not match.link_account("carol", 3)  # Not seated in this match
+    assert match.player_accounts == {"alice": 1}
+
+
+def test_players_are_linked_by_their_verified_account(database):
+    with SessionLocal() as session:
+        alice = User(username="alice", email="alice@example.com", hashed_password="x")
+        bob = User(username="bob", email="bob@example.com", hashed_password="x")
+        session.add_all([alice, bob])
+        session.commit()
+        alice_id = alice.id
+
+    match = MexicanTrainMatch("m1", ["alice", "bob"], {"seed": 1, "games_to_play": 1, "ai_enabled": False, "host": "alice"})
+    match.link_account("alice", alice_id)
+    # "bob" shares a display name with an account but never presented its token;
+    # a verified account that has since been deleted stays unlinked too
+    match.link_account("bob", alice_id + 1000)
+    match.start_match()
+    match.complete_current_game({"alice": 5, "bob": 12})
+
+    async def scenario():
+        writer = ResultsWriter()
+        await writer.start()
+        await record(writer, match)
+        await wait_for_written(writer, 2)
+        await writer.close()
+
+    asyncio.run(scenario())
+    with SessionLocal() as session:
+        alice = session.query(User).filter_by(username="alice").one()
+        bob = session.query(User).filter_by(username="bob").one()
+        seats = {seat.player_index: seat.user_id for seat in session.query(GamePlayer).all()}
+        assert seats == {0: alice.id, 1: None}
+        assert session.query(Game).one().host_id == alice.id
+        assert session.query(GameHistory).one().winner_id == alice.id
+        assert (alice.games_played, alice.games_won, alice.total_score) == (1, 1, 5)
+        assert bob.games_played in (0, None)
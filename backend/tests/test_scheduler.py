@@ -0,0 +1,191 @@
+"""
+TimerScheduler: deadline order, replacing and cancelling keyed timers, and the
+AI-move chain the game manager runs through it
+"""
+
+import asyncio
+import logging
+import time
+
+from app.core.scheduler import TimerScheduler
+from app.websockets.game_manager import AI_MOVE_TIMER, GameManager
+
+
+def run(scenario):
+    """Run scenario(scheduler, fired) with a started scheduler; fired collects callback tags"""
+    async def main():
+        scheduler = TimerScheduler()
+        await scheduler.start()
+        fired = []
+        try:
+            return await scenario(scheduler, fired)
+        finally:
+            await scheduler.stop()
+    return asyncio.run(main())
+
+
+def recorder(fired):
+    async def callback(tag):
+        fired.append(tag)
+    return callback
+
+
+def test_timers_fire_in_deadline_order():
+    async def scenario(scheduler, fired):
+        callback = recorder(fired)
+        scheduler.call_later(0.09, ("m1", "c"), callback, "c")
+        scheduler.call_later(0.03, ("m1", "a"), callback, "a")
+        scheduler.call_later(0.06, ("m2", "b"), callback, "b")
+        scheduler.call_later(0, ("m3", "x"), callback, "x1")
+        scheduler.call_later(0, ("m3", "y"), callback, "x2")  # Same deadline: scheduling order
+        await asyncio.sleep(0.2)
+        assert fired == ["x1", "x2", "a", "b", "c"]
+        assert len(scheduler) == 0
+    run(scenario)
+
+
+def test_rescheduling_a_key_replaces_its_timer():
+    async def scenario(scheduler, fired):
+        callback = recorder(fired)
+        scheduler.call_later(0.05, ("m1", "turn"), callback, "first")
+        scheduler.call_later(0.15, ("m1", "turn"), callback, "second")
+        assert len(scheduler) == 1
+        assert 0.1 < scheduler.remaining(("m1", "turn")) <= 0.15
+        await asyncio.sleep(0.1)
+        assert fired == []
+        await asyncio.sleep(0.1)
+        assert fired == ["second"]
+        assert scheduler.remaining(("m1", "turn")) is None
+    run(scenario)
+
+
+def test_earlier_timer_wakes_a_sleeping_scheduler():
+    async def scenario(scheduler, fired):
+        callback = recorder(fired)
+        scheduler.call_later(5, ("m1", "late"), callback, "late")
+        await asyncio.sleep(0.02)  # The loop is now sleeping until the late deadline
+        started = time.monotonic()
+        scheduler.call_later(0.03, ("m1", "soon"), callback, "soon")
+        while not fired:
+            await asyncio.sleep(0.01)
+        assert fired == ["soon"] and time.monotonic() - started < 1
+    run(scenario)
+
+
+def test_cancel_and_cancel_match():
+    async def scenario(scheduler, fired):
+        callback = recorder(fired)
+        scheduler.call_later(0.03, ("m1", "turn"), callback, "m1 turn")
+        scheduler.call_later(0.03, ("m1", "ai_move"), callback, "m1 ai")
+        scheduler.call_later(0.03, ("m2", "turn"), callback, "m2 turn")
+        scheduler.call_later(0.03, ("m3", "turn"), callback, "m3 turn")
+        assert scheduler.cancel(("m3", "turn")) is True
+        assert scheduler.cancel(("m3", "turn")) is False
+        scheduler.cancel_match("m1")
+        assert len(scheduler) == 1
+        await asyncio.sleep(0.1)
+        assert fired == ["m2 turn"]
+        scheduler.call_later(0.02, ("m1", "turn"), callback, "m1 again")  # A cancelled key can be reused
+        await asyncio.sleep(0.06)
+        assert fired == ["m2 turn", "m1 again"]
+    run(scenario)
+
+
+def test_cancelled_timers_do_not_pile_up():
+    async def scenario(scheduler, fired):
+        callback = recorder(fired)
+        for i in range(1000):
+            scheduler.call_later(60, ("m1", f"t{i}"), callback, i)
+            scheduler.cancel(("m1", f"t{i}"))
+        assert len(scheduler) == 0
+        assert len(scheduler._heap) <= 130
+    run(scenario)
+
+
+def test_failing_callback_does_not_stop_other_timers():
+    async def scenario(scheduler, fired):
+        async def broken():
+            raise RuntimeError("boom")
+        scheduler.call_later(0.01, ("m1", "broken"), broken)
+        scheduler.call_later(0.03, ("m1", "ok"), recorder(fired), "ok")
+        await asyncio.sleep(0.1)
+        assert fired == ["ok"]
+    logging.disable(logging.ERROR)
+    try:
+        run(scenario)
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def test_stop_cancels_running_callbacks():
+    async def main():
+        scheduler = TimerScheduler()
+        await scheduler.start()
+        started = asyncio.Event()
+        cancelled = []
+
+        async def slow():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        scheduler.call_later(0, ("m1", "slow"), slow)
+        scheduler.call_later(10, ("m1", "later"), slow)
+        await started.wait()
+        await scheduler.stop()
+        await asyncio.sleep(0)
+        assert cancelled == [True] and len(scheduler) == 0
+    asyncio.run(main())
+
+
+def ai_turn_manager(monkeypatch):
+    """GameManager with a started match whose current player is an AI"""
+    manager = GameManager()
+    match = manager.create_match_with_config("m1", ["host"], {"host": "host", "games_to_play": 1, "max_players": 3, "seed": 1})
+    match.start_match()
+    game = manager.get_game("m1")
+    while game.get_current_player() not in game.ai_players:
+        game.next_turn()
+
+    async def no_broadcast(game_id, message):
+        pass
+    monkeypatch.setattr(manager, "broadcast_to_game", no_broadcast)
+    return manager, game
+
+
+def test_delayed_ai_move_finishes_an_ended_game(monkeypatch):
+    manager, game = ai_turn_manager(monkeypatch)
+    ai_player = game.get_current_player()
+    finished = []
+
+    async def ending_move(player, deadline=None):
+        return {"success": True, "game_ended": True, "winner": player, "final_scores": {}}
+
+    async def finish_game(game_id, result):
+        finished.append((game_id, result["winner"]))
+    monkeypatch.setattr(game, "make_ai_move", ending_move)
+    monkeypatch.setattr(manager, "_finish_game", finish_game)
+
+    asyncio.run(manager._delayed_ai_move("m1", ai_player))
+    assert finished == [("m1", ai_player)]
+    assert manager.scheduler.remaining(("m1", AI_MOVE_TIMER)) is None
+
+
+def test_delayed_ai_move_paces_the_next_ai_through_the_scheduler(monkeypatch):
+    manager, game = ai_turn_manager(monkeypatch)
+    ai_player = game.get_current_player()
+    moves = []
+
+    async def passing_move(player, deadline=None):
+        moves.append(player)
+        while game.get_current_player() not in game.ai_players or game.get_current_player() == player:
+            game.next_turn()
+        return {"success": True}
+    monkeypatch.setattr(game, "make_ai_move", passing_move)
+
+    asyncio.run(manager._delayed_ai_move("m1", ai_player))
+    # Only the scheduled AI moved; the next one waits on the paced ai_move timer instead of chaining
+    assert moves == [ai_player]
+    assert manager.scheduler.remaining(("m1", AI_MOVE_TIMER)) is not None
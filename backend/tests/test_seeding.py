@@ -0,0 +1,87 @@
+"""
+Seeded RNGs: one match seed replays the same deals and AI decisions, whatever the
+global random module is doing, and offloaded AI decisions continue the same stream
+"""
+
+import json
+import random
+
+from app.core.ai_config import ai_config
+from app.game.ai_worker import choose_move_from_snapshot
+from app.game.mexican_train import MexicanTrainGame, MexicanTrainMatch, new_seed
+from app.testing.ai_match_runner import AIMatchRunner
+
+
+def deals(match: MexicanTrainMatch, games: int):
+    """Hands, boneyard and engine of each game, finishing every game with fixed scores"""
+    dealt = []
+    for _ in range(games):
+        game = match.current_game
+        dealt.append((game.seed, dict(game.hand_masks), list(game.draw_pile), game.engine_domino.id))
+        match.complete_current_game({player: 1 for player in match.players})
+    return dealt
+
+
+def test_new_seed_uses_the_configured_seed():
+    assert new_seed(42) == 42
+    assert new_seed("7") == 7
+    assert new_seed() != new_seed()
+
+
+def test_match_seed_replays_every_deal():
+    runs = []
+    for noise in range(3):
+        random.seed(noise)  # The global RNG must not leak into the match
+        match = MexicanTrainMatch("m", ["a", "b", "c"], {"seed": 2024, "games_to_play": 3, "ai_enabled": False})
+        match.start_match()
+        runs.append(deals(match, 3))
+    assert runs[0] == runs[1] == runs[2]
+    assert len({seed for seed, *_ in runs[0]}) == 3  # Each game gets its own seed
+
+    other = MexicanTrainMatch("m", ["a", "b", "c"], {"seed": 2025, "games_to_play": 3, "ai_enabled": False})
+    other.start_match()
+    assert deals(other, 3) != runs[0]
+
+
+def test_unseeded_matches_differ():
+    first = MexicanTrainMatch("m", ["a", "b"], {"ai_enabled": False})
+    second = MexicanTrainMatch("m", ["a", "b"], {"ai_enabled": False})
+    assert first.seed != second.seed
+
+
+def test_snapshot_decisions_continue_the_game_rng():
+    in_process = MexicanTrainGame("g", ["a", "b", "c"], config={"seed": 42})
+    offloaded = MexicanTrainGame("g", ["a", "b", "c"], config={"seed": 42})
+    in_process.setup_round()
+    offloaded.setup_round()
+    random_strategy = {"name": "Random", "tactics": [{"name": "random", "weight": 1.0}]}
+    for strategy in [random_strategy] + [ai_config.get_strategy_by_name(name) for name in ai_config.strategies]:
+        for player in in_process.players:
+            moves = offloaded.get_valid_moves(player)
+            if not moves:
+                continue
+            index, reason, rng_state = choose_move_from_snapshot(offloaded.get_ai_snapshot(player, moves, strategy))
+            offloaded.rng.setstate(rng_state)
+            chosen = in_process._apply_strategy(player, in_process.get_valid_moves(player), strategy)
+            assert (moves[index]["domino"].id, moves[index]["train"], reason) == (chosen["domino"].id, chosen["train"], chosen["reason"])
+            assert offloaded.rng.getstate() == in_process.rng.getstate()
+
+
+def test_seeded_ai_matches_are_reproducible(tmp_path):
+    runner = AIMatchRunner(str(tmp_path))
+    players = [{"name": "A", "strategy": "sleepy_caboose"}, {"name": "B", "strategy": "chain_strategist"}, {"name": "C"}]
+
+    def run(seed: int) -> str:
+        result = runner.run_single_match(players, 2, "m", seed=seed)
+        for key in ("timestamp", "duration_seconds"):
+            result.pop(key)
+        for game in result["game_results"]:
+            game.pop("completed_at", None)
+            game.pop("duration", None)
+        return json.dumps(result, sort_keys=True, default=str)
+
+    random.seed(1)
+    first = run(12345)
+    random.seed(2)
+    assert run(12345) == first
+    assert run(999) != first
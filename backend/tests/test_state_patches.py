@@ -0,0 +1,150 @@
+"""
+State patch stream: replaying each viewer's patches over their last snapshot must
+give the same state as a fresh snapshot (a port of applyStatePatches in the game page)
+"""
+
+import copy
+import random
+from typing import Dict, List
+
+import pytest
+
+from app.game.mexican_train import STATE_PATCH_HISTORY, MexicanTrainGame
+from conftest import play_random_step
+
+# Game state fields the patch stream keeps current
+PATCHED_FIELDS = [
+    "state_seq", "trains", "mexican_train", "player_hand_counts", "boneyard_count", "current_player",
+    "unsatisfied_doubles", "must_satisfy_doubles", "player_has_played_double", "turn_clock",
+    "spectators", "spectator_count",
+]
+
+
+def apply_state_patches(state: Dict, patches: List[Dict], state_seq: int) -> Dict:
+    """Same rules as the frontend's applyStatePatches"""
+    state = copy.deepcopy(state)
+    state["state_seq"] = state_seq
+
+    def same_double(double, patch):
+        return double["train_type"] == patch["train_type"] and double["train_owner"] == patch["train_owner"]
+
+    for patch in patches:
+        op = patch["op"]
+        if op == "train_append":
+            train = state["mexican_train"] if patch["train_type"] == "mexican" else state["trains"][patch["train_owner"]]
+            train["dominoes"].append(patch["domino"])
+            train["needs_double_satisfaction"] = patch["needs_double_satisfaction"]
+        elif op == "train_open":
+            state["trains"][patch["train_owner"]]["is_open"] = patch["is_open"]
+        elif op == "hand_count":
+            state["player_hand_counts"][patch["player"]] = patch["count"]
+        elif op == "boneyard_count":
+            state["boneyard_count"] = patch["count"]
+        elif op in ("hand_add", "hand_remove"):
+            owner = next(iter(state["player_hands"]), None)
+            if owner is None:
+                continue
+            hand = state["player_hands"][owner]
+            if op == "hand_add":
+                hand.append(patch["domino"])
+            else:
+                state["player_hands"][owner] = [domino for domino in hand if domino["id"] != patch["domino_id"]]
+        elif op == "turn":
+            state["current_player"] = patch["current_player"]
+            state["player_has_played_double"] = patch["player_has_played_double"]
+        elif op == "played_double":
+            state["player_has_played_double"] = patch["player_has_played_double"]
+        elif op == "turn_clock":
+            state["turn_clock"] = {key: patch[key] for key in ("turn_seconds", "turn_deadline", "time_banks", "away_players")}
+        elif op == "double_added":
+            if not any(same_double(double, patch) for double in state["unsatisfied_doubles"]):
+                state["unsatisfied_doubles"].append({"train_type": patch["train_type"], "train_owner": patch["train_owner"]})
+        elif op == "double_removed":
+            state["unsatisfied_doubles"] = [double for double in state["unsatisfied_doubles"] if not same_double(double, patch)]
+        elif op == "spectators":
+            state["spectators"] = patch["spectators"]
+            state["spectator_count"] = len(patch["spectators"])
+        else:
+            raise AssertionError(f"unknown patch op {op}")
+    state["must_satisfy_doubles"] = bool(state["unsatisfied_doubles"])
+    return state
+
+
+def comparable(state: Dict) -> Dict:
+    view = {field: state[field] for field in PATCHED_FIELDS}
+    view["player_hands"] = {player: sorted(domino["id"] for domino in hand) for player, hand in state["player_hands"].items()}
+    return view
+
+
+def new_game(seed: int, players: int) -> MexicanTrainGame:
+    game = MexicanTrainGame("g", [f"p{i}" for i in range(players)], 12, {"ai_enabled": False, "seed": seed})
+    assert game.start_game(force_start=True)["success"]
+    return game
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_patch_replay_equals_snapshot(seed):
+    game = new_game(seed, players=2 + seed % 5)
+    rng = random.Random(seed)
+    viewers = list(game.players) + [None]  # None is a spectator
+    views = {viewer: game.get_game_state(viewer) for viewer in viewers}
+    patched = 0
+
+    for step in range(600):
+        if step == 40:
+            game.add_spectator("watcher")
+        if step == 60:
+            game.set_player_away(game.players[0], True)
+        if not play_random_step(game, rng):
+            break
+        for viewer in viewers:
+            patches = game.get_state_patches(views[viewer]["state_seq"], viewer)
+            snapshot = game.get_game_state(viewer)
+            if patches is None:
+                views[viewer] = snapshot
+                continue
+            views[viewer] = apply_state_patches(views[viewer], patches, game.state_seq)
+            assert comparable(views[viewer]) == comparable(snapshot), (seed, step, viewer)
+            patched += 1
+    assert patched
+
+
+def test_spectators_never_receive_hand_patches():
+    game = new_game(1, players=3)
+    rng = random.Random(1)
+    since = game.state_seq
+    for _ in range(30):
+        play_random_step(game, rng)
+    spectator_ops = {patch["op"] for patch in game.get_state_patches(since)}
+    assert "hand_count" in spectator_ops
+    assert not spectator_ops & {"hand_add", "hand_remove"}
+
+
+def test_viewer_too_far_behind_gets_a_snapshot():
+    game = new_game(2, players=2)
+    rng = random.Random(2)
+    since = game.state_seq
+    while game.state_seq - since <= STATE_PATCH_HISTORY:
+        assert play_random_step(game, rng), "round ended before the patch history filled up"
+        game.get_state_patches(game.state_seq)  # Seal each step's patches as its own batch
+    assert game.get_state_patches(since, "p0") is None
+    assert game.get_state_patches(game.state_seq - 1, "p0") is not None
+
+
+def test_roster_change_forces_a_snapshot():
+    game = MexicanTrainGame("g", ["p0", "p1"], 12, {"ai_enabled": False, "seed": 3})
+    game.setup_round()
+    since = game.state_seq
+    assert game.add_player("p2")["success"]
+    assert game.get_state_patches(since, "p0") is None
+
+
+def test_move_results_carry_no_game_state():
+    game = new_game(4, players=2)
+    rng = random.Random(4)
+    while not game.get_valid_moves(game.get_current_player()):
+        assert play_random_step(game, rng)
+    player = game.get_current_player()
+    move = game.get_valid_moves(player)[0]
+    result = game.make_move(player, move["domino"], move["train"], move["train_owner"])
+    assert result["success"] and "game_state" not in result
@@ -110,6 +110,7 @@ export function GameLobby() {
       sessionStorage.setItem('userHandle', urlUserHandle);
       sessionStorage.setItem('displayName', urlDisplayName);
       sessionStorage.setItem('userType', 'guest');
+      sessionStorage.removeItem('accessToken');
       
       // Clean up the URL
       const newUrl = new URL(window.location.href);
@@ -144,6 +144,7 @@ export default function AuthPage() {
         sessionStorage.setItem('displayName', displayName);
         sessionStorage.setItem('userType', 'authenticated');
         sessionStorage.setItem('userEmail', data.user.email);
+        sessionStorage.setItem('accessToken', data.access_token);
         
         setSuccess('Login successful! Redirecting...');
         setTimeout(() => router.push('/lobby'), 1500);
@@ -1,16 +1,98 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useRouter } from 'next/router';
 import { useSession } from 'next-auth/react';
 import GameBoard from '../../components/game/GameBoard';
 
 interface GamePageProps {}
 
+// Apply a batch of game_state_patch operations to the last full game_state snapshot
+function applyStatePatches(state: any, patches: any[], stateSeq: number) {
+  if (!state) return state;
+  const next = {
+    ...state,
+    state_seq: stateSeq,
+    trains: { ...state.trains },
+    mexican_train: state.mexican_train ? { ...state.mexican_train } : state.mexican_train,
+    player_hand_counts: { ...state.player_hand_counts },
+    player_hands: { ...state.player_hands },
+    unsatisfied_doubles: [...(state.unsatisfied_doubles || [])]
+  };
+  const sameDouble = (d: any, patch: any) =>
+    d.train_type === patch.train_type && (d.train_owner || null) === (patch.train_owner || null);
+
+  for (const patch of patches) {
+    switch (patch.op) {
+      case 'train_append': {
+        const key = patch.train_type === 'mexican' ? null : patch.train_owner;
+        const train = key === null ? next.mexican_train : next.trains[key];
+        const updated = {
+          ...train,
+          dominoes: [...(train?.dominoes || []), patch.domino],
+          needs_double_satisfaction: patch.needs_double_satisfaction
+        };
+        if (key === null) next.mexican_train = updated;
+        else next.trains[key] = updated;
+        break;
+      }
+      case 'train_open':
+        next.trains[patch.train_owner] = { ...next.trains[patch.train_owner], is_open: patch.is_open };
+        break;
+      case 'hand_count':
+        next.player_hand_counts[patch.player] = patch.count;
+        break;
+      case 'boneyard_count':
+        next.boneyard_count = patch.count;
+        break;
+      case 'hand_add':
+      case 'hand_remove': {
+        const owner = Object.keys(next.player_hands)[0];
+        if (!owner) break;
+        const hand = next.player_hands[owner] || [];
+        next.player_hands[owner] = patch.op === 'hand_add'
+          ? [...hand, patch.domino]
+          : hand.filter((d: any) => d.id !== patch.domino_id);
+        break;
+      }
+      case 'turn':
+        next.current_player = patch.current_player;
+        next.player_has_played_double = patch.player_has_played_double;
+        break;
+      case 'played_double':
+        next.player_has_played_double = patch.player_has_played_double;
+        break;
+      case 'turn_clock':
+        next.turn_clock = {
+          turn_seconds: patch.turn_seconds,
+          turn_deadline: patch.turn_deadline,
+          time_banks: patch.time_banks,
+          away_players: patch.away_players
+        };
+        break;
+      case 'double_added':
+        if (!next.unsatisfied_doubles.some((d: any) => sameDouble(d, patch))) {
+          next.unsatisfied_doubles.push({ train_type: patch.train_type, train_owner: patch.train_owner });
+        }
+        break;
+      case 'double_removed':
+        next.unsatisfied_doubles = next.unsatisfied_doubles.filter((d: any) => !sameDouble(d, patch));
+        break;
+      case 'spectators':
+        next.spectators = patch.spectators;
+        next.spectator_count = patch.spectators.length;
+        break;
+    }
+  }
+  next.must_satisfy_doubles = next.unsatisfied_doubles.length > 0;
+  return next;
+}
+
 export default function GamePage({}: GamePageProps) {
   const router = useRouter();
   const { gameId } = router.query;
   const { data: session } = useSession();
   
   const [gameState, setGameState] = useState<any>(null);
+  const stateSeqRef = useRef<number | null>(null);
   const [isConnected, setIsConnected] = useState(false);
   const [websocket, setWebsocket] = useState<WebSocket | null>(null);
   const [userHandle, setUserHandle] = useState<string>('');
@@ -116,13 +198,16 @@ export default function GamePage({}: GamePageProps) {
     }
 
     const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    const wsUrl = `${wsProtocol}//${window.location.host}/ws/game/${gameId}?user_id=${encodeURIComponent(userHandle)}&display_name=${encodeURIComponent(displayName)}`;
+    // Signed-in players send their access token; the server links results only to that verified account
+    const accessToken = sessionStorage.getItem('accessToken');
+    const tokenParam = accessToken ? `&token=${encodeURIComponent(accessToken)}` : '';
+    const wsUrl = `${wsProtocol}//${window.location.host}/ws/game/${gameId}?user_id=${encodeURIComponent(userHandle)}&display_name=${encodeURIComponent(displayName)}${tokenParam}`;
     
     console.log('=== GAME WEBSOCKET CONNECTING ===');
     console.log('Game ID:', gameId);
     console.log('User Handle:', userHandle);
     console.log('Display Name:', displayName);
-    console.log('WebSocket URL:', wsUrl);
+    console.log('WebSocket URL:', wsUrl.replace(tokenParam, ''));
     
     const ws = new WebSocket(wsUrl);
     
@@ -173,8 +258,20 @@ export default function GamePage({}: GamePageProps) {
       
       switch (message.type) {
         case 'game_state':
+          stateSeqRef.current = message.data?.state_seq ?? null;
           setGameState(message.data);
           break;
+
+        case 'game_state_patch':
+          // Patches only apply on top of the exact state they were built from - otherwise resync
+          if (stateSeqRef.current === null || message.data.base_seq !== stateSeqRef.current) {
+            stateSeqRef.current = null;
+            ws.send(JSON.stringify({ type: 'resync_state' }));
+            break;
+          }
+          stateSeqRef.current = message.data.state_seq;
+          setGameState((prev: any) => applyStatePatches(prev, message.data.patches, message.data.state_seq));
+          break;
           
         case 'join_result':
           setJoinResult(message);
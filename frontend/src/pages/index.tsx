@@ -90,6 +90,7 @@ export default function HomePage() {
         sessionStorage.setItem('userHandle', userHandle);
         sessionStorage.setItem('displayName', displayName);
         sessionStorage.setItem('userType', 'guest');
+        sessionStorage.removeItem('accessToken');
         
         // Also keep backup for cross-tab reference
         localStorage.setItem('lastDisplayName', displayName);
@@ -30,6 +30,7 @@ export default function MagicSigninPage() {
           sessionStorage.setItem('displayName', displayName);
           sessionStorage.setItem('userType', 'authenticated');
           sessionStorage.setItem('userEmail', data.user.email);
+          sessionStorage.setItem('accessToken', data.access_token);
 
           // Redirect to lobby after a moment
           setTimeout(() => {